@@ -0,0 +1,393 @@
+import os
+import re
+import time
+from typing import Iterable, Optional, Union
+
+import numpy as np
+import pandas as pd
+
+from ..utils.common_helpers import read_yaml_file
+from .speaker_index import PARTITION_KEYS, simplify_role
+from .transcript_search import ABBREVIATIONS_PATH
+
+DEFAULT_SPACY_MODEL = "en_core_web_sm"
+
+# Label of the abbreviations.yaml gazetteer entities
+GAZETTEER_LABEL = "BANK_TERM"
+
+# Per-turn keys kept in the index
+TURN_COLUMNS = PARTITION_KEYS + ["question_answer_group_id", "question_order", "speaker", "role", "role_simple", "company"]
+MENTION_COLUMNS = ["turn_id", "entity", "label", "text", "start_char", "end_char"]
+KEYPHRASE_COLUMNS = ["turn_id", "phrase", "score"]
+
+# nltk's wordpunct_tokenize, which rake_nltk splits words with
+_WORDPUNCT_PATTERN = re.compile(r"\w+|[^\w\s]+")
+
+Period = Union[int, tuple[int, int]]
+
+
+def build_gazetteer_patterns(nlp, abbreviations_path: str = ABBREVIATIONS_PATH) -> list[dict]:
+    """
+    EntityRuler patterns for the abbreviations in abbreviations.yaml and their expansions.
+
+    Abbreviations match case-sensitively ("CCAR", "C&I"; "cd" or "aus" in running text are not
+    entities), expansions case-insensitively token by token. Both carry the abbreviation as their
+    entity id, so "Comprehensive Capital Analysis and Review" and "CCAR" index as the same entity.
+    """
+    patterns = []
+    for abbreviation, expansion in read_yaml_file(abbreviations_path).items():
+        abbreviation, expansion = str(abbreviation), str(expansion)
+        patterns.append({"label": GAZETTEER_LABEL, "pattern": abbreviation, "id": abbreviation})
+        tokens = [{"LOWER": token.lower_} for token in nlp.make_doc(expansion)]
+        if tokens:
+            patterns.append({"label": GAZETTEER_LABEL, "pattern": tokens, "id": abbreviation})
+    return patterns
+
+
+def load_entity_nlp(model_name: str = DEFAULT_SPACY_MODEL, abbreviations_path: Optional[str] = ABBREVIATIONS_PATH):
+    """
+    Loads a spaCy pipeline reduced to NER, with the abbreviations gazetteer in front of the NER model.
+
+    Text_Sum.ipynb runs the full en_core_web_sm pipeline (tagger, parser, lemmatizer, ...) on every
+    speaker block only to read doc.ents; everything but tok2vec and ner is disabled here. The ruler
+    runs before ner, so the statistical model keeps the gazetteer spans and labels around them.
+    """
+    import spacy
+    nlp = spacy.load(model_name)
+    nlp.select_pipes(enable=[name for name in nlp.pipe_names if name in ("tok2vec", "ner")])
+    if abbreviations_path:
+        ruler = nlp.add_pipe("entity_ruler", before="ner" if "ner" in nlp.pipe_names else None)
+        ruler.add_patterns(build_gazetteer_patterns(nlp, abbreviations_path))
+    return nlp
+
+
+def load_rake_stopwords() -> frozenset:
+    """
+    The stopwords rake_nltk uses by default (nltk's English list), as in Text_Sum.ipynb.
+    """
+    from nltk.corpus import stopwords
+    return frozenset(stopwords.words("english"))
+
+
+def rake_keyphrases(text: str, stopwords: frozenset, top_n: int = 10, max_words: int = 4) -> list[tuple[str, float]]:
+    """
+    RAKE keyphrases of one text, scored like rake_nltk's default degree-to-frequency ratio.
+
+    Candidate phrases are the runs of words between stopwords and punctuation; each word scores
+    degree / frequency over the candidates, and a phrase the sum of its words. Unlike
+    rake_nltk.get_ranked_phrases, repeated phrases are returned once and phrases longer than
+    max_words (usually lists of numbers and names) are dropped.
+
+    Returns:
+        list[tuple[str, float]]: The top_n (phrase, score) pairs, best first.
+    """
+    if not isinstance(text, str) or not text:
+        return []
+    phrases, current = [], []
+    for token in _WORDPUNCT_PATTERN.findall(text.lower()):
+        if token in stopwords or not (token[0].isalnum() or token[0] == "_"):
+            if current:
+                phrases.append(tuple(current))
+                current = []
+        else:
+            current.append(token)
+    if current:
+        phrases.append(tuple(current))
+
+    frequency, degree = {}, {}
+    for phrase in phrases:
+        for word in phrase:
+            frequency[word] = frequency.get(word, 0) + 1
+            degree[word] = degree.get(word, 0) + len(phrase)
+    scores = {}
+    for phrase in phrases:
+        if len(phrase) <= max_words and phrase not in scores:
+            scores[phrase] = sum(degree[word] / frequency[word] for word in phrase)
+    ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_n]
+    return [(" ".join(phrase), score) for phrase, score in ranked]
+
+
+class EntityKeywordExtractor:
+    """
+    Batched NER and RAKE over speaker turns (extract_entities and extract_keywords in Text_Sum.ipynb).
+
+    Args:
+        nlp: A spaCy pipeline (defaults to load_entity_nlp(), loaded on first use).
+        rake_stopwords (Iterable[str], optional): RAKE stopwords (defaults to nltk's English list).
+        batch_size (int): nlp.pipe batch size.
+        n_process (int): nlp.pipe worker processes.
+        keyphrases_per_turn (int): RAKE phrases kept per turn.
+    """
+    def __init__(self, nlp=None, rake_stopwords: Optional[Iterable[str]] = None, batch_size: int = 64,
+                 n_process: int = 1, keyphrases_per_turn: int = 10):
+        self._nlp = nlp
+        self._rake_stopwords = frozenset(rake_stopwords) if rake_stopwords is not None else None
+        self.batch_size = batch_size
+        self.n_process = n_process
+        self.keyphrases_per_turn = keyphrases_per_turn
+
+    @property
+    def nlp(self):
+        if self._nlp is None:
+            self._nlp = load_entity_nlp()
+        return self._nlp
+
+    @property
+    def rake_stopwords(self) -> frozenset:
+        if self._rake_stopwords is None:
+            self._rake_stopwords = load_rake_stopwords()
+        return self._rake_stopwords
+
+    def entities(self, texts: list[str]) -> pd.DataFrame:
+        """
+        Runs the NER pipeline over all texts in batches.
+
+        Returns:
+            pd.DataFrame: MENTION_COLUMNS, with turn_id the position of the text in `texts`. `entity`
+            is the gazetteer abbreviation for gazetteer matches and the whitespace-normalized span text otherwise.
+        """
+        rows = []
+        docs = self.nlp.pipe(texts, batch_size=self.batch_size, n_process=self.n_process)
+        for turn_id, doc in enumerate(docs):
+            for ent in doc.ents:
+                text = " ".join(ent.text.split())
+                rows.append((turn_id, ent.ent_id_ or text, ent.label_, text, ent.start_char, ent.end_char))
+        return pd.DataFrame(rows, columns=MENTION_COLUMNS)
+
+    def keyphrases(self, texts: list[str]) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: KEYPHRASE_COLUMNS, keyphrases_per_turn rows (at most) per text.
+        """
+        stopwords = self.rake_stopwords
+        rows = [
+            (turn_id, phrase, score)
+            for turn_id, text in enumerate(texts)
+            for phrase, score in rake_keyphrases(text, stopwords, self.keyphrases_per_turn)
+        ]
+        return pd.DataFrame(rows, columns=KEYPHRASE_COLUMNS)
+
+
+def _period(year: int, quarter: int):
+    return year * 4 + quarter - 1
+
+
+def _period_bound(period: Period, end: bool) -> int:
+    if isinstance(period, tuple):
+        return _period(*period)
+    return _period(period, 4 if end else 1)
+
+
+class EntityIndex:
+    """
+    An entity -> turn and keyphrase -> turn inverted index over the transcript turns.
+
+    Entities and RAKE keyphrases are extracted once per quarter with `add_turns` (re-adding a
+    quarter replaces it) and kept as mention tables. Mentions are grouped by entity key (the
+    lowercased entity) into postings, so a query such as all mentions of CCAR by the CFO since 2023
+    reads only that entity's mentions and filters them on the turn keys, instead of re-running
+    spaCy over the speaker blocks.
+
+    Example:
+        index = EntityIndex()
+        index.add_turns(gs_qna_df, BankType.GOLDMAN_SACHS.value, "qna")
+        index.mentions("CCAR", role="CFO", since=2023)
+    """
+    def __init__(self, extractor: Optional[EntityKeywordExtractor] = None, abbreviations_path: Optional[str] = ABBREVIATIONS_PATH,
+                 turns: Optional[pd.DataFrame] = None, mentions: Optional[pd.DataFrame] = None,
+                 keyphrases: Optional[pd.DataFrame] = None):
+        self.extractor = extractor or EntityKeywordExtractor()
+        # Expansions fold to their abbreviation, so queries by either name find the gazetteer entity
+        self._aliases = {}
+        if abbreviations_path:
+            for abbreviation, expansion in read_yaml_file(abbreviations_path).items():
+                self._aliases[" ".join(str(expansion).lower().split())] = str(abbreviation).lower()
+        self._turns = turns if turns is not None else pd.DataFrame(columns=TURN_COLUMNS)
+        self._mentions = mentions if mentions is not None else pd.DataFrame(columns=MENTION_COLUMNS)
+        self._keyphrases = keyphrases if keyphrases is not None else pd.DataFrame(columns=KEYPHRASE_COLUMNS)
+        self._postings = {}
+
+    @property
+    def turns(self) -> pd.DataFrame:
+        return self._turns
+
+    # Building
+
+    def add_turns(self, turns_df: pd.DataFrame, bank: str, section: str) -> "EntityIndex":
+        """
+        Extracts the entities and keyphrases of one or more quarters of a bank, replacing any
+        quarters already in the index for the same bank and section.
+
+        Args:
+            turns_df (pd.DataFrame): A qna_df or discussion_df produced by the transcript extractors.
+            bank (str): Bank name, e.g. BankType.GOLDMAN_SACHS.value.
+            section (str): "qna" or "discussion".
+        """
+        if turns_df.empty:
+            return self
+        turns = turns_df.reindex(columns=TURN_COLUMNS).reset_index(drop=True)
+        turns["bank"] = bank
+        turns["section"] = section
+        turns["year"] = pd.to_numeric(turns["year"]).astype("int16")
+        turns["quarter"] = pd.to_numeric(turns["quarter"]).astype("int8")
+        unique_roles = turns["role"].drop_duplicates()
+        turns["role_simple"] = turns["role"].map(dict(zip(unique_roles, unique_roles.map(simplify_role))))
+        texts = turns_df["content"].fillna("").astype(str).tolist()
+        mentions = self.extractor.entities(texts)
+        keyphrases = self.extractor.keyphrases(texts)
+
+        kept = self._turns
+        if not kept.empty:
+            new_partitions = set(turns[PARTITION_KEYS].drop_duplicates().itertuples(index=False, name=None))
+            keep = np.array([partition not in new_partitions for partition in kept[PARTITION_KEYS].itertuples(index=False, name=None)], dtype=bool)
+            old_ids = np.flatnonzero(keep)
+            # Renumber the kept turns 0..n-1 and the new ones after them
+            renumber = np.full(len(kept), -1, dtype=np.int64)
+            renumber[old_ids] = np.arange(len(old_ids))
+            old_mentions = self._mentions[keep[self._mentions["turn_id"].to_numpy(dtype=np.int64)]]
+            old_mentions = old_mentions.assign(turn_id=renumber[old_mentions["turn_id"].to_numpy(dtype=np.int64)])
+            old_keyphrases = self._keyphrases[keep[self._keyphrases["turn_id"].to_numpy(dtype=np.int64)]]
+            old_keyphrases = old_keyphrases.assign(turn_id=renumber[old_keyphrases["turn_id"].to_numpy(dtype=np.int64)])
+            offset = len(old_ids)
+            self._turns = pd.concat([kept[keep], turns], ignore_index=True)
+            self._mentions = pd.concat([old_mentions, mentions.assign(turn_id=mentions["turn_id"] + offset)], ignore_index=True)
+            self._keyphrases = pd.concat([old_keyphrases, keyphrases.assign(turn_id=keyphrases["turn_id"] + offset)], ignore_index=True)
+        else:
+            self._turns, self._mentions, self._keyphrases = turns, mentions, keyphrases
+        self._postings = {}
+        return self
+
+    def _build_postings(self, table: str) -> tuple[dict[str, tuple[int, int]], np.ndarray]:
+        # Rows of each key, as one slice of a single row order
+        if table not in self._postings:
+            frame = self._mentions if table == "mentions" else self._keyphrases
+            column = "entity" if table == "mentions" else "phrase"
+            codes, keys = pd.factorize(frame[column].astype(str).str.lower())
+            order = np.argsort(codes, kind="stable")
+            ends = np.cumsum(np.bincount(codes, minlength=len(keys)))
+            starts = ends - np.bincount(codes, minlength=len(keys))
+            self._postings[table] = ({key: (start, end) for key, start, end in zip(keys, starts, ends)}, order)
+        return self._postings[table]
+
+    # Querying
+
+    def _key(self, name: str) -> str:
+        key = " ".join(name.lower().split())
+        return self._aliases.get(key, key)
+
+    def _lookup(self, table: str, name: str, bank=None, section=None, role=None, speaker=None,
+                since: Optional[Period] = None, until: Optional[Period] = None) -> pd.DataFrame:
+        postings, order = self._build_postings(table)
+        start, end = postings.get(self._key(name), (0, 0))
+        frame = self._mentions if table == "mentions" else self._keyphrases
+        rows = frame.iloc[order[start:end]]
+        turns = self._turns.iloc[rows["turn_id"].to_numpy(dtype=np.int64)].reset_index(drop=True)
+        mask = np.ones(len(turns), dtype=bool)
+        for column, value in (("bank", bank), ("section", section), ("role_simple", role), ("speaker", speaker)):
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                mask &= turns[column].isin(value).to_numpy()
+            else:
+                mask &= (turns[column] == value).to_numpy()
+        periods = _period(turns["year"].to_numpy(dtype=np.int64), turns["quarter"].to_numpy(dtype=np.int64))
+        if since is not None:
+            mask &= periods >= _period_bound(since, end=False)
+        if until is not None:
+            mask &= periods <= _period_bound(until, end=True)
+        result = pd.concat([turns, rows.reset_index(drop=True).drop(columns="turn_id")], axis=1)[mask]
+        return result.sort_values(["year", "quarter", "bank", "section", "question_order"], ignore_index=True)
+
+    def mentions(self, entity: str, bank=None, section=None, role=None, speaker=None,
+                 since: Optional[Period] = None, until: Optional[Period] = None) -> pd.DataFrame:
+        """
+        All mentions of an entity, with their turns.
+
+        Args:
+            entity (str): Entity name, case-insensitive; an expansion from abbreviations.yaml finds its abbreviation.
+            bank, section, speaker: Equality (or membership, when given a list) filters.
+            role (str, optional): Simplified role, as from simplify_role ("CEO", "CFO", "Analyst", ...).
+            since, until (int or tuple[int, int], optional): Inclusive bounds, a year or a (year, quarter).
+
+        Returns:
+            pd.DataFrame: TURN_COLUMNS and the mention's entity, label, text and character span.
+        """
+        return self._lookup("mentions", entity, bank, section, role, speaker, since, until)
+
+    def keyphrase_turns(self, phrase: str, bank=None, section=None, role=None, speaker=None,
+                        since: Optional[Period] = None, until: Optional[Period] = None) -> pd.DataFrame:
+        """
+        The turns whose RAKE keyphrases include `phrase` (same filters as `mentions`).
+        """
+        return self._lookup("keyphrases", phrase, bank, section, role, speaker, since, until)
+
+    def top_entities(self, group_by: Optional[list[str]] = None, n: int = 10, label=None, **filters) -> pd.DataFrame:
+        """
+        The n most mentioned entities (in each group, e.g. ["year", "quarter"] or ["speaker"]).
+
+        Args:
+            group_by (list[str], optional): TURN_COLUMNS to group by.
+            n (int): Entities per group.
+            label (str or list[str], optional): Entity labels to count, e.g. GAZETTEER_LABEL or "ORG".
+            **filters: Equality (or membership) filters on TURN_COLUMNS.
+        """
+        group_by = list(group_by or [])
+        mentions = self._mentions
+        if label is not None:
+            mentions = mentions[mentions["label"].isin(label if isinstance(label, (list, tuple, set)) else [label])]
+        table = self._turns.iloc[mentions["turn_id"].to_numpy(dtype=np.int64)].reset_index(drop=True)
+        table["entity"] = mentions["entity"].to_numpy()
+        for column, value in filters.items():
+            if value is not None:
+                table = table[table[column].isin(value if isinstance(value, (list, tuple, set)) else [value])]
+        counts = table.groupby(group_by + ["entity"], observed=True).size().rename("mentions").reset_index()
+        counts = counts.sort_values(group_by + ["mentions"], ascending=[True] * len(group_by) + [False])
+        return (counts.groupby(group_by, sort=False).head(n) if group_by else counts.head(n)).reset_index(drop=True)
+
+    def quarters(self) -> pd.DataFrame:
+        """
+        The (bank, section, year, quarter) partitions currently in the index.
+        """
+        return self._turns[PARTITION_KEYS].drop_duplicates().sort_values(PARTITION_KEYS, ignore_index=True)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        pd.to_pickle({"turns": self._turns, "mentions": self._mentions, "keyphrases": self._keyphrases}, path)
+
+    @classmethod
+    def load(cls, path: str, extractor: Optional[EntityKeywordExtractor] = None,
+             abbreviations_path: Optional[str] = ABBREVIATIONS_PATH) -> "EntityIndex":
+        saved = pd.read_pickle(path)
+        return cls(extractor, abbreviations_path, saved["turns"], saved["mentions"], saved["keyphrases"])
+
+
+def benchmark_entity_queries(index: EntityIndex, turns_df: pd.DataFrame, queries: list[dict], repeats: int = 20) -> pd.DataFrame:
+    """
+    Times index lookups against re-running the extractor over the matching turns (what the
+    notebook has to do to answer the same question).
+
+    Args:
+        index (EntityIndex): A built index.
+        turns_df (pd.DataFrame): The turns the index was built from.
+        queries (list[dict]): Keyword arguments of EntityIndex.mentions, e.g. {"entity": "CCAR", "role": "CFO", "since": 2023}.
+        repeats (int): Runs per query for the index (the best run is reported).
+
+    Returns:
+        pd.DataFrame: Per query, the index time in ms, the recompute time in ms and the hits of each.
+    """
+    rows = []
+    for query in queries:
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            hits = index.mentions(**query)
+            timings.append(time.perf_counter() - start)
+
+        start = time.perf_counter()
+        recomputed = index.extractor.entities(turns_df["content"].fillna("").astype(str).tolist())
+        key = index._key(query["entity"])
+        recomputed_hits = int((recomputed["entity"].str.lower() == key).sum())
+        recompute_ms = (time.perf_counter() - start) * 1000
+        rows.append({"query": str(query), "index_ms": min(timings) * 1000, "index_hits": len(hits),
+                     "recompute_ms": recompute_ms, "recompute_hits_unfiltered": recomputed_hits})
+    return pd.DataFrame(rows)
@@ -0,0 +1,453 @@
+import re
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..utils.common_helpers import read_yaml_file
+from .transcript_search import ABBREVIATIONS_PATH
+
+# Abbreviations in abbreviations.yaml that name a reported figure (the rest are business lines,
+# regulators, products, ...). Each is matched as the abbreviation or its expansion.
+METRIC_ABBREVIATIONS = [
+    "AOCI", "AUM", "AUS", "CET1", "EPS", "LCR", "NCO", "NII", "NIR", "PCL",
+    "PPNR", "ROE", "ROTE", "ROTCE", "RWA", "SCB", "SLR", "TLAC", "VaR",
+]
+
+# Figures without an abbreviation: metric -> aliases (regex fragments, matched case-insensitively)
+EXTRA_METRIC_ALIASES = {
+    "Net Income": ["net income", "net earnings"],
+    "Revenue": ["net revenues?", "managed revenues?", "revenues?"],
+    "Expense": ["adjusted expenses?", "noninterest expenses?", "non-interest expenses?", "operating expenses?", "expenses?"],
+    "NIM": ["NIM", "net interest margin"],
+    "Efficiency Ratio": ["efficiency ratio", "overhead ratio"],
+    "Book Value Per Share": ["book value per share", "BVPS"],
+    "Deposits": ["average deposits", "deposits"],
+    "Loans": ["average loans", "loans"],
+    "Credit Costs": ["credit costs"],
+    "Reserve Build": ["net reserve build", "reserve build"],
+    "Buybacks": ["share repurchases", "buybacks?", "repurchased"],
+    "Dividend": ["dividends?"],
+}
+
+# Notebook risk factors (Text_Sum.ipynb), counted in the same single pass
+RISK_PATTERNS = {
+    "Credit risk": r"credit risk|loan loss|charge[- ]off|non[- ]performing|delinquency",
+    "Interest rate risk": r"interest rate|rate hike|rate increase|rate risk",
+    "Liquidity risk": r"liquidity",
+    "Market risk": r"market risk|market volatility|market decline",
+    "Operational risk": r"operational risk|operations risk",
+    "Regulatory risk": r"regulatory|regulation|compliance|regulator|Basel|CCAR|SCB",
+    "Reputational risk": r"reputation|reputational",
+    "Cyber risk": r"cyber|cybersecurity|cyber attack|data breach|information security",
+    "Capital adequacy": r"capital adequacy|CET1|capital ratio|capital requirement",
+    "Inflation": r"inflation|price increase|cost pressure",
+    "Economic downturn": r"recession|downturn|slowdown|contraction",
+    "Geopolitical risk": r"geopolitical|war|conflict|Russia|Ukraine|trade tension",
+    "Compliance": r"compliance|non-compliance|KYC|AML",
+    "Fraud": r"fraud|misconduct|scandal",
+    "Technology risk": r"technology risk|IT failure|system outage|digital disruption|tech risk",
+}
+
+METRIC_COLUMNS = [
+    "bank",
+    "source",
+    "section",
+    "year",
+    "quarter",
+    "speaker",
+    "role",
+    "question_answer_group_id",
+    "row",
+    "metric",
+    "metric_name",
+    "value",
+    "unit",
+    "measure",
+    "comparison",
+    "period_type",
+    "period_year",
+    "period_quarter",
+    "match",
+]
+
+# Context columns carried from the source rows into the metrics table, when present
+_KEY_COLUMNS = ["section", "year", "quarter", "speaker", "role", "question_answer_group_id"]
+
+# Texts are joined into one corpus string for a single regex pass; matches never cross this separator
+_ROW_SEPARATOR = "\x00"
+
+_NUMBER = r"\d{1,3}(?:,\d{3})+(?:\.\d+)?|\d+(?:\.\d+)?"
+
+# Between the metric and its value: no sentence end, no other value and no row separator
+_GAP = r"[^.;$%\x00]{0,50}?"
+
+_SCALES = {"trillion": 1e12, "tn": 1e12, "t": 1e12, "billion": 1e9, "bn": 1e9, "b": 1e9,
+           "million": 1e6, "mm": 1e6, "mn": 1e6, "m": 1e6, "thousand": 1e3, "k": 1e3}
+
+_ORDINAL_QUARTERS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+_DECREASE_PATTERN = r"\b(?:down|decreas|declin|fell|lower|reduc|drop)"
+_CHANGE_PATTERN = _DECREASE_PATTERN + r"|\b(?:up|increas|grew|grow|rose|higher|improv)"
+_GUIDANCE_PATTERN = r"\bto be\b|\bexpect|\bguid|\boutlook|\brun[\s\-]*rate"
+
+# Scale words split by the PDF text layer ("bi llion", "mil lion")
+_SPLIT_SCALE_PATTERN = r"\b(tr|b|m)\s?i\s?l\s?l\s?i\s?o\s?n\b"
+
+
+def _alias_pattern(alias: str) -> str:
+    """
+    Turns an expansion such as "Risk-Weighted Assets" into a pattern that accepts either spaces
+    or hyphens between its words ("risk weighted assets", "risk -weighted assets").
+    """
+    words = re.split(r"[\s\-]+", alias.strip())
+    return r"[\s\-]+".join(re.escape(word) for word in words)
+
+
+def load_metric_aliases(filepath: str = ABBREVIATIONS_PATH,
+                        abbreviations: Optional[list[str]] = None) -> dict[str, tuple[str, list[str], list[str]]]:
+    """
+    Seeds the metric grammar from abbreviations.yaml and EXTRA_METRIC_ALIASES.
+
+    Args:
+        filepath (str): Path to the abbreviations YAML file.
+        abbreviations (list[str], optional): Abbreviations to treat as metrics. Defaults to METRIC_ABBREVIATIONS.
+
+    Returns:
+        dict[str, tuple[str, list[str], list[str]]]: Metric -> (display name, case-sensitive aliases,
+        case-insensitive aliases), aliases as regex fragments.
+    """
+    expansions = {str(key): str(value) for key, value in read_yaml_file(filepath).items()}
+    metrics = {}
+    for abbreviation in abbreviations or METRIC_ABBREVIATIONS:
+        if abbreviation not in expansions:
+            continue
+        # Abbreviations are matched case-sensitively (so "roe" or "aus" in prose are not metrics), with a plural "s"
+        metrics[abbreviation] = (expansions[abbreviation], [re.escape(abbreviation) + "s?"], [_alias_pattern(expansions[abbreviation])])
+    for metric, aliases in EXTRA_METRIC_ALIASES.items():
+        sensitive = [alias for alias in aliases if alias.isupper()]
+        insensitive = [alias if "?" in alias else _alias_pattern(alias) for alias in aliases if not alias.isupper()]
+        metrics[metric] = (metric, sensitive, insensitive)
+    return metrics
+
+
+def load_quarter_aliases(filepath: str = ABBREVIATIONS_PATH) -> dict[str, int]:
+    """
+    Reads the quarter abbreviations ("1Q": "First Quarter", ...) from abbreviations.yaml.
+
+    Returns:
+        dict[str, int]: Lowercased abbreviation or ordinal word -> quarter number.
+    """
+    aliases = dict(_ORDINAL_QUARTERS)
+    for abbreviation, expansion in read_yaml_file(filepath).items():
+        match = re.fullmatch(r"([1-4])Q", str(abbreviation))
+        if match:
+            aliases[str(abbreviation).lower()] = int(match.group(1))
+            aliases[str(expansion).split()[0].lower()] = int(match.group(1))
+    return aliases
+
+
+# A period named right before a metric ("full-year 2022 NII", "4Q23 revenue"), searched backwards from the metric
+_PERIOD_PATTERN = re.compile(
+    r"\b(?P<period>full[\s\-]*year|(?:first|second|third|fourth)[\s\-]+quarter|[1-4]q|fy)"
+    r"(?:[\s']*(?P<period_year>(?:19|20)?\d{2}))?\s+$"
+)
+
+
+def _metric_alternatives(metrics: dict[str, tuple[str, list[str], list[str]]]) -> list[str]:
+    # The alias fragments only hold escaped words, "?" and [\s\-], so lowercasing them is safe.
+    # Within a metric the longest aliases come first ("net revenues" before "revenues").
+    return [
+        "|".join([alias.lower() for alias in sensitive] + sorted((alias.lower() for alias in insensitive), key=len, reverse=True))
+        for _, sensitive, insensitive in metrics.values()
+    ]
+
+
+def build_metric_grammar(metrics: dict[str, tuple[str, list[str], list[str]]]) -> re.Pattern:
+    """
+    Compiles every metric into one pattern, run over lowercased text:
+
+        <metric alias> <gap> ($<number> [scale] | <number> <%|bps>) [comparison]
+
+    The pattern is compiled without re.IGNORECASE, and the aliases of all metrics form a single
+    non-capturing alternation: on this grammar Python's regex engine is about four times slower with
+    IGNORECASE and another four times slower with a named group per metric. The text is lowercased
+    instead, and the metric, the case-sensitive aliases and any period in front of the alias are
+    resolved per match (MetricExtractor._scan).
+    """
+    aliases = "|".join(f"(?:{alternatives})" for alternatives in _metric_alternatives(metrics))
+    value = (rf"(?:(?P<currency>\$)\s?(?P<amount>{_NUMBER})(?:\s?(?P<scale>trillion|billion|million|thousand|tn|bn|mm|mn|[tbmk])\b)?"
+             rf"|(?P<ratio>{_NUMBER})\s?(?P<unit>%|percent\b|basis points?\b|bps\b|bp\b))")
+    comparison = r"(?:[\s,]*(?P<comparison>year[\s\-]*(?:on|over)[\s\-]*year|yoy|quarter[\s\-]*(?:on|over)[\s\-]*quarter|qoq|sequentially))?"
+    return re.compile(rf"\b(?P<alias>{aliases})\b(?P<gap>{_GAP}){value}{comparison}")
+
+
+def _join_texts(texts: pd.Series) -> tuple[str, str, np.ndarray]:
+    """
+    Joins a column of texts into one corpus string for a single regex pass.
+
+    Returns:
+        tuple[str, str, np.ndarray]: The corpus, the same corpus lowercased (with identical offsets)
+        and the offset at which each text starts.
+    """
+    texts = texts.fillna("").astype(str).str.replace(_ROW_SEPARATOR, " ", regex=False)
+    texts = texts.str.replace(_SPLIT_SCALE_PATTERN, r"\1illion", case=False, regex=True)
+    lengths = texts.str.len().to_numpy() + len(_ROW_SEPARATOR)
+    starts = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+    corpus = _ROW_SEPARATOR.join(texts.tolist())
+    lowered = corpus.lower()
+    if len(lowered) != len(corpus):
+        # A few non-ASCII characters lowercase to two; keep those as they are so the offsets line up
+        lowered = "".join(character if len(character.lower()) != 1 else character.lower() for character in corpus)
+    return corpus, lowered, starts
+
+
+def _rows_of(match_starts: np.ndarray, starts: np.ndarray) -> np.ndarray:
+    # The text a match belongs to is the last one starting at or before it
+    return np.searchsorted(starts, match_starts, side="right") - 1
+
+
+class MetricExtractor:
+    """
+    Pulls reported figures (CET1, NII, ROTCE, net income, ...) out of transcripts and filings.
+
+    Text_Sum.ipynb calls re.search once per text and per metric. Here the whole grammar is one
+    compiled pattern, and a column of texts is joined into a single string so the pattern runs once
+    over the corpus; match offsets are mapped back to their rows with np.searchsorted, and units,
+    signs and periods are normalized column-wise on the match table.
+
+    Normalized values:
+        - unit "usd": dollars, with the scale applied ("$3.1 billion" -> 3.1e9)
+        - unit "percent": percentage points ("15.3%" -> 15.3)
+        - unit "bps": basis points
+    A value is a "change" (and negative when the text says down/lower/declined) when a direction word
+    sits between the metric and the value, a comparison (year-on-year, sequentially) follows it or
+    it is in basis points, and "guidance" when the words between say so ("NII to be approximately ...", "expected").
+    The period defaults to the quarter of the document unless the text names one ("full-year 2022 NII").
+
+    Example:
+        extractor = MetricExtractor()
+        metrics_df = extractor.extract_turns(qna_df, BankType.JPMORGAN.value, "qna")
+    """
+    def __init__(self, abbreviations_path: str = ABBREVIATIONS_PATH, abbreviations: Optional[list[str]] = None):
+        self.metrics = load_metric_aliases(abbreviations_path, abbreviations)
+        self._metric_keys = np.array(list(self.metrics), dtype=object)
+        self._metric_names = np.array([name for name, _, _ in self.metrics.values()], dtype=object)
+        self.pattern = build_metric_grammar(self.metrics)
+        # Tells which metric a matched alias belongs to: one named group per metric
+        self._metric_matcher = re.compile("|".join(
+            f"(?P<m{index}>{alternatives})" for index, alternatives in enumerate(_metric_alternatives(self.metrics))
+        ))
+        # Metrics with case-sensitive aliases: index -> (case-sensitive aliases, lowercased other aliases)
+        self._case_patterns = {
+            index: (re.compile("|".join(sensitive)), re.compile("|".join(alias.lower() for alias in insensitive)))
+            for index, (_, sensitive, insensitive) in enumerate(self.metrics.values()) if sensitive
+        }
+        self._quarter_aliases = load_quarter_aliases(abbreviations_path)
+        # The risk patterns are plain words, so they are lowercased like the grammar
+        self._risk_patterns = {risk: re.compile(pattern.lower()) for risk, pattern in RISK_PATTERNS.items()}
+
+    def _scan(self, texts: pd.Series) -> tuple[np.ndarray, pd.DataFrame]:
+        """
+        Runs the grammar once over all texts.
+
+        Returns:
+            tuple[np.ndarray, pd.DataFrame]: Positional row of each match, and the match table
+            (metric index, grammar groups, period groups and the original text of the match).
+        """
+        corpus, lowered, starts = _join_texts(texts)
+        records = []
+        match_starts = []
+        for match in self.pattern.finditer(lowered):
+            start, end = match.span("alias")
+            metric_index = self._metric_matcher.fullmatch(lowered, start, end).lastindex - 1
+            if metric_index in self._case_patterns:
+                sensitive, insensitive = self._case_patterns[metric_index]
+                # "ROE" is a metric, "roe" is not; "return on equity" is either way
+                if not (sensitive.fullmatch(corpus, start, end) or insensitive.fullmatch(lowered, start, end)):
+                    continue
+            period = _PERIOD_PATTERN.search(lowered, max(start - 20, 0), start)
+            record = match.groupdict()
+            record["metric_index"] = metric_index
+            record["period"] = period.group("period") if period else None
+            record["period_year"] = period.group("period_year") if period else None
+            record["match"] = corpus[period.start() if period else start:match.end()]
+            records.append(record)
+            match_starts.append(start)
+        return _rows_of(np.array(match_starts, dtype=np.int64), starts), pd.DataFrame(records)
+
+    def _normalize(self, groups: pd.DataFrame) -> pd.DataFrame:
+        metric_index = groups["metric_index"].to_numpy()
+
+        amount = pd.to_numeric(groups["amount"].str.replace(",", "", regex=False))
+        ratio = pd.to_numeric(groups["ratio"].str.replace(",", "", regex=False))
+        scale = groups["scale"].map(_SCALES).fillna(1.0)
+        unit = np.where(groups["currency"].notna(), "usd",
+                        np.where(groups["unit"].str.startswith("b", na=False), "bps", "percent"))
+        value = np.where(unit == "usd", amount * scale, ratio)
+
+        gap = groups["gap"].fillna("")
+        comparison = groups["comparison"].str.replace(r"[\s\-]+", "-", regex=True)
+        comparison = comparison.replace({"year-on-year": "yoy", "year-over-year": "yoy",
+                                         "quarter-on-quarter": "qoq", "quarter-over-quarter": "qoq", "sequentially": "qoq"})
+        # A move in basis points ("ROE by 80 basis points") is a change even without a direction word
+        is_change = gap.str.contains(_CHANGE_PATTERN, regex=True) | comparison.notna() | (unit == "bps")
+        is_decrease = gap.str.contains(_DECREASE_PATTERN, regex=True)
+        is_guidance = gap.str.contains(_GUIDANCE_PATTERN, regex=True)
+        value = np.where(is_change & is_decrease, -value, value)
+
+        period = groups["period"].str.replace(r"[\s\-]+", " ", regex=True)
+        period_year = pd.to_numeric(groups["period_year"])
+        period_year = period_year.where(period_year >= 100, period_year + 2000)
+        period_quarter = period.str.split().str[0].map(self._quarter_aliases)
+
+        return pd.DataFrame({
+            "metric": self._metric_keys[metric_index],
+            "metric_name": self._metric_names[metric_index],
+            "value": value.astype(float),
+            "unit": unit,
+            "measure": np.where(is_guidance, "guidance", np.where(is_change, "change", "level")),
+            "comparison": comparison,
+            "period_type": np.where(period.str.startswith(("full", "fy"), na=False), "full_year", "quarter"),
+            "period_year": period_year,
+            "period_quarter": period_quarter,
+            "match": groups["match"],
+        })
+
+    def extract(self, texts_df: pd.DataFrame, bank: str, source: str, text_column: str = "content") -> pd.DataFrame:
+        """
+        Extracts every metric mention from a DataFrame of texts.
+
+        Args:
+            texts_df (pd.DataFrame): Rows with a text column and (some of) the key columns: a qna_df,
+                a discussion_df or a FilingSectionExtractor sections DataFrame.
+            bank (str): Bank name, e.g. BankType.GOLDMAN_SACHS.value.
+            source (str): Where the texts come from, e.g. "qna", "discussion" or "10q_k".
+            text_column (str): Column holding the texts.
+
+        Returns:
+            pd.DataFrame: One row per metric mention, with METRIC_COLUMNS. 'row' is the positional
+            index of the source row; the period falls back to the document's year and quarter.
+        """
+        if texts_df.empty:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        rows, groups = self._scan(texts_df[text_column])
+        if groups.empty:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        metrics_df = self._normalize(groups)
+        metrics_df["row"] = rows
+
+        keys = texts_df.reindex(columns=_KEY_COLUMNS).iloc[rows].reset_index(drop=True)
+        if "section" not in texts_df:
+            keys["section"] = source
+        metrics_df = pd.concat([keys, metrics_df], axis=1)
+        metrics_df["bank"] = bank
+        metrics_df["source"] = source
+        document_year = pd.to_numeric(metrics_df["year"], errors="coerce")
+        document_quarter = pd.to_numeric(metrics_df["quarter"], errors="coerce")
+        # "full-year NII" names the year of the call; "4Q NII" the quarter of the call's year
+        metrics_df["period_year"] = metrics_df["period_year"].fillna(document_year)
+        named_year = metrics_df["period_type"].eq("full_year") | metrics_df["period_quarter"].notna()
+        metrics_df["period_quarter"] = metrics_df["period_quarter"].fillna(document_quarter.where(~named_year))
+        metrics_df["period_year"] = metrics_df["period_year"].astype("Int16")
+        metrics_df["period_quarter"] = metrics_df["period_quarter"].astype("Int8")
+        return metrics_df[METRIC_COLUMNS]
+
+    def extract_turns(self, turns_df: pd.DataFrame, bank: str, section: str) -> pd.DataFrame:
+        """
+        Extracts the metrics mentioned in a qna_df ("qna") or discussion_df ("discussion").
+        """
+        return self.extract(turns_df, bank, section)
+
+    def extract_sections(self, sections_df: pd.DataFrame, bank: Optional[str] = None) -> pd.DataFrame:
+        """
+        Extracts the metrics in filing sections (FilingSectionExtractor.get_sections_df), per document type.
+        """
+        frames = []
+        for (section_bank, document_type), group in sections_df.groupby(["bank", "document_type"], sort=False):
+            metrics_df = self.extract(group, bank or section_bank, document_type)
+            metrics_df["row"] = group.index.to_numpy()[metrics_df["row"].to_numpy(dtype=int)]
+            frames.append(metrics_df)
+        if not frames:
+            return pd.DataFrame(columns=METRIC_COLUMNS)
+        return pd.concat(frames, ignore_index=True)
+
+    def count_risks(self, texts_df: pd.DataFrame, text_column: str = "content") -> pd.DataFrame:
+        """
+        Counts the RISK_PATTERNS mentions of every text, as the notebook's extract_risks does.
+
+        Risks share terms ("compliance" counts towards both regulatory risk and compliance), so each
+        risk pattern makes its own pass, but over the whole joined column rather than text by text.
+
+        Returns:
+            pd.DataFrame: One column per risk factor, aligned with texts_df.
+        """
+        _, lowered, starts = _join_texts(texts_df[text_column])
+        counts = {
+            risk: np.bincount(
+                _rows_of(np.array([match.start() for match in pattern.finditer(lowered)], dtype=np.int64), starts),
+                minlength=len(texts_df),
+            )
+            for risk, pattern in self._risk_patterns.items()
+        }
+        return pd.DataFrame(counts, index=texts_df.index)
+
+
+def metrics_by_quarter(metrics_df: pd.DataFrame, measure: str = "level") -> pd.DataFrame:
+    """
+    Pivots the metrics table to the median stated value per bank, period and metric/unit.
+    """
+    selected = metrics_df[metrics_df["measure"] == measure]
+    return (selected.groupby(["bank", "period_year", "period_quarter", "metric", "unit"], observed=True)["value"]
+            .median()
+            .unstack(["metric", "unit"]))
+
+
+def _extract_per_text(texts: pd.Series, metrics: dict[str, tuple[str, list[str], list[str]]]) -> int:
+    # The notebook approach: one pattern per metric, applied text by text
+    value = r"\s*(?:was|of|were)?\s*(?:approximately\s*)?\$?([0-9.,]+)"
+    patterns = [re.compile(rf"\b(?:{'|'.join(sensitive + insensitive)})\b{value}", re.IGNORECASE)
+                for _, sensitive, insensitive in metrics.values()]
+    found = 0
+    for text in texts:
+        if isinstance(text, str):
+            for pattern in patterns:
+                found += len(pattern.findall(text))
+    return found
+
+
+def benchmark_metric_extraction(extractor: MetricExtractor, turns: dict[str, pd.DataFrame], repeats: int = 3) -> pd.DataFrame:
+    """
+    Times the single-pass extractor against the notebook's per-text, per-metric regex loop.
+
+    Args:
+        extractor (MetricExtractor): The extractor to time.
+        turns (dict[str, pd.DataFrame]): Name -> texts DataFrame (e.g. "JP Morgan qna" -> qna_df).
+        repeats (int): Runs per corpus (the best run is reported).
+
+    Returns:
+        pd.DataFrame: Per corpus, the rows, characters, seconds for each approach and mentions found.
+    """
+    def best_of(function):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        return min(timings), result
+
+    rows = []
+    for name, texts_df in turns.items():
+        engine_seconds, metrics_df = best_of(lambda: extractor.extract(texts_df, name, name))
+        loop_seconds, loop_found = best_of(lambda: _extract_per_text(texts_df["content"], extractor.metrics))
+        rows.append({
+            "corpus": name,
+            "rows": len(texts_df),
+            "characters": int(texts_df["content"].fillna("").astype(str).str.len().sum()),
+            "engine_seconds": engine_seconds,
+            "engine_mentions": len(metrics_df),
+            "per_text_seconds": loop_seconds,
+            "per_text_mentions": loop_found,
+        })
+    return pd.DataFrame(rows)
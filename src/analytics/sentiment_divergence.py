@@ -0,0 +1,350 @@
+import os
+import time
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from .speaker_index import simplify_role
+
+SECTIONS = ("discussion", "qna")
+
+# Sentence-level scores as stored in the index
+SENTENCE_COLUMNS = ["bank", "section", "year", "quarter", "speaker", "role_simple", "sentence", "label", "score", "polarity"]
+
+# Per (bank, section, year, quarter) sums kept for the divergence table
+PARTITION_COLUMNS = ["bank", "section", "year", "quarter", "sentences", "polarity_sum", "negative", "positive"]
+
+DIVERGENCE_KEYS = ["bank", "year", "quarter"]
+
+# Label -> sign of its score (FinBERT-tone labels are capitalized, ProsusAI's lowercase)
+LABEL_SIGNS = {"positive": 1.0, "negative": -1.0, "neutral": 0.0}
+
+
+def sentence_scores(scored_df: pd.DataFrame, bank: str, section: str, model_key: Optional[str] = None,
+                    text_column: Optional[str] = None, default_label: Optional[str] = None) -> pd.DataFrame:
+    """
+    Normalizes a scored DataFrame into the sentence table of SentimentDivergenceIndex.
+
+    Accepts the notebook outputs as they are: sentence files with '<model_key>_label' and
+    '<model_key>_score' columns (e.g. df_prosus_negative_gs_management_discussion_sentences.csv)
+    and turn files with 'label' and 'score' (e.g. df_scored_qa_gs_prosus.csv, where each turn is
+    treated as one sentence). Polarity is the score signed by the label (neutral is 0); a file
+    without scores counts each sentence as 1.
+
+    Args:
+        scored_df (pd.DataFrame): Scored sentences or turns with 'year' and 'quarter'.
+        bank (str): Bank name.
+        section (str): "discussion" or "qna".
+        model_key (str, optional): Column prefix of the sentence files ("prosus" or "kust").
+        text_column (str, optional): Defaults to 'sentence' when present, else 'content'.
+        default_label (str, optional): Label of every row of a file without a label column
+            (e.g. "negative" for the negative_sentiments sentence files saved without labels).
+
+    Returns:
+        pd.DataFrame: SENTENCE_COLUMNS.
+    """
+    label_column = f"{model_key}_label" if model_key and f"{model_key}_label" in scored_df else "label"
+    score_column = f"{model_key}_score" if model_key and f"{model_key}_score" in scored_df else "score"
+    text_column = text_column or ("sentence" if "sentence" in scored_df else "content")
+    if label_column in scored_df:
+        labels = scored_df[label_column].astype(str).str.lower()
+    elif default_label is not None:
+        labels = pd.Series(default_label.lower(), index=scored_df.index)
+    else:
+        raise ValueError(f"No '{label_column}' column to score {bank} {section} sentences with; pass default_label")
+    if score_column in scored_df:
+        scores = pd.to_numeric(scored_df[score_column], errors="coerce").fillna(0.0).to_numpy(dtype=np.float64)
+    else:
+        scores = np.ones(len(scored_df))
+    roles = scored_df["role"] if "role" in scored_df else pd.Series(None, index=scored_df.index)
+    unique_roles = roles.drop_duplicates()
+    return pd.DataFrame({
+        "bank": bank,
+        "section": section,
+        "year": pd.to_numeric(scored_df["year"]).astype("int16").to_numpy(),
+        "quarter": pd.to_numeric(scored_df["quarter"]).astype("int8").to_numpy(),
+        "speaker": (scored_df["speaker"] if "speaker" in scored_df else pd.Series("Unknown", index=scored_df.index)).fillna("Unknown").to_numpy(),
+        "role_simple": roles.map(dict(zip(unique_roles, unique_roles.map(simplify_role)))).fillna("Unknown").to_numpy(),
+        "sentence": scored_df[text_column].astype(str).to_numpy(),
+        "label": labels.to_numpy(),
+        "score": scores,
+        "polarity": scores * labels.map(LABEL_SIGNS).fillna(0.0).to_numpy(dtype=np.float64),
+    })
+
+
+def _group_codes(frame: pd.DataFrame, keys: list[str]) -> tuple[np.ndarray, pd.DataFrame]:
+    # One integer code per distinct key combination, and the key values of each code
+    codes, _ = pd.MultiIndex.from_frame(frame[keys]).factorize()
+    _, first_rows = np.unique(codes, return_index=True)
+    return codes, frame[keys].iloc[first_rows].reset_index(drop=True)
+
+
+def _partition_sums(sentences: pd.DataFrame) -> pd.DataFrame:
+    codes, groups = _group_codes(sentences, ["bank", "section", "year", "quarter"])
+    labels = sentences["label"].to_numpy()
+    n = len(groups)
+    groups["sentences"] = np.bincount(codes, minlength=n)
+    groups["polarity_sum"] = np.bincount(codes, weights=sentences["polarity"].to_numpy(dtype=np.float64), minlength=n)
+    groups["negative"] = np.bincount(codes, weights=(labels == "negative"), minlength=n)
+    groups["positive"] = np.bincount(codes, weights=(labels == "positive"), minlength=n)
+    return groups
+
+
+class SentimentDivergenceIndex:
+    """
+    Sentence-level sentiment scores of prepared remarks and Q&A, with the divergence between them.
+
+    Divergence is the mean polarity of the Q&A sentences minus that of the management discussion,
+    per (bank, year, quarter) or any finer grouping. Per (bank, section, year, quarter) counts and
+    polarity sums are kept alongside the sentences; they are sums, so adding a quarter only
+    reduces that quarter's sentences (with np.bincount over integer group codes) and the
+    divergence and quarter-over-quarter tables are derived from a few hundred rows per bank, not
+    from a merge of the scored CSVs and row-wise apply for every plot. Derived tables are cached
+    until the next `add_scores`.
+
+    Example:
+        index = SentimentDivergenceIndex()
+        index.add_scores(sentence_scores(gs_discussion_sentences, BankType.GOLDMAN_SACHS.value, "discussion", "prosus"))
+        index.add_scores(sentence_scores(gs_qna_scored, BankType.GOLDMAN_SACHS.value, "qna"))
+        index.quarter_over_quarter(window=4)
+    """
+    def __init__(self, sentences: Optional[pd.DataFrame] = None, partitions: Optional[pd.DataFrame] = None):
+        self._sentences = sentences if sentences is not None else pd.DataFrame(columns=SENTENCE_COLUMNS)
+        self._partitions = partitions if partitions is not None else pd.DataFrame(columns=PARTITION_COLUMNS)
+        self._cache = {}
+
+    @property
+    def sentences(self) -> pd.DataFrame:
+        return self._sentences
+
+    @property
+    def partitions(self) -> pd.DataFrame:
+        return self._partitions
+
+    def add_scores(self, sentences: pd.DataFrame) -> "SentimentDivergenceIndex":
+        """
+        Adds the sentences of one or more (bank, section, quarter) partitions, as produced by
+        `sentence_scores`, replacing any of those partitions already in the index.
+        """
+        if sentences.empty:
+            return self
+        sums = _partition_sums(sentences)
+        if not self._partitions.empty:
+            keys = ["bank", "section", "year", "quarter"]
+            new_partitions = pd.MultiIndex.from_frame(sums[keys])
+            kept_sentences = ~pd.MultiIndex.from_frame(self._sentences[keys]).isin(new_partitions)
+            kept_partitions = ~pd.MultiIndex.from_frame(self._partitions[keys]).isin(new_partitions)
+            sentences = pd.concat([self._sentences[kept_sentences], sentences], ignore_index=True)
+            sums = pd.concat([self._partitions[kept_partitions], sums], ignore_index=True)
+        self._sentences = sentences.reset_index(drop=True)
+        self._partitions = sums.sort_values(["bank", "year", "quarter", "section"], ignore_index=True)
+        self._cache = {}
+        return self
+
+    def divergence(self, by: Optional[list[str]] = None) -> pd.DataFrame:
+        """
+        Mean polarity and negative share of each section, and their gap (Q&A minus discussion).
+
+        Args:
+            by (list[str], optional): Grouping keys, DIVERGENCE_KEYS by default (served from the
+                partition sums); finer keys such as ["bank", "year", "quarter", "role_simple"] are
+                reduced from the sentences.
+
+        Returns:
+            pd.DataFrame: The keys, then '<section>_sentences', '<section>_polarity' and
+            '<section>_negative_share' for both sections, 'divergence' and 'negative_share_gap'.
+            A quarter with no sentences in one section has NaN for that section and the gaps.
+        """
+        by = list(by or DIVERGENCE_KEYS)
+        cache_key = ("divergence", tuple(by))
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        if set(by) <= set(DIVERGENCE_KEYS):
+            source = self._partitions
+            counts, polarity, negative = source["sentences"], source["polarity_sum"], source["negative"]
+        else:
+            source = self._sentences
+            counts = np.ones(len(source))
+            polarity = source["polarity"]
+            negative = source["label"] == "negative"
+        codes, groups = _group_codes(source, by)
+        n = len(groups)
+        section = source["section"].to_numpy()
+        for name in SECTIONS:
+            in_section = section == name
+            section_counts = np.bincount(codes, weights=np.where(in_section, counts, 0), minlength=n)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                groups[f"{name}_sentences"] = section_counts.astype(np.int64)
+                groups[f"{name}_polarity"] = np.bincount(codes, weights=np.where(in_section, polarity, 0), minlength=n) / section_counts
+                groups[f"{name}_negative_share"] = np.bincount(codes, weights=np.where(in_section, negative, 0), minlength=n) / section_counts
+        groups["divergence"] = groups["qna_polarity"] - groups["discussion_polarity"]
+        groups["negative_share_gap"] = groups["qna_negative_share"] - groups["discussion_negative_share"]
+        result = groups.sort_values(by, ignore_index=True)
+        self._cache[cache_key] = result
+        return result
+
+    def quarter_over_quarter(self, window: int = 4, by: Optional[list[str]] = None) -> pd.DataFrame:
+        """
+        Quarter-over-quarter changes of the divergence and its rolling mean.
+
+        The previous quarter is the calendar quarter before, so a missing quarter leaves a NaN
+        delta rather than comparing two quarters apart.
+
+        Args:
+            window (int): Calendar quarters in the rolling mean of the divergence (fewer rows when a quarter is missing).
+            by (list[str], optional): Keys besides year and quarter (default ["bank"]).
+
+        Returns:
+            pd.DataFrame: The divergence table with 'divergence_qoq', 'negative_share_gap_qoq'
+            and 'divergence_rolling' columns.
+        """
+        series_keys = list(by or ["bank"])
+        cache_key = ("quarter_over_quarter", window, tuple(series_keys))
+        if cache_key in self._cache:
+            return self._cache[cache_key]
+
+        table = self.divergence(series_keys + ["year", "quarter"]).copy()
+        series, _ = _group_codes(table, series_keys) if series_keys else (np.zeros(len(table), dtype=np.int64), None)
+        period = table["year"].to_numpy(dtype=np.int64) * 4 + table["quarter"].to_numpy(dtype=np.int64) - 1
+        # The table is sorted by series then period, so the previous row is the previous quarter when it is one period back
+        follows = np.zeros(len(table), dtype=bool)
+        follows[1:] = (series[1:] == series[:-1]) & (period[1:] == period[:-1] + 1)
+        for column in ("divergence", "negative_share_gap"):
+            values = table[column].to_numpy(dtype=np.float64)
+            delta = np.full(len(values), np.nan)
+            delta[1:] = values[1:] - values[:-1]
+            table[f"{column}_qoq"] = np.where(follows, delta, np.nan)
+
+        # Rolling mean within each series: windowed differences of per-series cumulative sums
+        values = table["divergence"].to_numpy(dtype=np.float64)
+        present = ~np.isnan(values)
+        cumulative_sum = np.cumsum(np.where(present, values, 0.0))
+        cumulative_count = np.cumsum(present)
+        # The window covers the last `window` calendar quarters, not rows: it starts at the series' first
+        # row at most window - 1 periods back, so a missing quarter shortens it. series * span + period
+        # is sorted and keeps every window inside its own series.
+        first_period = int(period.min()) if len(period) else 0
+        span = (int(period.max()) - first_period if len(period) else 0) + window
+        series_period = series.astype(np.int64) * span + (period - first_period)
+        lower = np.searchsorted(series_period, series_period - window + 1, side="left") - 1
+        window_sum = cumulative_sum - np.where(lower >= 0, cumulative_sum[np.maximum(lower, 0)], 0.0)
+        window_count = cumulative_count - np.where(lower >= 0, cumulative_count[np.maximum(lower, 0)], 0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            table["divergence_rolling"] = np.where(window_count > 0, window_sum / window_count, np.nan)
+        self._cache[cache_key] = table
+        return table
+
+    def top_contributors(self, n: int = 5, by: Optional[list[str]] = None, **filters) -> pd.DataFrame:
+        """
+        The sentences that move each quarter's divergence the most in its own direction.
+
+        A Q&A sentence contributes polarity / Q&A sentences to the divergence, a discussion sentence
+        minus polarity / discussion sentences. When Q&A is more negative than the prepared remarks
+        (divergence < 0), the top contributors are the most negative Q&A sentences and the most
+        positive discussion sentences, and the other way round. All groups are ranked in one sort.
+
+        Args:
+            n (int): Sentences per group.
+            by (list[str], optional): Groups, DIVERGENCE_KEYS by default.
+            **filters: Equality (or membership, when given a list) filters on SENTENCE_COLUMNS.
+
+        Returns:
+            pd.DataFrame: The sentences with 'contribution' and 'rank' columns.
+        """
+        by = list(by or DIVERGENCE_KEYS)
+        sentences = self._sentences
+        mask = np.ones(len(sentences), dtype=bool)
+        for column, value in filters.items():
+            if value is not None:
+                mask &= sentences[column].isin(value if isinstance(value, (list, tuple, set)) else [value]).to_numpy()
+
+        table = self.divergence(by)
+        codes, groups = _group_codes(sentences, by)
+        # Map the sentence groups onto the rows of the divergence table
+        rows = pd.MultiIndex.from_frame(table[by]).get_indexer(pd.MultiIndex.from_frame(groups))[codes]
+        is_qna = (sentences["section"] == "qna").to_numpy()
+        section_counts = np.where(is_qna, table["qna_sentences"].to_numpy()[rows], table["discussion_sentences"].to_numpy()[rows])
+        contribution = np.where(is_qna, 1.0, -1.0) * sentences["polarity"].to_numpy(dtype=np.float64) / np.maximum(section_counts, 1)
+        direction = np.sign(np.nan_to_num(table["divergence"].to_numpy()[rows]))
+        strength = np.where(direction == 0, np.abs(contribution), contribution * direction)
+
+        selected = np.flatnonzero(mask & (strength > 0))
+        order = selected[np.lexsort((-strength[selected], codes[selected]))]
+        group_of = codes[order]
+        group_start = np.r_[0, np.flatnonzero(group_of[1:] != group_of[:-1]) + 1]
+        rank = np.arange(len(order)) - np.repeat(group_start, np.diff(np.r_[group_start, len(order)]))
+        keep = order[rank < n]
+        result = sentences.iloc[keep].assign(contribution=contribution[keep], rank=rank[rank < n] + 1)
+        return result.sort_values(by + ["rank"], ignore_index=True)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        pd.to_pickle({"sentences": self._sentences, "partitions": self._partitions}, path)
+
+    @classmethod
+    def load(cls, path: str) -> "SentimentDivergenceIndex":
+        saved = pd.read_pickle(path)
+        return cls(saved["sentences"], saved["partitions"])
+
+
+def rowwise_divergence(sentences: pd.DataFrame) -> pd.DataFrame:
+    """
+    The pandas baseline: per-row polarity with apply, a groupby per section and a merge.
+    """
+    sentences = sentences.copy()
+    sentences["polarity"] = sentences.apply(lambda row: row["score"] * LABEL_SIGNS.get(row["label"], 0.0), axis=1)
+    sentences["is_negative"] = sentences.apply(lambda row: row["label"] == "negative", axis=1)
+    per_section = {
+        name: sentences[sentences["section"] == name].groupby(DIVERGENCE_KEYS)
+        .agg(polarity=("polarity", "mean"), negative_share=("is_negative", "mean")).add_prefix(f"{name}_").reset_index()
+        for name in SECTIONS
+    }
+    merged = per_section["discussion"].merge(per_section["qna"], on=DIVERGENCE_KEYS, how="outer")
+    merged["divergence"] = merged["qna_polarity"] - merged["discussion_polarity"]
+    return merged
+
+
+def benchmark_divergence(sentences: pd.DataFrame, repeats: int = 5) -> pd.DataFrame:
+    """
+    Times the divergence tables against the row-wise pandas baseline, and the incremental
+    update of one new quarter against rebuilding the index.
+
+    Args:
+        sentences (pd.DataFrame): SENTENCE_COLUMNS, e.g. many banks x quarters.
+        repeats (int): Runs per measurement (the best run is reported).
+
+    Returns:
+        pd.DataFrame: One row per measurement, in ms.
+    """
+    def best_of(function):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            function()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000
+
+    period = sentences["year"].astype(int) * 4 + sentences["quarter"].astype(int)
+    latest = (period == period.max()).to_numpy()
+
+    def incremental():
+        index = SentimentDivergenceIndex(*base_state)
+        index.add_scores(sentences[latest])
+        index.quarter_over_quarter()
+
+    def rebuild():
+        SentimentDivergenceIndex().add_scores(sentences).quarter_over_quarter()
+
+    base = SentimentDivergenceIndex().add_scores(sentences[~latest])
+    base_state = (base.sentences, base.partitions)
+    full = SentimentDivergenceIndex().add_scores(sentences)
+    return pd.DataFrame([
+        {"measurement": "rowwise_pandas_divergence", "ms": best_of(lambda: rowwise_divergence(sentences))},
+        {"measurement": "index_build", "ms": best_of(lambda: SentimentDivergenceIndex().add_scores(sentences))},
+        {"measurement": "divergence_uncached", "ms": best_of(lambda: SentimentDivergenceIndex(full.sentences, full.partitions).divergence())},
+        {"measurement": "top_contributors", "ms": best_of(lambda: full.top_contributors(5))},
+        {"measurement": "add_latest_quarter_and_qoq", "ms": best_of(incremental)},
+        {"measurement": "rebuild_and_qoq", "ms": best_of(rebuild)},
+    ])
@@ -0,0 +1,246 @@
+import os
+import re
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+# Dimensions kept in the rollup, from coarsest to finest
+DIMENSIONS = ["bank", "section", "year", "quarter", "role_simple", "company", "speaker", "content_type", "topic"]
+MEASURES = ["turns", "word_count", "sentence_count"]
+PARTITION_KEYS = ["bank", "section", "year", "quarter"]
+
+# A sentence ends with ., ! or ? followed by whitespace or the end of the text
+_SENTENCE_END_PATTERN = r"[.!?]+(?:\s|$)"
+
+# Abbreviated roles (as in the scored Q&A files and some GS turns, e.g. "CFO" or "CEO, Chairman"),
+# checked in this order before the full titles
+_ROLE_ABBREVIATIONS = [("ceo", "CEO"), ("cfo", "CFO"), ("coo", "COO"), ("hir", "IR"), ("ir", "IR")]
+_ROLE_WORD_PATTERN = re.compile(r"[a-z]+")
+
+
+def simplify_role(role) -> str:
+    """
+    Simplifies and standardizes speaker roles (as in the EDA notebooks), including abbreviated
+    roles such as "CFO", "CEO, Chairman" or "HIR".
+    """
+    if isinstance(role, str):
+        role = role.lower()
+        words = set(_ROLE_WORD_PATTERN.findall(role))
+        for abbreviation, role_simple in _ROLE_ABBREVIATIONS:
+            if abbreviation in words:
+                return role_simple
+        if "chief executive" in role:
+            return "CEO"
+        elif "chief financial" in role:
+            return "CFO"
+        elif "analyst" in role:
+            return "Analyst"
+        elif "investor relations" in role:
+            return "IR"
+        elif "chairman" in role:
+            return "Chairman"
+        elif "president" in role:
+            return "President"
+        elif "chief operating" in role:
+            return "COO"
+        else:
+            return "Other"
+    return "Unknown"
+
+
+def build_turn_facts(turns_df: pd.DataFrame, bank: str, section: str, topic_column: Optional[str] = "topic_name") -> pd.DataFrame:
+    """
+    Computes the per-turn measures (word and sentence counts) and dimensions for the index.
+
+    Args:
+        turns_df (pd.DataFrame): A qna_df or discussion_df produced by the transcript extractors.
+        bank (str): Bank name, e.g. BankType.GOLDMAN_SACHS.value.
+        section (str): "qna" or "discussion".
+        topic_column (str, optional): Column holding the topic assigned to each turn, if any.
+
+    Returns:
+        pd.DataFrame: One row per turn with DIMENSIONS and MEASURES columns.
+    """
+    content = turns_df["content"].fillna("").astype(str)
+    roles = turns_df["role"] if "role" in turns_df else pd.Series(None, index=turns_df.index)
+    # simplify_role only depends on the role string, so map the unique roles once
+    unique_roles = roles.drop_duplicates()
+    role_simple = roles.map(dict(zip(unique_roles, unique_roles.map(simplify_role))))
+
+    if "content_type" in turns_df:
+        content_type = turns_df["content_type"].fillna("unknown")
+    elif section == "qna":
+        # The JPM extractor has no content_type: analysts ask the questions, everyone else answers
+        content_type = pd.Series(np.where(role_simple.eq("Analyst"), "question", "answer"), index=turns_df.index)
+    else:
+        content_type = pd.Series(section, index=turns_df.index)
+
+    if topic_column and topic_column in turns_df:
+        topic = turns_df[topic_column].astype(str)
+    else:
+        topic = pd.Series("unassigned", index=turns_df.index)
+
+    return pd.DataFrame({
+        "bank": bank,
+        "section": section,
+        "year": pd.to_numeric(turns_df["year"]).astype("int16"),
+        "quarter": pd.to_numeric(turns_df["quarter"]).astype("int8"),
+        "role_simple": role_simple.fillna("Unknown"),
+        "company": turns_df["company"].fillna("Unknown") if "company" in turns_df else "Unknown",
+        "speaker": turns_df["speaker"].fillna("Unknown"),
+        "content_type": content_type,
+        "topic": topic,
+        "turns": np.ones(len(turns_df), dtype="int32"),
+        "word_count": content.str.split().str.len().fillna(0).astype("int32"),
+        "sentence_count": content.str.count(_SENTENCE_END_PATTERN).astype("int32"),
+    })
+
+
+class SpeakerAnalyticsIndex:
+    """
+    A prebuilt rollup of speaker turns across banks and quarters.
+
+    Turns are reduced once to the finest (bank, section, year, quarter, role, company,
+    speaker, content type, topic) grain with turn, word and sentence counts. Dimension
+    columns are stored as categoricals, so the EDA aggregations (talk time per speaker
+    and quarter, analyst firm question counts, per-speaker topic mix) are a groupby over
+    this small cube instead of re-tokenising the full CSVs every time.
+
+    New quarters are added with `add_turns`; re-adding a quarter replaces it.
+
+    Example:
+        index = SpeakerAnalyticsIndex()
+        index.add_turns(gs_qna_df, BankType.GOLDMAN_SACHS.value, "qna")
+        index.add_turns(gs_discussion_df, BankType.GOLDMAN_SACHS.value, "discussion")
+        index.talk_time(["year", "quarter", "speaker"], bank=BankType.GOLDMAN_SACHS.value)
+    """
+    def __init__(self, cube: Optional[pd.DataFrame] = None):
+        self._cube = cube if cube is not None else pd.DataFrame(columns=DIMENSIONS + MEASURES)
+
+    @property
+    def cube(self) -> pd.DataFrame:
+        return self._cube
+
+    def add_turns(self, turns_df: pd.DataFrame, bank: str, section: str, topic_column: Optional[str] = "topic_name") -> "SpeakerAnalyticsIndex":
+        """
+        Ingests the turns of one or more quarters, replacing any quarters already in the index
+        for the same bank and section.
+
+        Args:
+            turns_df (pd.DataFrame): A qna_df or discussion_df.
+            bank (str): Bank name.
+            section (str): "qna" or "discussion".
+            topic_column (str, optional): Column holding each turn's topic, if topics have been assigned.
+
+        Returns:
+            SpeakerAnalyticsIndex: self, to allow chaining.
+        """
+        if turns_df.empty:
+            return self
+
+        facts = build_turn_facts(turns_df, bank, section, topic_column)
+        rollup = facts.groupby(DIMENSIONS, observed=True, sort=False)[MEASURES].sum().reset_index()
+
+        cube = self._cube
+        if not cube.empty:
+            new_partitions = set(rollup[PARTITION_KEYS].drop_duplicates().itertuples(index=False, name=None))
+            keep = [partition not in new_partitions for partition in cube[PARTITION_KEYS].itertuples(index=False, name=None)]
+            cube = pd.concat([cube[keep], rollup], ignore_index=True)
+        else:
+            cube = rollup
+
+        self._cube = self._compact(cube)
+        return self
+
+    @staticmethod
+    def _compact(cube: pd.DataFrame) -> pd.DataFrame:
+        cube = cube.astype({column: "category" for column in DIMENSIONS if column not in ("year", "quarter")})
+        return cube.astype({"year": "int16", "quarter": "int8", **{measure: "int32" for measure in MEASURES}})
+
+    def _filtered(self, filters: dict) -> pd.DataFrame:
+        cube = self._cube
+        mask = np.ones(len(cube), dtype=bool)
+        for column, value in filters.items():
+            if value is None:
+                continue
+            if isinstance(value, (list, tuple, set)):
+                mask &= cube[column].isin(value).to_numpy()
+            else:
+                mask &= (cube[column] == value).to_numpy()
+        return cube[mask]
+
+    def query(self, group_by: list[str], measures: Optional[list[str]] = None, **filters) -> pd.DataFrame:
+        """
+        Aggregates the measures over the requested dimensions.
+
+        Args:
+            group_by (list[str]): Dimensions to group by (any of DIMENSIONS).
+            measures (list[str], optional): Measures to sum (defaults to all MEASURES).
+            **filters: Equality (or membership, when given a list) filters on dimensions,
+                e.g. bank="Goldman Sachs", section="qna", year=[2023, 2024].
+
+        Returns:
+            pd.DataFrame: One row per group with the summed measures.
+        """
+        measures = measures or MEASURES
+        unknown = [column for column in list(group_by) + list(filters) if column not in DIMENSIONS]
+        if unknown:
+            raise ValueError(f"Unknown dimension(s): {unknown}. Expected any of {DIMENSIONS}")
+
+        data = self._filtered(filters)
+        if not group_by:
+            return data[measures].sum().to_frame().T
+        return (
+            data.groupby(group_by, observed=True)[measures]
+            .sum()
+            .reset_index()
+        )
+
+    def talk_time(self, group_by: list[str], **filters) -> pd.DataFrame:
+        """
+        Word count, sentence count and number of turns per group, sorted by word count.
+        """
+        return self.query(group_by, **filters).sort_values("word_count", ascending=False, ignore_index=True)
+
+    def top_speakers_per_quarter(self, n: int = 10, **filters) -> pd.DataFrame:
+        """
+        The n speakers with the most turns in each quarter (plot_top_speakers_per_quarter in the EDA notebooks).
+        """
+        turns = self.query(["year", "quarter", "speaker", "role_simple"], ["turns", "word_count"], **filters)
+        turns = turns.sort_values(["year", "quarter", "turns"], ascending=[True, True, False])
+        return turns.groupby(["year", "quarter"], sort=False).head(n).reset_index(drop=True)
+
+    def analyst_firm_question_counts(self, group_by: Optional[list[str]] = None, **filters) -> pd.DataFrame:
+        """
+        Number of questions asked per analyst firm (optionally split further, e.g. by quarter).
+        """
+        filters.setdefault("content_type", "question")
+        counts = self.query(["company"] + (group_by or []), ["turns", "word_count"], **filters)
+        return counts.rename(columns={"turns": "questions"}).sort_values("questions", ascending=False, ignore_index=True)
+
+    def speaker_topic_proportions(self, by_quarter: bool = False, measure: str = "turns", **filters) -> pd.DataFrame:
+        """
+        Share of each topic in each speaker's turns, as plotted per speaker in the topic modelling notebook.
+
+        Returns:
+            pd.DataFrame: Speakers (and year/quarter when by_quarter) as the index, topics as columns.
+        """
+        index_columns = (["year", "quarter"] if by_quarter else []) + ["speaker"]
+        counts = self.query(index_columns + ["topic"], [measure], **filters)
+        table = counts.pivot_table(index=index_columns, columns="topic", values=measure, fill_value=0, observed=True)
+        return table.div(table.sum(axis=1).replace(0, 1), axis=0)
+
+    def quarters(self) -> pd.DataFrame:
+        """
+        The (bank, section, year, quarter) partitions currently in the index.
+        """
+        return self._cube[PARTITION_KEYS].drop_duplicates().sort_values(PARTITION_KEYS, ignore_index=True)
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._cube.to_pickle(path)
+
+    @classmethod
+    def load(cls, path: str) -> "SpeakerAnalyticsIndex":
+        return cls(pd.read_pickle(path))
@@ -0,0 +1,584 @@
+import json
+import logging
+import os
+import re
+import shutil
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..constants import BankType
+from ..utils.common_helpers import read_list_from_text_file, read_yaml_file
+
+_SRC_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+ABBREVIATIONS_PATH = os.path.join(_SRC_DIR, "abbreviations.yaml")
+
+STOPWORD_PATHS = {
+    BankType.GOLDMAN_SACHS.value: os.path.join(_SRC_DIR, "data_processing", "goldman_sachs_topic_modelling_stopwords.txt"),
+    BankType.JPMORGAN.value: os.path.join(_SRC_DIR, "data_processing", "jp_morgan_topic_modelling_stopwords.txt"),
+}
+
+# Words, numbers and tokens joined by &, ., ' or - (e.g. "c&i", "1.5", "year-over-year")
+_TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[&.'\-][a-z0-9]+)*")
+
+# A double-quoted phrase, or a single bare term
+_QUERY_CLAUSE_PATTERN = re.compile(r'"([^"]+)"|(\S+)')
+
+# Per-turn metadata kept alongside the postings of each segment
+DOC_COLUMNS = [
+    "bank",
+    "section",
+    "year",
+    "quarter",
+    "question_answer_group_id",
+    "question_order",
+    "speaker",
+    "role",
+    "company",
+    "content_type",
+    "content",
+]
+
+SEGMENT_FORMAT_VERSION = 1
+
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercases a text and splits it into index tokens.
+    """
+    return _TOKEN_PATTERN.findall(text.lower()) if isinstance(text, str) else []
+
+
+def load_abbreviation_variants(filepath: str = ABBREVIATIONS_PATH) -> dict[tuple[str, ...], list[tuple[str, ...]]]:
+    """
+    Builds a two-way map between each abbreviation and its expansion, in token form,
+    e.g. ("cre",) -> [("commercial", "real", "estate")] and back.
+
+    Args:
+        filepath (str): Path to the abbreviations YAML file.
+
+    Returns:
+        dict[tuple[str, ...], list[tuple[str, ...]]]: Token sequence -> equivalent token sequences.
+    """
+    variants = {}
+    for abbreviation, expansion in read_yaml_file(filepath).items():
+        short, long = tuple(tokenize(str(abbreviation))), tuple(tokenize(str(expansion)))
+        if not short or not long or short == long:
+            continue
+        variants.setdefault(short, []).append(long)
+        variants.setdefault(long, []).append(short)
+    return variants
+
+
+def load_bank_stopwords(stopword_paths: Optional[dict[str, str]] = None) -> dict[str, frozenset]:
+    """
+    Reads the bank-specific topic modelling stopword files.
+
+    Returns:
+        dict[str, frozenset]: Bank name -> set of stopwords.
+    """
+    stopwords = {}
+    for bank, path in (stopword_paths or STOPWORD_PATHS).items():
+        if os.path.exists(path):
+            stopwords[bank] = frozenset(word.lower() for word in read_list_from_text_file(path))
+        else:
+            logging.warning(f"Stopword file not found for {bank}: {path}")
+    return stopwords
+
+
+def turns_to_documents(turns_df: pd.DataFrame, bank: str, section: str) -> pd.DataFrame:
+    """
+    Converts a qna_df or discussion_df into the document table indexed by TranscriptSearchIndex
+    (one document per speaker turn).
+    """
+    docs = turns_df.reindex(columns=DOC_COLUMNS).copy()
+    docs["bank"] = bank
+    docs["section"] = section
+    docs["year"] = pd.to_numeric(docs["year"]).astype("int16")
+    docs["quarter"] = pd.to_numeric(docs["quarter"]).astype("int8")
+    docs["content"] = docs["content"].fillna("").astype(str)
+    return docs.reset_index(drop=True)
+
+
+class _Segment:
+    """
+    The postings of one segment, memory-mapped from disk.
+
+    For term i of the sorted vocabulary, its postings are doc_ids[term_offsets[i]:term_offsets[i + 1]]
+    (ascending local doc ids) with matching term frequencies in tfs, and posting j stores its token
+    positions in positions[position_offsets[j]:position_offsets[j + 1]].
+    """
+    def __init__(self, path: str, bank: str):
+        self.path = path
+        self.bank = bank
+        with open(os.path.join(path, "vocabulary.json"), "r", encoding="utf-8") as file:
+            self.term_ids = {term: term_id for term_id, term in enumerate(json.load(file))}
+        self.term_offsets = np.load(os.path.join(path, "term_offsets.npy"))
+        self.doc_ids = np.load(os.path.join(path, "doc_ids.npy"), mmap_mode="r")
+        self.tfs = np.load(os.path.join(path, "tfs.npy"), mmap_mode="r")
+        self.position_offsets = np.load(os.path.join(path, "position_offsets.npy"), mmap_mode="r")
+        self.positions = np.load(os.path.join(path, "positions.npy"), mmap_mode="r")
+        self.doc_lengths = np.load(os.path.join(path, "doc_lengths.npy"))
+        self._docs = None
+
+    @property
+    def docs(self) -> pd.DataFrame:
+        # Only needed to render results, so loaded on first use
+        if self._docs is None:
+            self._docs = pd.read_pickle(os.path.join(self.path, "docs.pkl"))
+        return self._docs
+
+    def postings(self, term: str) -> tuple[np.ndarray, np.ndarray, int]:
+        """
+        Returns the doc ids, term frequencies and the index of the first posting for a term.
+        """
+        term_id = self.term_ids.get(term)
+        if term_id is None:
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32), 0
+        start, end = self.term_offsets[term_id], self.term_offsets[term_id + 1]
+        return self.doc_ids[start:end], self.tfs[start:end], start
+
+    def phrase_frequencies(self, tokens: tuple[str, ...]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Finds the documents containing the exact token sequence.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: Matching doc ids and the number of occurrences in each.
+        """
+        if len(tokens) == 1:
+            doc_ids, tfs, _ = self.postings(tokens[0])
+            return np.asarray(doc_ids), np.asarray(tfs)
+
+        postings = [self.postings(token) for token in tokens]
+        if any(len(doc_ids) == 0 for doc_ids, _, _ in postings):
+            return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+        # Intersect on doc ids first (rarest term first), then compare positions only in the shared docs
+        order = sorted(range(len(tokens)), key=lambda i: len(postings[i][0]))
+        candidates = np.asarray(postings[order[0]][0])
+        for i in order[1:]:
+            candidates = np.intersect1d(candidates, postings[i][0], assume_unique=True)
+            if not len(candidates):
+                return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.int32)
+
+        posting_indices = [
+            first + np.searchsorted(doc_ids, candidates) for doc_ids, _, first in postings
+        ]
+        matched_docs, matched_counts = [], []
+        for candidate_index, doc_id in enumerate(candidates):
+            starts = None
+            for offset, indices in enumerate(posting_indices):
+                posting = indices[candidate_index]
+                token_positions = self.positions[self.position_offsets[posting]:self.position_offsets[posting + 1]]
+                shifted = np.asarray(token_positions) - offset
+                starts = shifted if starts is None else np.intersect1d(starts, shifted, assume_unique=True)
+                if not len(starts):
+                    break
+            if len(starts):
+                matched_docs.append(doc_id)
+                matched_counts.append(len(starts))
+        return np.asarray(matched_docs, dtype=np.int32), np.asarray(matched_counts, dtype=np.int32)
+
+
+def write_segment(docs: pd.DataFrame, path: str) -> dict:
+    """
+    Builds the positional postings for a document table and writes them as a segment directory.
+    The segment is written to a temporary directory and renamed into place, so readers never see
+    a partially written segment.
+
+    Args:
+        docs (pd.DataFrame): Documents as returned by `turns_to_documents`.
+        path (str): The segment directory.
+
+    Returns:
+        dict: Segment statistics ('docs', 'tokens', 'terms').
+    """
+    postings = {}
+    doc_lengths = np.zeros(len(docs), dtype=np.int32)
+    for doc_id, content in enumerate(docs["content"]):
+        tokens = tokenize(content)
+        doc_lengths[doc_id] = len(tokens)
+        for position, token in enumerate(tokens):
+            postings.setdefault(token, {}).setdefault(doc_id, []).append(position)
+
+    vocabulary = sorted(postings)
+    term_offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+    doc_ids, tfs, position_offsets, positions = [], [], [0], []
+    for term_id, term in enumerate(vocabulary):
+        # Dicts keep insertion order and docs are visited in order, so doc ids are already ascending
+        for doc_id, token_positions in postings[term].items():
+            doc_ids.append(doc_id)
+            tfs.append(len(token_positions))
+            positions.extend(token_positions)
+            position_offsets.append(len(positions))
+        term_offsets[term_id + 1] = len(doc_ids)
+
+    tmp_path = f"{path}.tmp"
+    shutil.rmtree(tmp_path, ignore_errors=True)
+    os.makedirs(tmp_path)
+    with open(os.path.join(tmp_path, "vocabulary.json"), "w", encoding="utf-8") as file:
+        json.dump(vocabulary, file, ensure_ascii=False)
+    np.save(os.path.join(tmp_path, "term_offsets.npy"), term_offsets)
+    np.save(os.path.join(tmp_path, "doc_ids.npy"), np.asarray(doc_ids, dtype=np.int32))
+    np.save(os.path.join(tmp_path, "tfs.npy"), np.asarray(tfs, dtype=np.int32))
+    np.save(os.path.join(tmp_path, "position_offsets.npy"), np.asarray(position_offsets, dtype=np.int64))
+    np.save(os.path.join(tmp_path, "positions.npy"), np.asarray(positions, dtype=np.int32))
+    np.save(os.path.join(tmp_path, "doc_lengths.npy"), doc_lengths)
+    docs.to_pickle(os.path.join(tmp_path, "docs.pkl"))
+
+    shutil.rmtree(path, ignore_errors=True)
+    os.replace(tmp_path, path)
+    return {"docs": len(docs), "tokens": int(doc_lengths.sum()), "terms": len(vocabulary)}
+
+
+class TranscriptSearchIndex:
+    """
+    An on-disk BM25 index over the extracted transcript turns, with positional postings for
+    exact phrase search.
+
+    Every (bank, year, quarter) added with `add_turns` is written as its own immutable segment,
+    so indexing a new quarter never touches the existing ones (re-adding a quarter replaces it).
+    `merge` compacts a bank's quarter segments into a single segment to keep the number of
+    segments searched per query low. A manifest.json records which quarters each segment holds.
+
+    Queries are bags of terms and "quoted phrases". Every clause also matches its abbreviation
+    or expansion from abbreviations.yaml ("CRE" <-> "commercial real estate", including inside
+    phrases). The bank topic modelling stopwords stay in the postings, so phrases containing them
+    still match exactly, but they are not scored as bare keywords for that bank's documents.
+
+    Example:
+        index = TranscriptSearchIndex("data/index/transcripts")
+        index.add_turns(gs_qna_df, BankType.GOLDMAN_SACHS.value, "qna")
+        index.search('"net interest income guidance" CRE', top_k=20, bank=BankType.GOLDMAN_SACHS.value)
+    """
+    def __init__(self, index_dir: str, k1: float = 1.2, b: float = 0.75,
+                 abbreviations_path: Optional[str] = ABBREVIATIONS_PATH,
+                 stopword_paths: Optional[dict[str, str]] = None):
+        self.index_dir = index_dir
+        self.k1 = k1
+        self.b = b
+        self._segments_dir = os.path.join(index_dir, "segments")
+        self._manifest_path = os.path.join(index_dir, "manifest.json")
+        os.makedirs(self._segments_dir, exist_ok=True)
+        self.abbreviation_variants = load_abbreviation_variants(abbreviations_path) if abbreviations_path else {}
+        self.stopwords = load_bank_stopwords(stopword_paths)
+        self._manifest = self._load_manifest()
+        self._open_segments = {}
+
+    # Manifest and segments
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self._manifest_path):
+            return {"version": SEGMENT_FORMAT_VERSION, "next_segment_id": 0, "segments": {}}
+        with open(self._manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_manifest(self) -> None:
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._manifest, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _new_segment_name(self) -> str:
+        name = f"segment_{self._manifest['next_segment_id']:06d}"
+        self._manifest["next_segment_id"] += 1
+        return name
+
+    def _segment(self, name: str) -> _Segment:
+        if name not in self._open_segments:
+            self._open_segments[name] = _Segment(os.path.join(self._segments_dir, name), self._manifest["segments"][name]["bank"])
+        return self._open_segments[name]
+
+    def _drop_segment(self, name: str) -> None:
+        # Only forgets the segment: its directory is deleted by _delete_segments once the manifest
+        # no longer listing it has been saved, so a crash in between never leaves the saved
+        # manifest pointing at a deleted segment
+        self._open_segments.pop(name, None)
+        self._manifest["segments"].pop(name)
+
+    def _delete_segments(self, names: list[str]) -> None:
+        for name in names:
+            shutil.rmtree(os.path.join(self._segments_dir, name), ignore_errors=True)
+
+    def _write_segment(self, docs: pd.DataFrame, bank: str) -> str:
+        name = self._new_segment_name()
+        stats = write_segment(docs, os.path.join(self._segments_dir, name))
+        self._manifest["segments"][name] = {
+            "bank": bank,
+            "quarters": sorted({f"{year}Q{quarter}" for year, quarter in zip(docs["year"], docs["quarter"])}),
+            **stats,
+        }
+        return name
+
+    def _remove_quarters(self, bank: str, quarters: set[str], sections: set[str]) -> list[str]:
+        """
+        Removes the given (bank, quarter, section) documents, rewriting any merged segment that
+        also holds other quarters. The remaining documents are written to their new segment before
+        the old one is dropped.
+
+        Returns:
+            list[str]: The dropped segments, to delete once the manifest has been saved.
+        """
+        dropped = []
+        for name, info in list(self._manifest["segments"].items()):
+            if info["bank"] != bank or not quarters & set(info["quarters"]):
+                continue
+            docs = self._segment(name).docs
+            labels = docs["year"].astype(str) + "Q" + docs["quarter"].astype(str)
+            remaining = docs[~(labels.isin(quarters) & docs["section"].isin(sections))]
+            if len(remaining):
+                self._write_segment(remaining.reset_index(drop=True), bank)
+            self._drop_segment(name)
+            dropped.append(name)
+        return dropped
+
+    def add_turns(self, turns_df: pd.DataFrame, bank: str, section: str) -> list[str]:
+        """
+        Indexes the turns of one or more quarters of a bank, one segment per quarter.
+        Quarters of this bank and section that are already indexed are replaced.
+
+        Args:
+            turns_df (pd.DataFrame): A qna_df or discussion_df produced by the transcript extractors.
+            bank (str): Bank name (a BankType value, used to pick the stopwords).
+            section (str): "qna" or "discussion".
+
+        Returns:
+            list[str]: The names of the segments written.
+        """
+        docs = turns_to_documents(turns_df, bank, section)
+        if docs.empty:
+            return []
+
+        quarters = set(docs["year"].astype(str) + "Q" + docs["quarter"].astype(str))
+        dropped = self._remove_quarters(bank, quarters, {section})
+
+        written = []
+        for _, quarter_docs in docs.groupby(["year", "quarter"], sort=True):
+            written.append(self._write_segment(quarter_docs.reset_index(drop=True), bank))
+        self._save_manifest()
+        self._delete_segments(dropped)
+        return written
+
+    def merge(self, bank: Optional[str] = None, min_segments: int = 2) -> list[str]:
+        """
+        Merges each bank's segments into a single segment.
+
+        Args:
+            bank (str, optional): Only merge this bank's segments.
+            min_segments (int): Leave a bank alone when it has fewer segments than this.
+
+        Returns:
+            list[str]: The names of the merged segments written.
+        """
+        segments_by_bank = {}
+        for name, info in self._manifest["segments"].items():
+            if bank is None or info["bank"] == bank:
+                segments_by_bank.setdefault(info["bank"], []).append(name)
+
+        written, dropped = [], []
+        for segment_bank, names in segments_by_bank.items():
+            if len(names) < min_segments:
+                continue
+            docs = pd.concat([self._segment(name).docs for name in names], ignore_index=True)
+            docs = docs.sort_values(["year", "quarter", "section"], kind="stable", ignore_index=True)
+            written.append(self._write_segment(docs, segment_bank))
+            for name in names:
+                self._drop_segment(name)
+            dropped.extend(names)
+        self._save_manifest()
+        self._delete_segments(dropped)
+        return written
+
+    def segments(self) -> pd.DataFrame:
+        """
+        The segments in the index with the bank, quarters and number of docs, tokens and terms of each.
+        """
+        return pd.DataFrame.from_dict(self._manifest["segments"], orient="index")
+
+    # Querying
+
+    def parse_query(self, query: str) -> list[tuple[bool, list[tuple[str, ...]]]]:
+        """
+        Splits a query into clauses and expands each clause with its abbreviation variants.
+
+        Returns:
+            list[tuple[bool, list[tuple[str, ...]]]]: For each clause, whether it was a quoted phrase,
+                and the token sequences it matches (the clause itself first).
+        """
+        clauses = []
+        for phrase, term in _QUERY_CLAUSE_PATTERN.findall(query):
+            tokens = tuple(tokenize(phrase or term))
+            if tokens:
+                clauses.append((bool(phrase), self._expand(tokens)))
+        return clauses
+
+    def _expand(self, tokens: tuple[str, ...]) -> list[tuple[str, ...]]:
+        variants = [tokens]
+        for pattern, replacements in self.abbreviation_variants.items():
+            size = len(pattern)
+            for start in range(len(tokens) - size + 1):
+                if tokens[start:start + size] == pattern:
+                    for replacement in replacements:
+                        variant = tokens[:start] + replacement + tokens[start + size:]
+                        if variant not in variants:
+                            variants.append(variant)
+        return variants
+
+    def _selected_segments(self, bank, year, quarter) -> list[str]:
+        def matches(value, wanted):
+            return wanted is None or (value in wanted if isinstance(wanted, (list, tuple, set)) else value == wanted)
+
+        selected = []
+        for name, info in self._manifest["segments"].items():
+            if not matches(info["bank"], bank):
+                continue
+            quarters = [tuple(int(part) for part in label.split("Q")) for label in info["quarters"]]
+            if any(matches(segment_year, year) and matches(segment_quarter, quarter) for segment_year, segment_quarter in quarters):
+                selected.append(name)
+        return selected
+
+    def search(self, query: str, top_k: int = 10, bank=None, section=None, year=None, quarter=None,
+               require_all: bool = False) -> pd.DataFrame:
+        """
+        Ranks the indexed turns against a query with BM25.
+
+        Phrases are scored like terms, with the number of exact occurrences as the term frequency.
+        A clause's frequency in a document is the sum over its abbreviation variants.
+
+        Args:
+            query (str): Terms and "quoted phrases", e.g. '"net interest income guidance" CRE'.
+            top_k (int): Number of results to return.
+            bank, section, year, quarter: Optional filters (a value or a list of values).
+            require_all (bool): Only return documents that match every clause (bare keywords skipped as
+                stopwords are ignored).
+
+        Returns:
+            pd.DataFrame: The top documents (DOC_COLUMNS plus 'score' and 'segment'), best first.
+        """
+        clauses = self.parse_query(query)
+        segment_names = self._selected_segments(bank, year, quarter)
+        if not clauses or not segment_names:
+            return pd.DataFrame(columns=DOC_COLUMNS + ["score", "segment"])
+        segments = [self._segment(name) for name in segment_names]
+
+        # Bare keywords that are topic modelling stopwords for a bank are skipped for that bank,
+        # unless the query has nothing else to score
+        def is_stopword(clause, segment):
+            is_phrase, variants = clause
+            return not is_phrase and len(variants[0]) == 1 and variants[0][0] in self.stopwords.get(segment.bank, ())
+
+        # Collect (doc ids, frequencies) per clause and segment, then compute the idf over all selected segments
+        matches = []
+        document_frequencies = np.zeros(len(clauses))
+        for segment in segments:
+            scored = [clause for clause in clauses if not is_stopword(clause, segment)] or clauses
+            segment_matches = []
+            for clause_index, clause in enumerate(clauses):
+                if clause not in scored:
+                    segment_matches.append(None)
+                    continue
+                doc_ids, tfs = self._clause_frequencies(segment, clause[1])
+                document_frequencies[clause_index] += len(doc_ids)
+                segment_matches.append((doc_ids, tfs))
+            matches.append(segment_matches)
+
+        total_docs = sum(len(segment.doc_lengths) for segment in segments)
+        average_length = sum(float(segment.doc_lengths.sum()) for segment in segments) / max(total_docs, 1)
+        idf = np.log1p((total_docs - document_frequencies + 0.5) / (document_frequencies + 0.5))
+
+        results = []
+        for segment_name, segment, segment_matches in zip(segment_names, segments, matches):
+            scores = np.zeros(len(segment.doc_lengths))
+            matched_clauses = np.zeros(len(segment.doc_lengths), dtype=np.int32)
+            length_norm = self.k1 * (1 - self.b + self.b * segment.doc_lengths / average_length)
+            for clause_index, clause_match in enumerate(segment_matches):
+                if clause_match is None or not len(clause_match[0]):
+                    continue
+                doc_ids, tfs = clause_match
+                scores[doc_ids] += idf[clause_index] * tfs * (self.k1 + 1) / (tfs + length_norm[doc_ids])
+                matched_clauses[doc_ids] += 1
+
+            if require_all:
+                # Every clause that was not dropped as a stopword must match, including ones with no postings here
+                scored_clauses = sum(clause_match is not None for clause_match in segment_matches)
+                candidates = np.flatnonzero(matched_clauses == scored_clauses)
+            else:
+                candidates = np.flatnonzero(scores > 0)
+            if section is not None:
+                sections = segment.docs["section"].to_numpy()[candidates]
+                candidates = candidates[np.isin(sections, section if isinstance(section, (list, tuple, set)) else [section])]
+            if year is not None or quarter is not None:
+                # Merged segments span several quarters, so filter their docs too
+                docs = segment.docs
+                keep = np.ones(len(candidates), dtype=bool)
+                for column, wanted in (("year", year), ("quarter", quarter)):
+                    if wanted is not None:
+                        keep &= np.isin(docs[column].to_numpy()[candidates], wanted if isinstance(wanted, (list, tuple, set)) else [wanted])
+                candidates = candidates[keep]
+            if len(candidates) > top_k:
+                candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+            results.extend((scores[doc_id], segment_name, doc_id) for doc_id in candidates)
+
+        results.sort(key=lambda result: -result[0])
+        results = results[:top_k]
+        if not results:
+            return pd.DataFrame(columns=DOC_COLUMNS + ["score", "segment"])
+
+        frames = []
+        for segment_name in dict.fromkeys(segment_name for _, segment_name, _ in results):
+            rows = [(rank, doc_id, score) for rank, (score, name, doc_id) in enumerate(results) if name == segment_name]
+            frame = self._segment(segment_name).docs.iloc[[doc_id for _, doc_id, _ in rows]]
+            frames.append(frame.assign(score=[score for _, _, score in rows], segment=segment_name,
+                                       rank=[rank for rank, _, _ in rows]))
+        return pd.concat(frames).sort_values("rank").drop(columns="rank").reset_index(drop=True)
+
+    @staticmethod
+    def _clause_frequencies(segment: _Segment, variants: list[tuple[str, ...]]) -> tuple[np.ndarray, np.ndarray]:
+        if len(variants) == 1:
+            return segment.phrase_frequencies(variants[0])
+        doc_ids, tfs = map(np.concatenate, zip(*(segment.phrase_frequencies(variant) for variant in variants)))
+        unique_doc_ids, inverse = np.unique(doc_ids, return_inverse=True)
+        return unique_doc_ids, np.bincount(inverse, weights=tfs).astype(np.int32)
+
+
+def scan_turns(turns_df: pd.DataFrame, text: str) -> pd.DataFrame:
+    """
+    The pandas baseline the index replaces: a case-insensitive substring scan over every turn.
+    """
+    return turns_df[turns_df["content"].str.contains(text, case=False, regex=False, na=False)]
+
+
+def benchmark_search(index: TranscriptSearchIndex, turns_df: pd.DataFrame, queries: Iterable[str],
+                     top_k: int = 10, repeats: int = 20) -> pd.DataFrame:
+    """
+    Times index queries against the equivalent pandas str.contains scan.
+
+    Args:
+        index (TranscriptSearchIndex): The index to query.
+        turns_df (pd.DataFrame): All turns, as they would be loaded from the CSVs, for the scan.
+        queries (Iterable[str]): Queries to time; quotes are stripped for the scan.
+        top_k (int): Number of results requested from the index.
+        repeats (int): Runs per query (the best run is reported).
+
+    Returns:
+        pd.DataFrame: Per query, the index and scan times in ms and the number of hits of each.
+    """
+    def best_of(function):
+        timings = []
+        for _ in range(repeats):
+            start = time.perf_counter()
+            result = function()
+            timings.append(time.perf_counter() - start)
+        return min(timings) * 1000, result
+
+    rows = []
+    for query in queries:
+        index_ms, _ = best_of(lambda: index.search(query, top_k=top_k))
+        hits = index.search(query, top_k=len(turns_df))
+        scan_ms, scanned = best_of(lambda: scan_turns(turns_df, query.replace('"', "")))
+        rows.append({"query": query, "index_ms": index_ms, "index_hits": len(hits),
+                     "scan_ms": scan_ms, "scan_hits": len(scanned)})
+    return pd.DataFrame(rows)
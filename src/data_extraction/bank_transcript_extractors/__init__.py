@@ -1,2 +1,3 @@
 from .goldman_sachs import GoldmanSachsTranscriptExtractor
-from .jp_morgan import JpMorganTranscriptExtractor
\ No newline at end of file
+from .jp_morgan import JpMorganTranscriptExtractor
+from .turns import TranscriptTurn, turns_to_dataframe
\ No newline at end of file
@@ -1,24 +1,33 @@
 import re
+from typing import Iterable, Iterator
+
 import pandas as pd
 
 from ...constants import BankType
 
 from .base import BaseTranscriptExtractor
+from .section_index import TranscriptSectionIndex
+from .turns import DISCUSSION_COLUMNS, QNA_COLUMNS, TranscriptTurn, turns_to_dataframe
+
+
+# Splits a participant's roles, e.g. "Chairman & Chief Executive Officer"
+_ROLE_SEPARATOR_PATTERN = re.compile(r"&|and")
 
 
 class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
     def __init__(self, transcript_file_text: str, quarter: int, year: int):
         self.transcript_file_text = transcript_file_text
-        self.participants = self._extract_participants(self.transcript_file_text)
+        self._section_index = TranscriptSectionIndex(self.transcript_file_text)
+        self.participants = self._extract_participants(self._section_index)
         self._quarter = quarter
         self._year = year
 
-    def _extract_participants(self, text: str):
+    def _extract_participants(self, section_index: TranscriptSectionIndex):
         """
         Extracts both 'Company Participants' and 'Conference Call Participants' sections from the given text.
 
         Args:
-            text (str): The input text.
+            section_index (TranscriptSectionIndex): The section index of the transcript text.
 
         Returns:
             dict: A dictionary with keys 'company_participants' and 'conference_call_participants',
@@ -26,80 +35,58 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
         """
         participants = {}
 
-        def parse_participants(section_text):
+        def parse_participants(span):
             parsed = {}
-            for line in section_text.split("\n"):
+            for line in section_index.iter_lines(*span):
                 if " - " in line:
                     name, roles = line.split(" - ", 1)
                     parsed[name.strip()] = ", ".join(sorted([
-                        role.strip() for role in re.split(r"&|and", roles)
+                        role.strip() for role in _ROLE_SEPARATOR_PATTERN.split(roles)
                     ]))
             return parsed
 
         # Extract Company Participants
-        company_match = re.search(
-            r"Company Participants(.*?)(?:Conference Call Participants|Operator)",
-            text,
-            re.DOTALL,
+        company_span = section_index.span_between(
+            "company_participants", ["conference_call_participants", "Operator"]
         )
-        if company_match:
-            company_section = company_match.group(1)
-            participants["company_participants"] = parse_participants(company_section)
-        else:
-            participants["company_participants"] = {}
+        participants["company_participants"] = parse_participants(company_span) if company_span else {}
 
         # Extract Conference Call Participants
-        conference_match = re.search(
-            r"Conference Call Participants(.*?)(?:Operator)", text, re.DOTALL
-        )
-        if conference_match:
-            conference_section = conference_match.group(1)
-            participants["conference_call_participants"] = parse_participants(
-                conference_section
-            )
-        else:
-            participants["conference_call_participants"] = {}
+        conference_span = section_index.span_between("conference_call_participants", ["Operator"])
+        participants["conference_call_participants"] = parse_participants(conference_span) if conference_span else {}
 
         return participants
 
-    def _extract_qna_section(self, text: str) -> str:
+    def _qna_lines(self) -> Iterator[str]:
         """
-        Extracts the Question-and-Answer Session from the given text.
-
-        Args:
-            text (str): The input text.
-
-        Returns:
-            str: The extracted Question-and-Answer Session text.
+        Yields the lines of the Question-and-Answer Session (everything after its heading).
         """
-        qna_start = "Question-and-Answer Session"
-        qna_section = text.split(qna_start, 1)[-1] if qna_start in text else ""
-        return qna_section.strip()
+        qna_span = self._section_index.span_after("question_and_answer_session")
+        return self._section_index.iter_lines(*qna_span) if qna_span else iter(())
 
-    def _split_qna_section(self, qna_text):
+    def _split_qna_turns(self, lines: Iterable[str]) -> list[TranscriptTurn]:
         """
-        Splits the Q&A section into a structured format with questions and answers.
+        Splits the Q&A section into a flat list of speaker turns.
 
         Args:
-            qna_text (str): The Q&A section text.
+            lines (Iterable[str]): The lines of the Q&A section.
 
         Returns:
-            dict: A nested dictionary where each Q&A group is represented as:
-                {group_index: {entry_index: {"content_type": "question" | "answer",
-                                            "content": "the message",
-                                            "speaker": "Speaker Name"}}}
+            list[TranscriptTurn]: One turn per question or answer, tagged with its
+                question_answer_group_id and question_order.
         """
-        qna_groups = {}
-        current_group = {}
+        turns = []
         group_index = 0
         entry_index = 0
-        current_speaker = None
-        content_type = None
-        lines = qna_text.splitlines()
+        group_size = 0
+        current_turn = None
 
         all_participants = set(
             self.participants["conference_call_participants"].keys()
         ) | set(self.participants["company_participants"].keys())
+        participants_by_lower_name = {}
+        for name in all_participants:
+            participants_by_lower_name.setdefault(name.lower(), name)
 
         for line in lines:
             line = line.strip().lower()
@@ -107,24 +94,20 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
                 continue
 
             # Check if the line is the "Operator" line, which separates groups
-            if line.strip().lower() == "operator":
-                if current_group:
-                    qna_groups[group_index] = current_group
+            if line == "operator":
+                if group_size:
                     group_index += 1
-                    current_group = {}
+                    group_size = 0
                     entry_index = 0
-                    content_type = None
-                    current_speaker = None
+                    current_turn = None
                 continue
 
             # Check if the line starts with a participant's name
-            if line in (name.lower() for name in all_participants):
-                if current_group:
+            if line in participants_by_lower_name:
+                if group_size:
                     entry_index += 1
                 # Get next speaker
-                current_speaker = next(
-                    name for name in all_participants if line == name.strip().lower()
-                )
+                current_speaker = participants_by_lower_name[line]
                 role = self.participants["company_participants"].get(current_speaker, None)
                 company =  self.participants["conference_call_participants"].get(current_speaker, None) or BankType.GOLDMAN_SACHS.value
                 # Get next content type by participant
@@ -134,80 +117,80 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
                     in self.participants["conference_call_participants"]
                     else "answer"
                 )
-                
-                current_group[entry_index] = {
-                    "content_type": content_type,
-                    "content": "",
-                    "speaker": current_speaker,
-                    "role": role,
-                    "company": company,
-                }
+
+                current_turn = TranscriptTurn(
+                    speaker=current_speaker,
+                    role=role,
+                    company=company,
+                    content_type=content_type,
+                    question_answer_group_id=group_index,
+                    question_order=entry_index,
+                    leading_separator=True,
+                )
+                turns.append(current_turn)
+                group_size += 1
             else:
-                if current_speaker:
-                    current_group[entry_index]["content"] += f" {line}"
+                if current_turn:
+                    current_turn.add_line(line)
+
+        return turns
+
+    def _split_qna_section(self, lines: Iterable[str]):
+        """
+        Splits the Q&A section into a structured format with questions and answers.
 
-        # Add the last group if it exists
-        if current_group:
-            qna_groups[group_index] = current_group
+        Args:
+            lines (Iterable[str]): The lines of the Q&A section.
 
+        Returns:
+            dict: A nested dictionary where each Q&A group is represented as:
+                {group_index: {entry_index: {"content_type": "question" | "answer",
+                                            "content": "the message",
+                                            "speaker": "Speaker Name"}}}
+        """
+        qna_groups = {}
+        for turn in self._split_qna_turns(lines):
+            qna_groups.setdefault(turn.question_answer_group_id, {})[turn.question_order] = turn.to_dict()
         return qna_groups
 
-    def _extract_management_discussion(self, text: str):
+    def _management_discussion_lines(self) -> Iterator[str]:
         """
-        Extracts the management discussion section from the PDF text.
+        Yields the lines of the management discussion section: from the first company participant
+        speaking after the operator's introduction up to the Question-and-Answer Session.
         """
+        section_index = self._section_index
         internal_participants = list(self.participants["company_participants"].keys())
-        management_discussion_end = "Question-and-Answer Session"
-        # Split the text into lines for easier processing
-        lines = text.splitlines()
-
-        # Initialize variables
-        management_discussion_section = []
-        is_past_operator_intro = False
-        is_in_discussion = False
-
-        # Iterate through the lines
-        for line in lines:
-            if not is_past_operator_intro:
-                if line.strip().lower() == "operator":
-                    is_past_operator_intro = True
-                continue
 
-            if is_past_operator_intro:
-                if (
-                    any(participant == line for participant in internal_participants)
-                    and not is_in_discussion
-                ):
-                    # Start capturing the discussion after the operator's introduction
-                    is_in_discussion = True
+        operator_line = next(section_index.operator_lines(), None)
+        if operator_line is None or not internal_participants:
+            return iter(())
 
-                if is_in_discussion:
-                    if management_discussion_end in line:
-                        break
-                    management_discussion_section.append(line)
-
-        # Join the captured lines into a single string
-        management_discussion_section = "\n".join(management_discussion_section)
+        # Start capturing the discussion at the first line that is exactly a company participant's name
+        participant_line_pattern = re.compile(
+            "^(?:" + "|".join(re.escape(participant) for participant in internal_participants) + ")$",
+            re.MULTILINE,
+        )
+        discussion_start = participant_line_pattern.search(self.transcript_file_text, operator_line[1] + 1)
+        if not discussion_start:
+            return iter(())
 
-        return management_discussion_section.strip()
+        qna_heading = section_index.find("question_and_answer_session", discussion_start.start())
+        discussion_end = section_index.line_bounds(qna_heading[0])[0] if qna_heading else len(self.transcript_file_text)
+        return section_index.iter_lines(discussion_start.start(), discussion_end)
 
-    def _split_management_discussion_section(self, management_discussion_text):
+    def _split_management_discussion_turns(self, lines: Iterable[str]) -> list[TranscriptTurn]:
         """
-        Splits the management discussion section into a structured format.
+        Splits the management discussion section into a flat list of speaker turns.
 
         Args:
-            management_discussion_text (str): The management discussion section text.
+            lines (Iterable[str]): The lines of the management discussion section.
 
         Returns:
-            dict: A dictionary where each entry is represented as:
-                {entry_index: {"content_type": "management_discussion",
-                                "content": "the message",
-                                "speaker": "Speaker Name"}}
+            list[TranscriptTurn]: One turn per speaker block, in order.
         """
-        management_discussion = {}
-        entry_index = 0
-        current_speaker = None
-        lines = management_discussion_text.splitlines()
+        turns = []
+        current_turn = None
+        company_participants = self.participants["company_participants"]
 
         for line in lines:
             line = line.strip()
@@ -215,21 +198,38 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
                 continue
 
             # Check if the line starts with a participant's name
-            if line in self.participants["company_participants"].keys():
-                current_speaker = line
-                if management_discussion:
-                    entry_index += 1
-
-                management_discussion[entry_index] = {
-                    "content": "",
-                    "speaker": current_speaker,
-                    "role": self.participants["company_participants"][current_speaker],
-                    "company": BankType.GOLDMAN_SACHS.value,
-                }
+            if line in company_participants:
+                current_turn = TranscriptTurn(
+                    speaker=line,
+                    role=company_participants[line],
+                    company=BankType.GOLDMAN_SACHS.value,
+                    leading_separator=True,
+                )
+                turns.append(current_turn)
             else:
-                if current_speaker:
-                    management_discussion[entry_index]["content"] += f" {line}"
+                if current_turn:
+                    current_turn.add_line(line)
 
+        return turns
+
+    def _split_management_discussion_section(self, lines: Iterable[str]):
+        """
+        Splits the management discussion section into a structured format.
+
+        Args:
+            lines (Iterable[str]): The lines of the management discussion section.
+
+        Returns:
+            dict: A dictionary where each entry is represented as:
+                {entry_index: {"content_type": "management_discussion",
+                                "content": "the message",
+                                "speaker": "Speaker Name"}}
+        """
+        management_discussion = {}
+        for entry_index, turn in enumerate(self._split_management_discussion_turns(lines)):
+            entry = turn.to_dict()
+            del entry["content_type"]
+            management_discussion[entry_index] = entry
         return management_discussion
 
     def get_qna(self):
@@ -239,9 +239,7 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
         Returns:
             dict: A nested dictionary with structured Q&A data.
         """
-        return self._split_qna_section(
-            self._extract_qna_section(self.transcript_file_text)
-        )
+        return self._split_qna_section(self._qna_lines())
 
     def get_discussion(self):
         """
@@ -250,47 +248,19 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
         Returns:
             dict: A dictionary with structured management discussion data.
         """
-        return self._split_management_discussion_section(
-            self._extract_management_discussion(self.transcript_file_text)
-        )
+        return self._split_management_discussion_section(self._management_discussion_lines())
 
     def get_qna_df(self):
         """
         Extracts the Question-and-Answer Session from the transcript text and structures it.
 
         Returns:
-            dict: A nested dictionary with structured Q&A data.
+            pd.DataFrame: A DataFrame with one row per question or answer.
         """
-        extracted_qna = self.get_qna()
-
-        formatted_qna = {
-            "question_order": [],
-            "question_answer_group_id": [],
-            "speaker": [],
-            "role": [],
-            "company": [],
-            "content_type": [],
-            "content": [],
-            "quarter": [],
-            "year": [],
-        }
-
-        for question_answer_group_id, qnas in extracted_qna.items():
-            for question_order, single_qna_dict in qnas.items():
-                formatted_qna["question_order"].append(question_order)
-                formatted_qna["question_answer_group_id"].append(
-                    question_answer_group_id
-                )
-                formatted_qna["speaker"].append(single_qna_dict["speaker"])
-                formatted_qna["role"].append(single_qna_dict["role"])
-                formatted_qna["company"].append(single_qna_dict["company"])
-                formatted_qna["content_type"].append(single_qna_dict["content_type"])
-                formatted_qna["content"].append(single_qna_dict["content"])
-                formatted_qna["quarter"].append(self._quarter)
-                formatted_qna["year"].append(self._year)
+        turns = self._split_qna_turns(self._qna_lines())
 
         # Delete where we only have single question_answer_group_id as this is not useful for q_a (singular question or answer)
-        df = pd.DataFrame(formatted_qna)
+        df = turns_to_dataframe(turns, QNA_COLUMNS, self._quarter, self._year)
         counts = df["question_answer_group_id"].value_counts()
         df = df[df["question_answer_group_id"].isin(counts[counts > 1].index)]
         return df
@@ -302,27 +272,5 @@ class GoldmanSachsTranscriptExtractor(BaseTranscriptExtractor):
         Returns:
             pd.DataFrame: A DataFrame with structured management discussion data.
         """
-        extracted_management_discussion = self.get_discussion()
-
-        formatted_discussion = {
-            "speaker": [],
-            "role": [],
-            "company": [],
-            "content": [],
-            "quarter": [],
-            "year": [],
-        }
-
-        for entry_index, single_discussion_dict in extracted_management_discussion.items():
-            formatted_discussion["speaker"].append(single_discussion_dict["speaker"])
-            formatted_discussion["role"].append(
-                single_discussion_dict["role"]
-            )
-            formatted_discussion["company"].append(
-                single_discussion_dict["company"]
-            )
-            formatted_discussion["content"].append(single_discussion_dict["content"])
-            formatted_discussion["quarter"].append(self._quarter)
-            formatted_discussion["year"].append(self._year)
-
-        return pd.DataFrame(formatted_discussion) 
+        turns = self._split_management_discussion_turns(self._management_discussion_lines())
+        return turns_to_dataframe(turns, DISCUSSION_COLUMNS, self._quarter, self._year)
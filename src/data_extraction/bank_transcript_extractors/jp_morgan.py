@@ -1,9 +1,21 @@
 import re
+from typing import Optional
+
 import pandas as pd
 
 from ...constants import BankType
 
 from .base import BaseTranscriptExtractor
+from .section_index import TranscriptSectionIndex
+from .turns import TranscriptTurn, turns_to_dataframe
+
+# Quarter and year are added per file by extract_transcripts_pdf_df_from_dir
+JPM_QNA_COLUMNS = ["question_order", "question_answer_group_id", "speaker", "role", "company", "content"]
+JPM_DISCUSSION_COLUMNS = ["speaker", "role", "company", "content"]
+
+_OPERATOR_PATTERN = re.compile(r"^.{0,10}Operator ?:?")
+# Optional Q/A marker at the end of a speaker's role
+_QUESTION_ANSWER_SUFFIX_PATTERN = re.compile(r"\s*(Q|A)$")
 
 
 class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
@@ -80,21 +92,23 @@ class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
             'Chairman & Chief Executive Officer': 'Chief Executive Officer'
         }
 
-    def _extract_blocks_from_section(self, processed_text):
-        # Define the separator pattern (newline, dots, newline)
-        separator_regex = r"\.{5,}"
+    def _extract_blocks_from_section(self, section_index: TranscriptSectionIndex, start: int, end: int):
+        """
+        Splits a section of the transcript into speaker blocks on the dotted separator lines.
 
-        # Split the text into blocks using the separator
-        blocks = re.split(separator_regex, processed_text)
+        Args:
+            section_index (TranscriptSectionIndex): The index over the transcript text.
+            start (int): Start offset of the section.
+            end (int): End offset of the section.
 
-        # Filter out any empty blocks that might result from splitting
-        blocks = [block.strip() for block in blocks if block.strip()]
+        Returns:
+            list[list[str]]: The cleaned, non-empty lines of each non-empty block.
+        """
         cleaned_blocks = []
 
-        for block in blocks:
-            lines = block.split("\n")
+        for block in section_index.iter_blocks(start, end):
             lines = [
-                line.strip() for line in lines if line.strip()
+                line.strip() for line in block.split("\n") if line.strip()
             ]  # Clean empty lines within the block
             lines = [
                 line for line in lines if not line.isdigit()
@@ -103,10 +117,18 @@ class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
             if not lines:
                 continue  # Skip empty blocks
 
-            cleaned_blocks.append("\n".join(lines))
+            cleaned_blocks.append(lines)
 
         return cleaned_blocks
 
+    @staticmethod
+    def _resolve_span(full_text, section_index, span, heading):
+        if section_index is None:
+            section_index = TranscriptSectionIndex(full_text)
+        if span is None:
+            span = section_index.span_after(heading) or (0, len(full_text))
+        return section_index, span
+
     def _correct_role_spelling(self, role_name) -> str:
         """
         Corrects any spelling or pdf conversion issues in the roles of the speaker
@@ -120,79 +142,51 @@ class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
                 role_name = role_name.replace(misspelt_role, self._misspelt_roles_dict[misspelt_role])
         return role_name.strip()
 
-    def get_qna(self, full_text):
+    def get_qna(self, full_text, section_index: Optional[TranscriptSectionIndex] = None, span: Optional[tuple[int, int]] = None):
         """
         Parses a Q&A transcript into a list of speaker, role, and text dictionaries,
         assuming speaker name is line 1, role is line 2, and text is subsequent lines.
         Handles the special 'Operator' case.
 
         Args:
-            full_text (str): The complete transcript text.
+            full_text (str): The Q&A section text, or the complete transcript text.
+            section_index (TranscriptSectionIndex, optional): An index already built over full_text.
+            span (tuple[int, int], optional): The Q&A section's range within full_text. Defaults to
+                everything after the "QUESTION AND ANSWER SECTION" heading, or the whole text.
 
         Returns:
-            pd.DataFrame: A DataFrame with 'question_answer_group_id', 'speaker', 'role', and 'content' columns.
+            list[TranscriptTurn]: One turn per speaker block with the question_answer_group_id,
+                question_order, speaker, role, company and content.
         """
         entries = []
 
-        # Add an implicit separator at the end to ensure the last block is captured
-        processed_text = re.sub(
-            r"^\s*QUESTION AND ANSWER SECTION\s*\n+",
-            "",
-            full_text,
-            flags=re.MULTILINE,
-        ).strip()
-        processed_text += "\n........................................................................................"
-
-        blocks = self._extract_blocks_from_section(processed_text)
+        section_index, span = self._resolve_span(full_text, section_index, span, "question_and_answer_section")
+        blocks = self._extract_blocks_from_section(section_index, *span)
 
         # Initialise the question group index
         question_group_index = 0
         question_order = 0
 
-        print('doing block')
-
-        for block in blocks:
-            lines = block.split("\n")
-            lines = [
-                line.strip() for line in lines if line.strip()
-            ]  # Clean empty lines within the block
-            lines = [
-                line for line in lines if not line.isdigit()
-            ]  # Clean lines with page number
-
+        for lines in blocks:
             speaker_name = "N/A"
             role_name = "N/A"
-            text_content = ""
+            company_name = "N/A"
+            text_lines = []
 
             if not lines:
                 continue  # Skip empty blocks
 
-<<<<<<< HEAD
-            if len(lines) == 1:
-                continue # skip content with just one line
-
-            # Handle the Operator case: Speaker and start of text are on the first line
-            if lines[0].startswith("Operator"):
-=======
-            operatorPattern = r"^.{0,10}Operator ?:?"
-
-            # Handle the Operator case: Speaker and start of text are on the first line
-            if re.match(operatorPattern, lines[0]):
-                print(f'found operator: {question_group_index}')
->>>>>>> 4aeff7444b59e1a2144fb41bb3ab46187304e396
+            # Handle the Operator case: Speaker and start of text are on the first line.
+            # Operator hand-offs are usually single-line blocks, so this runs before the length check.
+            if _OPERATOR_PATTERN.match(lines[0]):
                 question_group_index = question_group_index + 1
                 question_order = 0
                 continue
             elif lines[0].startswith('.'):
-                print('overflow line')
-                lines = lines[1:0] # If there is an overflow of the separator onto the first line of the next block, then remove it
-
-
-            if not lines:
-                continue  # Skip empty blocks
+                continue # Skip blocks where the separator overflows onto their first line
 
-            if lines[0].startswith("."):
-                lines = lines[1:] # If there is an overflow of the separator onto the first line of the next block, then remove it
+            if len(lines) == 1:
+                continue # skip content with just one line
 
             # Handle the disclaimer at the end
             if lines[0].startswith("Disclaimer"):
@@ -206,7 +200,7 @@ class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
                     # Final cleanup for the role
                     role_name = self._correct_role_spelling(role_name)
                     # Remove optional Q/A from role
-                    role_name = re.sub(r"\s*(Q|A)$", "", role_name).strip()
+                    role_name = _QUESTION_ANSWER_SUFFIX_PATTERN.sub("", role_name).strip()
                     role_name, company_name = (
                         role_name.split(",")[0].strip(),
                         role_name.split(",")[-1].strip(),
@@ -218,57 +212,48 @@ class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
                         else company_name
                     )
                 if len(lines) > 2:
-                    text_content = "\n".join(lines[2 :])
-
-            # Final cleanup for text content (e.g., removing any leading/trailing blank lines)
-            text_content = text_content.strip()
-
-            entries.append(
-                {
-                    "question_order": question_order,
-                    "question_answer_group_id": question_group_index,
-                    "speaker": speaker_name,
-                    "role": role_name,
-                    "company": company_name,
-                    "content": text_content,
-                }
+                    text_lines = lines[2:]
+
+            # Lines are already stripped and non-empty, so joining them with newlines needs no further cleanup
+            turn = TranscriptTurn(
+                speaker=speaker_name,
+                role=role_name,
+                company=company_name,
+                question_answer_group_id=question_group_index,
+                question_order=question_order,
+                separator="\n",
             )
+            turn.extend_lines(text_lines)
+            entries.append(turn)
 
             question_order += 1
 
         return entries
 
-    def get_discussion(self, full_text):
+    def get_discussion(self, full_text, section_index: Optional[TranscriptSectionIndex] = None, span: Optional[tuple[int, int]] = None):
         """
         Parses the Management Discussion section from a transcript into a pandas dataframe
         with 'speaker', 'role', 'content' columns.
 
         Args:
-            full_text (str): The complete transcript text.
+            full_text (str): The management discussion section text, or the complete transcript text.
+            section_index (TranscriptSectionIndex, optional): An index already built over full_text.
+            span (tuple[int, int], optional): The section's range within full_text. Defaults to
+                everything after the "MANAGEMENT DISCUSSION SECTION" heading, or the whole text.
 
         Returns:
-            List: A list of objects that contain the speaker, role, company and content.
+            list[TranscriptTurn]: One turn per speaker block with the speaker, role, company and content.
         """
         entries = []
 
-        # Add an implicit separator at the end to ensure the last block is captured
-        processed_text = full_text.strip()
-        processed_text += "\n........................................................................................"
-
-        blocks = self._extract_blocks_from_section(processed_text)
-
-        for block in blocks:
-            lines = block.split("\n")
-            lines = [
-                line.strip() for line in lines if line.strip()
-            ]  # Clean empty lines within the block
-            lines = [
-                line for line in lines if not line.isdigit()
-            ]  # Clean lines with page number
+        section_index, span = self._resolve_span(full_text, section_index, span, "management_discussion_section")
+        blocks = self._extract_blocks_from_section(section_index, *span)
 
+        for lines in blocks:
             speaker_name = "N/A"
             role_name = "N/A"
-            text_content = ""
+            company_name = "N/A"
+            text_lines = []
 
             if not lines:
                 continue  # Skip empty blocks
@@ -294,80 +279,68 @@ class JpMorganTranscriptExtractor(BaseTranscriptExtractor):
                         else company_name
                     )
                 if len(lines) > 2:
-                    text_content = "\n".join(lines[2:])
-
-            # Final cleanup for text content (e.g., removing any leading/trailing blank lines)
-            text_content = text_content.strip()
-
-            entries.append(
-                {
-                    "speaker": speaker_name,
-                    "role": role_name,
-                    "company": company_name,
-                    "content": text_content,
-                }
+                    text_lines = lines[2:]
+
+            turn = TranscriptTurn(
+                speaker=speaker_name,
+                role=role_name,
+                company=company_name,
+                separator="\n",
             )
+            turn.extend_lines(text_lines)
+            entries.append(turn)
 
         return entries
 
-    def get_qna_df(self, full_text) -> pd.DataFrame:
+    def get_qna_df(self, full_text, section_index: Optional[TranscriptSectionIndex] = None, span: Optional[tuple[int, int]] = None) -> pd.DataFrame:
         """
         Extracts the Question-and-Answer Session from the transcript text and structures it.
 
         Returns:
-            dict: A nested dictionary with structured Q&A data.
+            pd.DataFrame: A DataFrame with structured Q&A data.
         """
-        extracted_qna = self.get_qna(full_text)
-        return pd.DataFrame(extracted_qna)
+        return turns_to_dataframe(self.get_qna(full_text, section_index, span), JPM_QNA_COLUMNS)
 
-    def get_discussion_df(self, full_text) -> pd.DataFrame:
+    def get_discussion_df(self, full_text, section_index: Optional[TranscriptSectionIndex] = None, span: Optional[tuple[int, int]] = None) -> pd.DataFrame:
         """
         Extracts the management discussion section from the transcript text and structures it.
 
         Returns:
             pd.DataFrame: A DataFrame with structured management discussion data.
         """
-        extracted_discussion = self.get_discussion(full_text)
-        return pd.DataFrame(extracted_discussion)
+        return turns_to_dataframe(self.get_discussion(full_text, section_index, span), JPM_DISCUSSION_COLUMNS)
 
     def parse_transcript_to_dataframes(self):
         """Parses a raw transcript text into a DataFrame of speaking turns."""
 
         # Initial Cleaning
-        # Remove source tags
-        text = re.sub(r"\\", "", self.transcript_file_text)
-        # Condense multiple newlines
-        text = re.sub(r"\n{2,}", "\n", text).strip()
-
-        # Section Segmentation
-        sections = re.split(
-            r"(MANAGEMENT DISCUSSION SECTION|QUESTION AND ANSWER SECTION)", text
-        )
-        sections = [section.strip() for section in sections if section.strip()]
-        current_section_name = (
-            "INTRO"  # Default for anything before first section header
+        # Remove source tags (blank lines need no condensing: empty lines are dropped from every block)
+        text = self.transcript_file_text.replace("\\", "")
+
+        # Section Segmentation: a single scan records every heading and separator offset
+        section_index = TranscriptSectionIndex(text)
+        headings = sorted(
+            [(start, end, "MANAGEMENT DISCUSSION SECTION") for start, end in section_index.spans("management_discussion_section")]
+            + [(start, end, "QUESTION AND ANSWER SECTION") for start, end in section_index.spans("question_and_answer_section")]
         )
 
         df_q_and_a = pd.DataFrame()
         df_presentation = pd.DataFrame()
 
-        # Iterate through the sections and their content
-        for i, part in enumerate(sections):
-            # skip if the part is empty
-            if not part.strip():
-                continue
+        # Each section runs from the end of its heading to the start of the next heading
+        for i, (_, heading_end, current_section_name) in enumerate(headings):
+            section_end = headings[i + 1][0] if i + 1 < len(headings) else len(text)
 
-            # Store the section name then move onto the content of the section
-            if part in ["MANAGEMENT DISCUSSION SECTION", "QUESTION AND ANSWER SECTION"]:
-                current_section_name = part
+            # skip if the section is empty
+            if not text[heading_end:section_end].strip():
                 continue
 
             # If we're looking at the Q&A section, then parse to the Q&A dataframe
             if current_section_name == "QUESTION AND ANSWER SECTION":
-                df_q_and_a = self.get_qna_df(part)
+                df_q_and_a = self.get_qna_df(text, section_index, (heading_end, section_end))
 
-            # If we're looking at the Q&A section, then parse to the Q&A dataframe
+            # If we're looking at the management discussion section, then parse to the presentation dataframe
             if current_section_name == "MANAGEMENT DISCUSSION SECTION":
-                df_presentation = self.get_discussion_df(part)
+                df_presentation = self.get_discussion_df(text, section_index, (heading_end, section_end))
 
         return df_q_and_a, df_presentation
@@ -0,0 +1,161 @@
+import re
+from bisect import bisect_left
+from typing import Iterator, Optional
+
+# Fixed section headings, by the marker name used to look them up
+_HEADINGS = {
+    "Company Participants": "company_participants",
+    "Conference Call Participants": "conference_call_participants",
+    "Question-and-Answer Session": "question_and_answer_session",
+    "MANAGEMENT DISCUSSION SECTION": "management_discussion_section",
+    "QUESTION AND ANSWER SECTION": "question_and_answer_section",
+    "Disclaimer": "disclaimer",
+}
+
+# Every section marker the extractors care about, matched in a single pass over the transcript.
+# Plain alternatives of literals (no named groups, no case-insensitive flag) let the regex engine
+# skip ahead to candidate first characters, which makes the scan several times faster; the match
+# is classified afterwards from its text. "\.\.\.\.\.+" is the dotted separator (5 or more dots).
+_MARKER_PATTERN = re.compile(
+    "|".join(re.escape(heading) for heading in _HEADINGS)
+    + r"|\.\.\.\.\.+"
+    + r"|Operator|OPERATOR|operator"
+)
+
+MARKERS = list(_HEADINGS.values()) + ["separator", "operator", "Operator"]
+
+
+class TranscriptSectionIndex:
+    """
+    Records the offsets of every section boundary in a transcript with one linear scan.
+
+    The extractors then work on (start, end) ranges of the original string instead of
+    splitting, re-joining and re-searching the text for each section: compiled patterns
+    and str.find accept pos/endpos bounds, so no section has to be copied to be searched.
+    (A memoryview cannot be taken of a str, so offset ranges play that role here.)
+
+    Example:
+        index = TranscriptSectionIndex(text)
+        start, end = index.span_after("question_and_answer_session")
+        for line in index.iter_lines(start, end):
+            ...
+    """
+    def __init__(self, text: str):
+        self.text = text
+        self._starts = {marker: [] for marker in MARKERS}
+        self._ends = {marker: [] for marker in MARKERS}
+        for match in _MARKER_PATTERN.finditer(text):
+            matched = match.group()
+            if matched[0] == ".":
+                marker = "separator"
+            elif matched in _HEADINGS:
+                marker = _HEADINGS[matched]
+            else:
+                # 'operator' covers every case variant (operator lines), while the participant
+                # sections end at the first case-sensitive "Operator"
+                marker = "operator"
+                if matched == "Operator":
+                    self._starts["Operator"].append(match.start())
+                    self._ends["Operator"].append(match.end())
+            self._starts[marker].append(match.start())
+            self._ends[marker].append(match.end())
+
+    def count(self, marker: str) -> int:
+        return len(self._starts[marker])
+
+    def find(self, marker: str, start: int = 0, end: Optional[int] = None) -> Optional[tuple[int, int]]:
+        """
+        Returns the (start, end) offsets of the first occurrence of a marker at or after `start`.
+
+        Args:
+            marker (str): One of MARKERS ("Operator" is the case-sensitive operator marker).
+            start (int): Offset to search from.
+            end (int, optional): Occurrences starting at or after this offset are ignored.
+
+        Returns:
+            Optional[tuple[int, int]]: The offsets, or None when the marker does not occur.
+        """
+        starts = self._starts[marker]
+        position = bisect_left(starts, start)
+        if position == len(starts) or (end is not None and starts[position] >= end):
+            return None
+        return starts[position], self._ends[marker][position]
+
+    def spans(self, marker: str) -> list[tuple[int, int]]:
+        """
+        Returns the (start, end) offsets of every occurrence of a marker.
+        """
+        return list(zip(self._starts[marker], self._ends[marker]))
+
+    def span_after(self, marker: str) -> Optional[tuple[int, int]]:
+        """
+        Returns the range from the end of the first occurrence of a marker to the end of the text.
+        """
+        found = self.find(marker)
+        return (found[1], len(self.text)) if found else None
+
+    def span_between(self, marker: str, end_markers: list[str], start: int = 0) -> Optional[tuple[int, int]]:
+        """
+        Returns the range between the first `marker` at or after `start` and the nearest
+        following occurrence of any of `end_markers`.
+
+        Returns:
+            Optional[tuple[int, int]]: The range, or None when either side is missing.
+        """
+        found = self.find(marker, start)
+        if not found:
+            return None
+        ends = [self.find(end_marker, found[1]) for end_marker in end_markers]
+        ends = [end[0] for end in ends if end]
+        return (found[1], min(ends)) if ends else None
+
+    def line_bounds(self, position: int) -> tuple[int, int]:
+        """
+        Returns the (start, end) offsets of the line containing `position`, excluding the newline.
+        """
+        line_start = self.text.rfind("\n", 0, position) + 1
+        line_end = self.text.find("\n", position)
+        return line_start, len(self.text) if line_end == -1 else line_end
+
+    def operator_lines(self, start: int = 0, end: Optional[int] = None) -> Iterator[tuple[int, int]]:
+        """
+        Yields the line bounds of the lines that consist only of "Operator", "OPERATOR" or "operator",
+        which separate the Q&A groups in the Goldman Sachs transcripts.
+        """
+        for operator_start in self._starts["operator"][bisect_left(self._starts["operator"], start):]:
+            if end is not None and operator_start >= end:
+                return
+            line_start, line_end = self.line_bounds(operator_start)
+            if self.text[line_start:line_end].strip().lower() == "operator":
+                yield line_start, line_end
+
+    def separators(self, start: int, end: int) -> list[tuple[int, int]]:
+        """
+        Returns the offsets of the dotted separator lines that split speaker blocks within a range.
+        """
+        first = bisect_left(self._starts["separator"], start)
+        last = bisect_left(self._starts["separator"], end)
+        return list(zip(self._starts["separator"][first:last], self._ends["separator"][first:last]))
+
+    def iter_blocks(self, start: int, end: int) -> Iterator[str]:
+        """
+        Yields the text between consecutive separators within a range (the last block runs to `end`).
+        Only the individual blocks are copied out of the transcript, never the whole section.
+        """
+        block_start = start
+        for separator_start, separator_end in self.separators(start, end):
+            yield self.text[block_start:separator_start]
+            block_start = separator_end
+        yield self.text[block_start:end]
+
+    def iter_lines(self, start: int, end: int) -> Iterator[str]:
+        """
+        Yields the lines of a range without copying the range itself.
+        """
+        text = self.text
+        while start < end:
+            line_end = text.find("\n", start, end)
+            if line_end == -1:
+                line_end = end
+            yield text[start:line_end]
+            start = line_end + 1
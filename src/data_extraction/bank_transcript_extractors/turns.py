@@ -0,0 +1,121 @@
+import sys
+from typing import Iterable, Optional
+
+import pandas as pd
+
+
+def _intern(value: Optional[str]) -> Optional[str]:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+class TranscriptTurn:
+    """
+    A single speaker turn extracted from a transcript.
+
+    Uses __slots__ (no per-instance __dict__) and interns the speaker, role, company
+    and content type strings, which repeat across every turn of a transcript. The
+    content is accumulated as a list of lines and joined when it is read (once, when
+    the DataFrame is built), instead of growing a string with += for every line.
+    """
+    __slots__ = (
+        "question_answer_group_id",
+        "question_order",
+        "speaker",
+        "role",
+        "company",
+        "content_type",
+        "_lines",
+        "_separator",
+        "_leading_separator",
+    )
+
+    def __init__(
+        self,
+        speaker: str,
+        role: Optional[str],
+        company: Optional[str],
+        content_type: Optional[str] = None,
+        question_answer_group_id: Optional[int] = None,
+        question_order: Optional[int] = None,
+        separator: str = " ",
+        leading_separator: bool = False,
+    ):
+        self.question_answer_group_id = question_answer_group_id
+        self.question_order = question_order
+        self.speaker = _intern(speaker)
+        self.role = _intern(role)
+        self.company = _intern(company)
+        self.content_type = _intern(content_type)
+        self._lines = []
+        self._separator = separator
+        self._leading_separator = leading_separator
+
+    def add_line(self, line: str) -> None:
+        self._lines.append(line)
+
+    def extend_lines(self, lines: Iterable[str]) -> None:
+        self._lines.extend(lines)
+
+    @property
+    def content(self) -> str:
+        content = self._separator.join(self._lines)
+        if self._leading_separator and self._lines:
+            return self._separator + content
+        return content
+
+    def to_dict(self) -> dict:
+        return {
+            "content_type": self.content_type,
+            "content": self.content,
+            "speaker": self.speaker,
+            "role": self.role,
+            "company": self.company,
+        }
+
+    def __repr__(self) -> str:
+        return (
+            f"TranscriptTurn(group={self.question_answer_group_id}, order={self.question_order}, "
+            f"speaker={self.speaker!r}, content_type={self.content_type!r}, lines={len(self._lines)})"
+        )
+
+
+QNA_COLUMNS = [
+    "question_order",
+    "question_answer_group_id",
+    "speaker",
+    "role",
+    "company",
+    "content_type",
+    "content",
+    "quarter",
+    "year",
+]
+
+DISCUSSION_COLUMNS = ["speaker", "role", "company", "content", "quarter", "year"]
+
+
+def turns_to_dataframe(turns: Iterable[TranscriptTurn], columns: list[str], quarter=None, year=None) -> pd.DataFrame:
+    """
+    Builds a DataFrame straight from the turn records (one row tuple per turn),
+    without first copying every field into a dict of parallel lists.
+
+    Args:
+        turns (Iterable[TranscriptTurn]): The extracted turns.
+        columns (list[str]): Output columns, e.g. QNA_COLUMNS or DISCUSSION_COLUMNS.
+            'quarter' and 'year' are filled from the arguments, everything else from the turn.
+        quarter: The quarter of the transcript.
+        year: The year of the transcript.
+
+    Returns:
+        pd.DataFrame: One row per turn.
+    """
+    constants = {"quarter": quarter, "year": year}
+    getters = [
+        (lambda turn, column=column: constants[column]) if column in constants
+        else (lambda turn, column=column: getattr(turn, column))
+        for column in columns
+    ]
+    return pd.DataFrame.from_records(
+        (tuple(getter(turn) for getter in getters) for turn in turns),
+        columns=columns,
+    )
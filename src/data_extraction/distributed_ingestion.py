@@ -0,0 +1,401 @@
+import logging
+import multiprocessing
+import os
+import socket
+import sqlite3
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from typing import Callable, Optional
+
+import pandas as pd
+
+from ..utils.pdf_utils import extract_period_from_filename, extract_text_from_pdf, extract_transcript_dfs_from_pdf
+from .ingestion_service import BANK_DIRECTORIES, DISCUSSION_FILENAME, QNA_FILENAME, TRANSCRIPTS_DIRECTORY
+
+DOCUMENTS_FILENAME = "documents_df.csv"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS tasks (
+    task_id INTEGER PRIMARY KEY,
+    pdf_path TEXT NOT NULL UNIQUE,
+    bank TEXT NOT NULL,
+    document_type TEXT NOT NULL,
+    year INTEGER,
+    quarter INTEGER,
+    partition_key TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    lease_owner TEXT,
+    lease_expires REAL,
+    output_paths TEXT,
+    error TEXT,
+    updated_at REAL
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+CREATE TABLE IF NOT EXISTS workers (
+    worker_id TEXT PRIMARY KEY,
+    host TEXT,
+    pid INTEGER,
+    started_at REAL,
+    heartbeat_at REAL,
+    current_task_id INTEGER,
+    tasks_done INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def partition_key(bank: str, document_type: str, year: Optional[int], quarter: Optional[int]) -> str:
+    period = f"{year}Q{quarter}" if year and quarter else "undated"
+    return f"{bank}/{document_type}/{period}"
+
+
+class WorkQueue:
+    """
+    A SQLite-backed queue of PDF extraction tasks shared by a coordinator and any number of workers.
+
+    Workers lease one task at a time for `lease_seconds` and keep the lease alive with heartbeats
+    while they work. A task whose lease expired (the worker crashed or lost the filesystem) goes
+    back to the queue, until it has been attempted `max_attempts` times. Completing a task is
+    fenced on the lease owner, so a worker that lost its lease cannot overwrite the result of the
+    worker that took over.
+
+    The database lives on the shared filesystem next to the outputs. SQLite relies on POSIX file
+    locks, so on network filesystems make sure locking is supported (NFSv4, or a local disk for
+    single-box runs).
+    """
+    def __init__(self, db_path: str, lease_seconds: float = 60.0, max_attempts: int = 3):
+        self.db_path = db_path
+        self.lease_seconds = lease_seconds
+        self.max_attempts = max_attempts
+        os.makedirs(os.path.dirname(db_path) or ".", exist_ok=True)
+        with self._connect() as connection:
+            connection.executescript(_SCHEMA)
+
+    @contextmanager
+    def _connect(self):
+        # Autocommit connections, opened per operation so they can be used from any process or thread
+        connection = sqlite3.connect(self.db_path, timeout=30, isolation_level=None)
+        try:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA busy_timeout=30000")
+            connection.row_factory = sqlite3.Row
+            yield connection
+        finally:
+            connection.close()
+
+    # Coordinator
+
+    def enqueue(self, pdf_paths: list[str], raw_dir: str) -> int:
+        """
+        Adds PDFs under raw_dir/<bank>/<document type>/... to the queue. PDFs already queued are ignored.
+
+        Returns:
+            int: Number of tasks added.
+        """
+        rows = []
+        for pdf_path in pdf_paths:
+            parts = os.path.relpath(pdf_path, raw_dir).split(os.sep)
+            if len(parts) < 3 or parts[0] not in BANK_DIRECTORIES:
+                logging.warning(f"Skipping '{pdf_path}': not under {raw_dir}/<bank>/<document type>/")
+                continue
+            bank, document_type = parts[0], parts[1]
+            year, quarter = extract_period_from_filename(os.path.basename(pdf_path))
+            rows.append((pdf_path, bank, document_type, year, quarter, partition_key(bank, document_type, year, quarter), time.time()))
+
+        with self._connect() as connection:
+            before = connection.total_changes
+            connection.executemany(
+                "INSERT OR IGNORE INTO tasks (pdf_path, bank, document_type, year, quarter, partition_key, updated_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+            return connection.total_changes - before
+
+    def enqueue_directory(self, raw_dir: str, document_types: Optional[list[str]] = None) -> int:
+        """
+        Queues every PDF of every bank folder in raw_dir (optionally only the given document type folders,
+        e.g. ["Transcripts", "10q_k", "Press Releases"]).
+        """
+        pdf_paths = []
+        for bank_dir in BANK_DIRECTORIES:
+            for root, _, files in os.walk(os.path.join(raw_dir, bank_dir)):
+                document_type = os.path.relpath(root, os.path.join(raw_dir, bank_dir)).split(os.sep)[0]
+                if document_types is None or document_type in document_types:
+                    pdf_paths.extend(os.path.join(root, file) for file in files if file.lower().endswith(".pdf"))
+        return self.enqueue(sorted(pdf_paths), raw_dir)
+
+    def status(self) -> pd.DataFrame:
+        """
+        Number of tasks per status, with expired leases counted separately.
+        """
+        with self._connect() as connection:
+            rows = connection.execute(
+                "SELECT CASE WHEN status = 'leased' AND lease_expires < ? THEN 'expired' ELSE status END AS status, "
+                "COUNT(*) AS tasks FROM tasks GROUP BY 1",
+                (time.time(),),
+            ).fetchall()
+        return pd.DataFrame([dict(row) for row in rows], columns=["status", "tasks"])
+
+    def tasks(self) -> pd.DataFrame:
+        with self._connect() as connection:
+            return pd.read_sql_query("SELECT * FROM tasks ORDER BY task_id", connection)
+
+    def workers(self) -> pd.DataFrame:
+        with self._connect() as connection:
+            return pd.read_sql_query("SELECT * FROM workers ORDER BY started_at", connection)
+
+    # Workers
+
+    def register_worker(self, worker_id: str) -> None:
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute(
+                "INSERT OR REPLACE INTO workers (worker_id, host, pid, started_at, heartbeat_at) VALUES (?, ?, ?, ?, ?)",
+                (worker_id, socket.gethostname(), os.getpid(), now, now),
+            )
+
+    def lease(self, worker_id: str) -> Optional[sqlite3.Row]:
+        """
+        Leases the next pending task, or a task whose lease has expired.
+
+        Returns:
+            Optional[sqlite3.Row]: The task, or None when nothing is left to lease.
+        """
+        now = time.time()
+        with self._connect() as connection:
+            # BEGIN IMMEDIATE takes the write lock up front, so two workers cannot lease the same task
+            connection.execute("BEGIN IMMEDIATE")
+            try:
+                connection.execute(
+                    "UPDATE tasks SET status = 'failed', error = COALESCE(error, 'lease expired too many times'), updated_at = ? "
+                    "WHERE status = 'leased' AND lease_expires < ? AND attempts >= ?",
+                    (now, now, self.max_attempts),
+                )
+                task = connection.execute(
+                    "SELECT * FROM tasks WHERE status = 'pending' OR (status = 'leased' AND lease_expires < ?) "
+                    "ORDER BY attempts, task_id LIMIT 1",
+                    (now,),
+                ).fetchone()
+                if task is not None:
+                    connection.execute(
+                        "UPDATE tasks SET status = 'leased', lease_owner = ?, lease_expires = ?, attempts = attempts + 1, updated_at = ? "
+                        "WHERE task_id = ?",
+                        (worker_id, now + self.lease_seconds, now, task["task_id"]),
+                    )
+                    connection.execute(
+                        "UPDATE workers SET current_task_id = ?, heartbeat_at = ? WHERE worker_id = ?",
+                        (task["task_id"], now, worker_id),
+                    )
+                    task = connection.execute("SELECT * FROM tasks WHERE task_id = ?", (task["task_id"],)).fetchone()
+                connection.execute("COMMIT")
+                return task
+            except Exception:
+                connection.execute("ROLLBACK")
+                raise
+
+    def heartbeat(self, worker_id: str, task_id: Optional[int]) -> bool:
+        """
+        Extends the worker's lease on its task.
+
+        Returns:
+            bool: False when the lease was lost (it expired and another worker took the task).
+        """
+        now = time.time()
+        with self._connect() as connection:
+            connection.execute("UPDATE workers SET heartbeat_at = ? WHERE worker_id = ?", (now, worker_id))
+            if task_id is None:
+                return True
+            updated = connection.execute(
+                "UPDATE tasks SET lease_expires = ? WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                (now + self.lease_seconds, task_id, worker_id),
+            ).rowcount
+        return updated == 1
+
+    def complete(self, worker_id: str, task_id: int, output_paths: list[str]) -> bool:
+        with self._connect() as connection:
+            updated = connection.execute(
+                "UPDATE tasks SET status = 'done', output_paths = ?, error = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                ("\n".join(output_paths), time.time(), task_id, worker_id),
+            ).rowcount
+            if updated:
+                connection.execute(
+                    "UPDATE workers SET tasks_done = tasks_done + 1, current_task_id = NULL WHERE worker_id = ?", (worker_id,)
+                )
+        return updated == 1
+
+    def fail(self, worker_id: str, task_id: int, error: str) -> None:
+        """
+        Records a failed attempt. The task is retried by the next lease until max_attempts is reached.
+        """
+        with self._connect() as connection:
+            connection.execute(
+                "UPDATE tasks SET status = CASE WHEN attempts >= ? THEN 'failed' ELSE 'pending' END, "
+                "error = ?, lease_owner = NULL, lease_expires = NULL, updated_at = ? "
+                "WHERE task_id = ? AND lease_owner = ? AND status = 'leased'",
+                (self.max_attempts, error, time.time(), task_id, worker_id),
+            )
+            connection.execute("UPDATE workers SET current_task_id = NULL WHERE worker_id = ?", (worker_id,))
+
+    def leased_count(self) -> int:
+        """
+        Number of tasks currently leased by a worker (live or not yet expired).
+        """
+        with self._connect() as connection:
+            return connection.execute("SELECT COUNT(*) FROM tasks WHERE status = 'leased'").fetchone()[0]
+
+    def done_output_paths(self) -> list[str]:
+        with self._connect() as connection:
+            rows = connection.execute("SELECT output_paths FROM tasks WHERE status = 'done' ORDER BY task_id").fetchall()
+        return [path for row in rows if row["output_paths"] for path in row["output_paths"].split("\n")]
+
+
+def extract_task(pdf_path: str, bank: str, document_type: str) -> dict[str, pd.DataFrame]:
+    """
+    Default task: transcripts go through the bank's transcript extractor (qna and discussion rows),
+    every other filing is stored as one row of extracted text per document.
+
+    Returns:
+        dict[str, pd.DataFrame]: Output filename -> rows.
+    """
+    if document_type == TRANSCRIPTS_DIRECTORY:
+        qna_df, discussion_df = extract_transcript_dfs_from_pdf(pdf_path, BANK_DIRECTORIES[bank])
+        return {QNA_FILENAME: qna_df, DISCUSSION_FILENAME: discussion_df}
+    return {DOCUMENTS_FILENAME: pd.DataFrame([{"path": pdf_path, "text": extract_text_from_pdf(pdf_path)}])}
+
+
+def _write_partition(df: pd.DataFrame, output_dir: str, task: sqlite3.Row, filename: str) -> str:
+    """
+    Writes one task's rows to output_dir/partitions/<bank>/<document type>/<period>/<task id>_<filename>.
+    The task id in the name makes re-running a task overwrite its own partition file only.
+    """
+    partition_dir = os.path.join(output_dir, "partitions", *task["partition_key"].split("/"))
+    os.makedirs(partition_dir, exist_ok=True)
+    path = os.path.join(partition_dir, f"{task['task_id']:06d}_{filename}")
+    df = df.assign(bank=task["bank"], document_type=task["document_type"], year=task["year"], quarter=task["quarter"])
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    return path
+
+
+def run_worker(db_path: str, output_dir: str, worker_id: Optional[str] = None, lease_seconds: float = 60.0,
+               max_attempts: int = 3, extract: Callable[[str, str, str], dict[str, pd.DataFrame]] = extract_task,
+               max_tasks: Optional[int] = None) -> int:
+    """
+    Leases and processes tasks until every task is done or failed. Meant to be started on every node
+    (or as several processes on one box) against the same database and output directory.
+
+    Args:
+        db_path (str): The shared queue database.
+        output_dir (str): The shared output directory for the partitioned results.
+        worker_id (str, optional): Defaults to <host>-<pid>-<random suffix>.
+        lease_seconds (float): Lease duration; heartbeats renew it every lease_seconds / 3.
+        max_attempts (int): Attempts before a task is marked failed.
+        extract (Callable): Task function (pdf_path, bank, document_type) -> {filename: DataFrame}.
+            Must be importable by the worker processes.
+        max_tasks (int, optional): Stop after this many tasks.
+
+    Returns:
+        int: Number of tasks completed by this worker.
+    """
+    worker_id = worker_id or f"{socket.gethostname()}-{os.getpid()}-{uuid.uuid4().hex[:6]}"
+    queue = WorkQueue(db_path, lease_seconds=lease_seconds, max_attempts=max_attempts)
+    queue.register_worker(worker_id)
+
+    current_task = {"task_id": None}
+    stop = threading.Event()
+
+    def send_heartbeats():
+        while not stop.wait(lease_seconds / 3):
+            # A failed heartbeat (e.g. the database is locked) must not end the thread: the lease
+            # would then expire mid-task and another worker would re-run it
+            try:
+                if not queue.heartbeat(worker_id, current_task["task_id"]):
+                    logging.warning(f"Worker {worker_id} lost the lease on task {current_task['task_id']}")
+            except Exception as e:
+                logging.error(f"Worker {worker_id} failed to send a heartbeat, retrying: {e}")
+
+    heartbeat_thread = threading.Thread(target=send_heartbeats, daemon=True)
+    heartbeat_thread.start()
+
+    completed = 0
+    try:
+        while max_tasks is None or completed < max_tasks:
+            task = queue.lease(worker_id)
+            if task is None:
+                # Other workers still hold leases; stay around to retry them if their workers crash
+                if queue.leased_count():
+                    stop.wait(min(lease_seconds / 3, 5.0))
+                    continue
+                break
+            current_task["task_id"] = task["task_id"]
+            try:
+                outputs = extract(task["pdf_path"], task["bank"], task["document_type"])
+                output_paths = [_write_partition(df, output_dir, task, filename) for filename, df in outputs.items()]
+                if queue.complete(worker_id, task["task_id"], output_paths):
+                    completed += 1
+            except Exception as e:
+                logging.error(f"Worker {worker_id} failed on '{task['pdf_path']}': {e}")
+                queue.fail(worker_id, task["task_id"], f"{type(e).__name__}: {e}")
+            finally:
+                current_task["task_id"] = None
+    finally:
+        stop.set()
+        heartbeat_thread.join()
+    return completed
+
+
+def run_local_workers(db_path: str, output_dir: str, num_workers: int = 4, **worker_kwargs) -> list[int]:
+    """
+    Runs `num_workers` worker processes on this machine until the queue is drained.
+
+    Returns:
+        list[int]: Exit codes of the worker processes.
+    """
+    processes = [
+        multiprocessing.Process(target=run_worker, args=(db_path, output_dir), kwargs=worker_kwargs, name=f"ingestion-worker-{i}")
+        for i in range(num_workers)
+    ]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    return [process.exitcode for process in processes]
+
+
+def merge_partitions(db_path: str, output_dir: str, processed_dir: str) -> dict[str, int]:
+    """
+    Combines the partition files of every completed task into the final per-bank datasets,
+    processed_dir/<bank>/{qna_df, discussion_df, documents_df}.csv.
+
+    Only the files recorded by completed tasks are read, so partial output from a worker that
+    crashed mid-task is never merged. Each dataset is written to a temporary file and renamed.
+
+    Returns:
+        dict[str, int]: Rows written per output file.
+    """
+    frames = {}
+    for path in WorkQueue(db_path).done_output_paths():
+        filename = os.path.basename(path).split("_", 1)[1]
+        df = pd.read_csv(path)
+        for bank, bank_df in df.groupby("bank", sort=False):
+            frames.setdefault((bank, filename), []).append(bank_df)
+
+    written = {}
+    for (bank, filename), bank_frames in frames.items():
+        merged = pd.concat(bank_frames, ignore_index=True)
+        sort_columns = ["year", "quarter"] + (["question_answer_group_id"] if "question_answer_group_id" in merged else [])
+        merged = merged.sort_values(sort_columns, kind="stable", ignore_index=True)
+        if filename != DOCUMENTS_FILENAME:
+            merged = merged.drop(columns=["bank", "document_type"])
+
+        output_path = os.path.join(processed_dir, bank, filename)
+        os.makedirs(os.path.dirname(output_path), exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        merged.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, output_path)
+        written[output_path] = len(merged)
+    return written
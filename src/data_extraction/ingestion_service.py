@@ -0,0 +1,333 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import asdict, dataclass
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..constants import BankType
+from ..utils.pdf_utils import extract_quarter_and_year_from_filename, extract_transcript_dfs_from_pdf
+
+# Folder names under data/raw and data/processed for each bank
+BANK_DIRECTORIES = {
+    "Goldman Sachs": BankType.GOLDMAN_SACHS,
+    "JP Morgan": BankType.JPMORGAN,
+}
+
+TRANSCRIPTS_DIRECTORY = "Transcripts"
+QNA_FILENAME = "qna_df.csv"
+DISCUSSION_FILENAME = "discussion_df.csv"
+STATE_FILENAME = "ingestion_state.json"
+METRICS_FILENAME = "ingestion_metrics.json"
+
+
+def bank_type_from_path(pdf_path: str, raw_dir: str) -> Optional[tuple[str, BankType]]:
+    """
+    Works out which bank a transcript belongs to from its location, data/raw/<bank>/Transcripts/<file>.pdf.
+
+    Returns:
+        Optional[tuple[str, BankType]]: The bank folder name and its BankType, or None for any other path.
+    """
+    parts = os.path.relpath(pdf_path, raw_dir).split(os.sep)
+    if len(parts) != 3 or parts[1] != TRANSCRIPTS_DIRECTORY or not parts[2].lower().endswith(".pdf"):
+        return None
+    bank_type = BANK_DIRECTORIES.get(parts[0])
+    return (parts[0], bank_type) if bank_type else None
+
+
+def file_sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def append_quarter_to_dataset(processed_bank_dir: str, qna_df: pd.DataFrame, discussion_df: pd.DataFrame,
+                              year: int, quarter: int) -> dict:
+    """
+    Adds one transcript's rows to the processed qna_df.csv and discussion_df.csv of a bank.
+
+    Rows already present for the same year and quarter are replaced, so re-ingesting a
+    corrected transcript does not duplicate it. Both CSVs are written to temporary files
+    first and then moved into place with os.replace, so readers always see either the
+    previous or the new version of each file.
+
+    Returns:
+        dict: Number of rows written per file.
+    """
+    os.makedirs(processed_bank_dir, exist_ok=True)
+    pending = []
+    rows = {}
+    for filename, new_rows in ((QNA_FILENAME, qna_df), (DISCUSSION_FILENAME, discussion_df)):
+        csv_path = os.path.join(processed_bank_dir, filename)
+        new_rows = new_rows.assign(year=year, quarter=quarter)
+        if os.path.exists(csv_path):
+            existing = pd.read_csv(csv_path)
+            existing = existing[~((existing["year"] == year) & (existing["quarter"] == quarter))]
+            combined = pd.concat([existing, new_rows], ignore_index=True)
+        else:
+            combined = new_rows
+        sort_columns = ["year", "quarter"] + (["question_answer_group_id"] if "question_answer_group_id" in combined else [])
+        combined = combined.sort_values(sort_columns, kind="stable", ignore_index=True)
+        tmp_path = f"{csv_path}.tmp"
+        combined.to_csv(tmp_path, index=False)
+        pending.append((tmp_path, csv_path))
+        rows[filename] = len(new_rows)
+
+    for tmp_path, csv_path in pending:
+        os.replace(tmp_path, csv_path)
+    return rows
+
+
+@dataclass
+class IngestionRecord:
+    """
+    The outcome of ingesting one transcript PDF.
+
+    Attributes:
+        first_seen (float): When the watcher first saw the file (epoch seconds).
+        modified (float): The file's mtime when it was ingested.
+        available (float): When its rows were available in the processed dataset.
+        lag_seconds (float): File arrival to rows available. Arrival is first_seen, or the mtime of a file
+            written after the previous poll (an older mtime, e.g. from a copy that preserves it, is ignored).
+    """
+    path: str
+    bank: str
+    year: Optional[int]
+    quarter: Optional[int]
+    sha256: str
+    first_seen: float
+    modified: float
+    available: float
+    lag_seconds: float
+    processing_seconds: float
+    qna_rows: int = 0
+    discussion_rows: int = 0
+    error: Optional[str] = None
+
+
+class _PollingWatcher:
+    """
+    Lists the watched directories every `interval` seconds.
+    """
+    def __init__(self, interval: float):
+        self.interval = interval
+
+    def wait(self, directories: list[str], timeout: float) -> None:
+        time.sleep(min(self.interval, timeout))
+
+    def close(self) -> None:
+        pass
+
+
+class _InotifyWatcher:
+    """
+    Blocks until a watched directory changes (Linux inotify through the optional inotify_simple package),
+    so new files are picked up as soon as they are written instead of at the next poll.
+    """
+    def __init__(self):
+        from inotify_simple import INotify, flags
+
+        self._inotify = INotify()
+        self._mask = flags.CLOSE_WRITE | flags.MOVED_TO | flags.CREATE | flags.MODIFY
+        self._watched = set()
+
+    def wait(self, directories: list[str], timeout: float) -> None:
+        for directory in directories:
+            if directory not in self._watched and os.path.isdir(directory):
+                self._inotify.add_watch(directory, self._mask)
+                self._watched.add(directory)
+        self._inotify.read(timeout=int(timeout * 1000))
+
+    def close(self) -> None:
+        self._inotify.close()
+
+
+class TranscriptIngestionService:
+    """
+    Watches data/raw/<bank>/Transcripts for new or updated PDFs and appends their rows to
+    data/processed/<bank>/qna_df.csv and discussion_df.csv as soon as they have been written.
+
+    A file is processed once its size and mtime have not changed for `debounce_seconds`, so a
+    PDF that is still being copied is not read half-written. Ingested files are recorded by
+    content hash in ingestion_state.json, so restarts and touched-but-unchanged files are not
+    reprocessed. Per-file lag (arrival to rows available) is kept in memory and written to
+    ingestion_metrics.json in the processed directory after every ingestion.
+
+    The extractor is chosen from the bank folder (see BANK_DIRECTORIES) and `extract` defaults
+    to extract_transcript_dfs_from_pdf (extract_text_from_pdf plus the bank's extractor class).
+
+    Example:
+        service = TranscriptIngestionService("data/raw", "data/processed")
+        service.run()  # until interrupted; or service.scan_once() from a scheduler or a test
+    """
+    def __init__(self, raw_dir: str = os.path.join("data", "raw"), processed_dir: str = os.path.join("data", "processed"),
+                 poll_interval: float = 1.0, debounce_seconds: float = 2.0, use_inotify: bool = True,
+                 extract: Callable[[str, BankType], tuple[pd.DataFrame, pd.DataFrame]] = extract_transcript_dfs_from_pdf):
+        self.raw_dir = raw_dir
+        self.processed_dir = processed_dir
+        self.poll_interval = poll_interval
+        self.debounce_seconds = debounce_seconds
+        self.extract = extract
+        self.records: list[IngestionRecord] = []
+        self._state_path = os.path.join(processed_dir, STATE_FILENAME)
+        self._metrics_path = os.path.join(processed_dir, METRICS_FILENAME)
+        self._state = self._load_state()
+        # path -> (size, mtime, first seen, last change seen, arrival)
+        self._pending = {}
+        self._last_poll = None
+        # path -> (size, mtime) of files that failed, retried only once they change
+        self._failed = {}
+        self._stop = threading.Event()
+        self._watcher = self._make_watcher(use_inotify)
+
+    def _make_watcher(self, use_inotify: bool):
+        if use_inotify:
+            try:
+                return _InotifyWatcher()
+            except (ImportError, OSError) as e:
+                logging.warning(f"inotify is not available ({e}), polling every {self.poll_interval}s instead")
+        return _PollingWatcher(self.poll_interval)
+
+    def _load_state(self) -> dict:
+        if not os.path.exists(self._state_path):
+            return {}
+        with open(self._state_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_json(self, data, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(data, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, path)
+
+    def transcript_dirs(self) -> list[str]:
+        return [os.path.join(self.raw_dir, bank_dir, TRANSCRIPTS_DIRECTORY) for bank_dir in BANK_DIRECTORIES]
+
+    def _list_pdfs(self) -> list[str]:
+        pdf_paths = []
+        for transcripts_dir in self.transcript_dirs():
+            if os.path.isdir(transcripts_dir):
+                with os.scandir(transcripts_dir) as entries:
+                    pdf_paths.extend(entry.path for entry in entries if entry.is_file() and entry.name.lower().endswith(".pdf"))
+        return sorted(pdf_paths)
+
+    def ready_files(self, now: Optional[float] = None) -> list[str]:
+        """
+        Updates the debounce state from the current directory listing and returns the files that
+        are new or changed since they were last ingested and have been stable for debounce_seconds.
+        """
+        now = time.time() if now is None else now
+        ready = []
+        for pdf_path in self._list_pdfs():
+            try:
+                stat = os.stat(pdf_path)
+            except FileNotFoundError:
+                continue
+            signature = (stat.st_size, stat.st_mtime)
+            ingested = self._state.get(pdf_path)
+            if ingested and (ingested["size"], ingested["mtime"]) == signature:
+                continue
+            if self._failed.get(pdf_path) == signature:
+                continue
+
+            previous = self._pending.get(pdf_path)
+            if previous is None or previous[:2] != signature:
+                if previous:
+                    first_seen, arrival = previous[2], previous[4]
+                else:
+                    # A file written since the last poll arrived at its mtime; anything else when we first saw it
+                    first_seen = now
+                    arrival = stat.st_mtime if self._last_poll is not None and self._last_poll < stat.st_mtime < now else now
+                self._pending[pdf_path] = (*signature, first_seen, now, arrival)
+            elif now - previous[3] >= self.debounce_seconds:
+                ready.append(pdf_path)
+        self._last_poll = now
+        return ready
+
+    def ingest(self, pdf_path: str) -> IngestionRecord:
+        """
+        Extracts one transcript and appends it to its bank's processed dataset.
+        """
+        start = time.perf_counter()
+        size, mtime, first_seen, _, arrival = self._pending.pop(pdf_path)
+        bank_dir, bank_type = bank_type_from_path(pdf_path, self.raw_dir)
+        quarter, year = extract_quarter_and_year_from_filename(os.path.basename(pdf_path))
+        quarter, year = (int(quarter), int(year)) if quarter and year else (None, None)
+
+        record = IngestionRecord(path=pdf_path, bank=bank_type.value, year=year, quarter=quarter, sha256="",
+                                 first_seen=first_seen, modified=mtime, available=0.0, lag_seconds=0.0,
+                                 processing_seconds=0.0)
+        if year is None:
+            record.error = "Could not read the quarter and year from the filename"
+        else:
+            try:
+                # Inside the try: the file can be deleted or renamed between the scan and now
+                record.sha256 = file_sha256(pdf_path)
+                if not any(entry.get("sha256") == record.sha256 for entry in self._state.values()):
+                    qna_df, discussion_df = self.extract(pdf_path, bank_type)
+                    rows = append_quarter_to_dataset(os.path.join(self.processed_dir, bank_dir), qna_df, discussion_df, year, quarter)
+                    record.qna_rows, record.discussion_rows = rows[QNA_FILENAME], rows[DISCUSSION_FILENAME]
+            except Exception as e:
+                record.error = f"{type(e).__name__}: {e}"
+
+        record.available = time.time()
+        record.lag_seconds = record.available - arrival
+        record.processing_seconds = time.perf_counter() - start
+        if record.error:
+            self._failed[pdf_path] = (size, mtime)
+            logging.error(f"Failed to ingest '{pdf_path}': {record.error}")
+        else:
+            self._state[pdf_path] = {"size": size, "mtime": mtime, "sha256": record.sha256, "ingested_at": record.available}
+            self._save_json(self._state, self._state_path)
+            logging.info(f"Ingested '{pdf_path}': {record.qna_rows} Q&A and {record.discussion_rows} discussion rows, lag {record.lag_seconds:.2f}s")
+        self.records.append(record)
+        self._save_json(self.metrics(), self._metrics_path)
+        return record
+
+    def scan_once(self, now: Optional[float] = None) -> list[IngestionRecord]:
+        """
+        Ingests every file that is ready. Call repeatedly (run does) to advance the debounce.
+        """
+        return [self.ingest(pdf_path) for pdf_path in self.ready_files(now)]
+
+    def run(self, max_seconds: Optional[float] = None) -> None:
+        """
+        Watches and ingests until `stop` is called (or max_seconds have passed).
+        """
+        deadline = None if max_seconds is None else time.monotonic() + max_seconds
+        while not self._stop.is_set() and (deadline is None or time.monotonic() < deadline):
+            self.scan_once()
+            # Wake up early enough to re-check files that are still inside their debounce window
+            timeout = self.debounce_seconds if self._pending else self.poll_interval
+            self._watcher.wait(self.transcript_dirs(), timeout)
+        self._watcher.close()
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    def metrics(self) -> dict:
+        """
+        Lag from file arrival to rows available, over every file ingested by this service.
+
+        Returns:
+            dict: Counts, lag percentiles (seconds), pending files and the per-file records.
+        """
+        lags = np.array([record.lag_seconds for record in self.records if not record.error])
+        return {
+            "files_ingested": int(len(lags)),
+            "files_failed": sum(1 for record in self.records if record.error),
+            "files_pending": len(self._pending),
+            "lag_seconds_p50": float(np.percentile(lags, 50)) if len(lags) else None,
+            "lag_seconds_p95": float(np.percentile(lags, 95)) if len(lags) else None,
+            "lag_seconds_max": float(lags.max()) if len(lags) else None,
+            "last_lag_seconds": float(lags[-1]) if len(lags) else None,
+            "records": [asdict(record) for record in self.records],
+        }
@@ -0,0 +1,435 @@
+import json
+import logging
+import mmap
+import os
+import random
+import time
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+from .near_duplicates import nltk_sent_tokenize
+
+STORE_FORMAT_VERSION = 1
+
+SECTIONS = ["discussion", "qna"]
+
+TEXT_FILENAME = "text.bin"
+RECORDS_FILENAME = "records.bin"
+# The hash table is written under a new name per append (slots_<records>.npy), named in the manifest
+SLOTS_FILENAME_PATTERN = "slots_{records:012d}.npy"
+MANIFEST_FILENAME = "manifest.json"
+
+# One fixed-width record per turn or sentence. Sentences point into their turn's bytes, so they add no text.
+RECORD_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("offset", "<u8"),
+    ("length", "<u4"),
+    ("speaker", "<u4"),
+    ("role", "<u4"),
+    ("company", "<u4"),
+    ("turn", "<i8"),
+])
+
+# Bit layout of a record key, from the lowest bits: (field, bits). group, order and sentence are
+# stored + 1 so that 0 means "none" (discussion turns have no group; turns have no sentence).
+_KEY_FIELDS = [("sentence", 14), ("order", 14), ("group", 13), ("quarter", 2), ("year", 8), ("section", 1), ("bank", 12)]
+_KEY_SHIFTS = {name: sum(bits for _, bits in _KEY_FIELDS[:index]) for index, (name, _) in enumerate(_KEY_FIELDS)}
+_KEY_BITS = dict(_KEY_FIELDS)
+_YEAR_BASE = 1950
+_HASH_MULTIPLIER = 0x9E3779B97F4A7C15
+
+
+def _fibonacci_slots(keys: np.ndarray, bits: int) -> np.ndarray:
+    return (keys * np.uint64(_HASH_MULTIPLIER)) >> np.uint64(64 - bits)
+
+
+def _pack_key(bank_id: int, section: str, year: int, quarter: int, group: Optional[int], order: int,
+              sentence: Optional[int]) -> int:
+    values = {
+        "bank": bank_id,
+        "section": SECTIONS.index(section),
+        "year": int(year) - _YEAR_BASE,
+        "quarter": int(quarter) - 1,
+        "group": 0 if group is None else int(group) + 1,
+        "order": int(order) + 1,
+        "sentence": 0 if sentence is None else int(sentence) + 1,
+    }
+    key, shift = 0, 0
+    for name, bits in _KEY_FIELDS:
+        if not 0 <= values[name] < (1 << bits):
+            raise ValueError(f"{name}={values[name]} does not fit the {bits}-bit {name} field of the corpus store key")
+        key |= values[name] << shift
+        shift += bits
+    return key
+
+
+def _intern(value, strings: list[str], string_ids: dict[str, int]) -> int:
+    value = "" if value is None or (isinstance(value, float) and np.isnan(value)) else str(value)
+    if value not in string_ids:
+        string_ids[value] = len(strings)
+        strings.append(value)
+    return string_ids[value]
+
+
+class CorpusStore:
+    """
+    An append-only, memory-mapped store of the transcript turn and sentence texts, with O(1)
+    lookup by (bank, section, year, quarter, group, order[, sentence]).
+
+    All text lives in one UTF-8 blob (text.bin) and every turn and sentence is a fixed-width record
+    (records.bin) holding its packed key, byte offset and length. An open-addressing hash table
+    (slots_<records>.npy, rewritten after each append) maps keys to records. Readers memory-map the three files,
+    so a lookup is one hash probe and a slice of the mapped blob: nothing is parsed or loaded up
+    front, and every worker process opening the store shares the same pages of the OS page cache
+    instead of holding its own copy of qna_df.csv and discussion_df.csv.
+
+    Discussion turns have no group; their order is their position in the quarter's discussion_df.
+    Sentence ids follow split_sentences in near_duplicates (the n-th sentence of the turn).
+    Re-adding a turn appends a new record that supersedes the old one and its sentences in the hash table; the old
+    bytes stay in the blob. An append writes the text, the records and a new hash table file
+    first and replaces manifest.json last, so readers (and a store reopened after a crash) only
+    ever see the previous or the new manifest, each with its own matching hash table.
+
+    Example:
+        store = CorpusStore("data/corpus_store")
+        store.add_turns(gs_qna_df, BankType.GOLDMAN_SACHS.value, "qna")
+        store.text(BankType.GOLDMAN_SACHS.value, "qna", 2024, 2, group=3, order=1)
+    """
+    def __init__(self, store_dir: str, sentence_splitter: Optional[Callable[[str], list[str]]] = None):
+        self.store_dir = store_dir
+        self.sentence_splitter = sentence_splitter or nltk_sent_tokenize
+        os.makedirs(store_dir, exist_ok=True)
+        self._manifest_path = os.path.join(store_dir, MANIFEST_FILENAME)
+        self._manifest = self._load_manifest()
+        self._string_ids = {value: index for index, value in enumerate(self._manifest["strings"])}
+        self._bank_ids = {bank: index for index, bank in enumerate(self._manifest["banks"])}
+        self._open()
+
+    # Files
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.store_dir, filename)
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self._manifest_path):
+            return {"version": STORE_FORMAT_VERSION, "records": 0, "text_bytes": 0, "slots_file": None,
+                    "slot_bits": 0, "banks": [], "strings": [""], "partitions": {}}
+        with open(self._manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_manifest(self) -> None:
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(self._manifest, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+    def _open(self) -> None:
+        # Only the first manifest["records"] records and manifest["text_bytes"] bytes are read:
+        # anything past them is an append that did not finish
+        self._text = None
+        if self._manifest["text_bytes"]:
+            with open(self._path(TEXT_FILENAME), "rb") as file:
+                self._text = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        if self._manifest["records"]:
+            self._records = np.memmap(self._path(RECORDS_FILENAME), dtype=RECORD_DTYPE, mode="r",
+                                      shape=(self._manifest["records"],))
+            self._slots = np.load(self._path(self._manifest["slots_file"]), mmap_mode="r")
+        else:
+            self._records = np.zeros(0, dtype=RECORD_DTYPE)
+            self._slots = np.full(1, -1, dtype=np.int64)
+
+    def close(self) -> None:
+        """
+        Unmaps the files. While a memoryview returned by `raw` is still referenced the text blob
+        cannot be unmapped; it is then left to be unmapped once the last view is released.
+        """
+        if self._text is not None:
+            try:
+                self._text.close()
+            except BufferError:
+                logging.debug(f"Views of {self._path(TEXT_FILENAME)} are still referenced, leaving it mapped")
+            self._text = None
+        self._records = np.zeros(0, dtype=RECORD_DTYPE)
+        self._slots = np.full(1, -1, dtype=np.int64)
+
+    def refresh(self) -> None:
+        """
+        Re-reads the manifest and remaps the files, to see appends made by another process.
+        """
+        self.close()
+        self._manifest = self._load_manifest()
+        self._string_ids = {value: index for index, value in enumerate(self._manifest["strings"])}
+        self._bank_ids = {bank: index for index, bank in enumerate(self._manifest["banks"])}
+        self._open()
+
+    # Keys
+
+    def key(self, bank: str, section: str, year: int, quarter: int, group: Optional[int] = None,
+            order: int = 0, sentence: Optional[int] = None) -> Optional[int]:
+        """
+        Packs a turn or sentence id into its 64-bit record key (None for an unknown bank).
+        """
+        if bank not in self._bank_ids:
+            return None
+        return _pack_key(self._bank_ids[bank], section, year, quarter, group, order, sentence)
+
+    # Writing
+
+    def _sentence_spans(self, text: str) -> list[tuple[int, int, int]]:
+        # (sentence index, start, end) character spans of the splitter's sentences within the turn text
+        spans, position = [], 0
+        for index, sentence in enumerate(self.sentence_splitter(text)):
+            sentence = sentence.strip()
+            start = text.find(sentence, position)
+            if not sentence or start < 0:
+                logging.warning(f"Sentence not found in its turn text, skipping it: {sentence[:80]!r}")
+                continue
+            spans.append((index, start, start + len(sentence)))
+            position = start + len(sentence)
+        return spans
+
+    def add_turns(self, turns_df: pd.DataFrame, bank: str, section: str, sentences: bool = True) -> int:
+        """
+        Appends the turns (and their sentences) of a qna_df or discussion_df.
+
+        Args:
+            turns_df (pd.DataFrame): Extractor output, one or more quarters.
+            bank (str): Bank name, e.g. BankType.GOLDMAN_SACHS.value.
+            section (str): "qna" or "discussion".
+            sentences (bool): Also add a record per sentence.
+
+        Returns:
+            int: Number of records appended.
+        """
+        if turns_df.empty:
+            return 0
+        turns_df = turns_df.reset_index(drop=True)
+        if section == "qna":
+            groups = turns_df["question_answer_group_id"].astype(int).tolist()
+            orders = turns_df["question_order"].astype(int).tolist()
+        else:
+            groups = [None] * len(turns_df)
+            orders = turns_df.groupby(["year", "quarter"]).cumcount().tolist()
+
+        # Banks, strings and partitions are built on copies and only committed to the manifest once
+        # the records are written, so a row that fails (e.g. a key field out of range) leaves no trace
+        banks = list(self._manifest["banks"])
+        bank_ids = dict(self._bank_ids)
+        if bank not in bank_ids:
+            bank_ids[bank] = len(banks)
+            banks.append(bank)
+        strings = list(self._manifest["strings"])
+        string_ids = dict(self._string_ids)
+        partitions = {partition: [list(bounds) for bounds in ranges] for partition, ranges in self._manifest["partitions"].items()}
+
+        offset = self._manifest["text_bytes"]
+        first_record = self._manifest["records"]
+        chunks, records = [], []
+        for row, turn in enumerate(turns_df.itertuples(index=False)):
+            content = getattr(turn, "content")
+            text = content if isinstance(content, str) else ""
+            encoded = text.encode("utf-8")
+            year, quarter = int(getattr(turn, "year")), int(getattr(turn, "quarter"))
+            string_fields = tuple(_intern(getattr(turn, column, None), strings, string_ids)
+                                  for column in ("speaker", "role", "company"))
+            turn_record = first_record + len(records)
+            records.append((_pack_key(bank_ids[bank], section, year, quarter, groups[row], orders[row], None),
+                            offset, len(encoded), *string_fields, -1))
+            if sentences and text:
+                for index, start, end in self._sentence_spans(text):
+                    byte_start = len(text[:start].encode("utf-8"))
+                    byte_length = len(text[start:end].encode("utf-8"))
+                    records.append((_pack_key(bank_ids[bank], section, year, quarter, groups[row], orders[row], index),
+                                    offset + byte_start, byte_length, *string_fields, turn_record))
+            chunks.append(encoded)
+            offset += len(encoded)
+
+            partition = f"{bank}|{section}|{year}|{quarter}"
+            ranges = partitions.setdefault(partition, [])
+            if not ranges or ranges[-1][1] != turn_record:
+                ranges.append([turn_record, turn_record])
+            ranges[-1][1] = first_record + len(records)
+
+        new_records = np.array(records, dtype=RECORD_DTYPE)
+        self.close()
+        # Whatever happens to the writes, the store is reopened: on failure the manifest still holds
+        # the previous counts and hash table, so lookups keep working on the previous contents
+        try:
+            with open(self._path(TEXT_FILENAME), "ab") as file:
+                file.seek(self._manifest["text_bytes"])
+                file.truncate()
+                file.write(b"".join(chunks))
+            with open(self._path(RECORDS_FILENAME), "ab") as file:
+                file.seek(first_record * RECORD_DTYPE.itemsize)
+                file.truncate()
+                file.write(new_records.tobytes())
+
+            records_count = first_record + len(new_records)
+            all_records = np.memmap(self._path(RECORDS_FILENAME), dtype=RECORD_DTYPE, mode="r", shape=(records_count,))
+            previous_slots_file = self._manifest.get("slots_file")
+            slots_file = SLOTS_FILENAME_PATTERN.format(records=records_count)
+            self._manifest["slot_bits"] = self._write_slots(all_records["key"], slots_file)
+            self._manifest["slots_file"] = slots_file
+            self._manifest["banks"] = banks
+            self._manifest["strings"] = strings
+            self._manifest["partitions"] = partitions
+            self._bank_ids = bank_ids
+            self._string_ids = string_ids
+            self._manifest["records"] = records_count
+            self._manifest["text_bytes"] = offset
+            # The manifest is replaced last: until then readers keep the old counts and the old hash table
+            self._save_manifest()
+            # The previous hash table is kept for readers that loaded the previous manifest; older ones go
+            for filename in os.listdir(self.store_dir):
+                if filename.startswith("slots_") and filename.endswith(".npy") and filename not in (slots_file, previous_slots_file):
+                    try:
+                        os.remove(self._path(filename))
+                    except OSError as e:
+                        logging.warning(f"Could not remove the old hash table {filename}: {e}")
+        finally:
+            self._open()
+        return len(new_records)
+
+    def _write_slots(self, keys: np.ndarray, slots_file: str) -> int:
+        # Open addressing with linear probing, filled in rounds: in each round every unplaced key
+        # tries its current slot, one key per free slot wins, and the rest move to the next slot.
+        # Keys are inserted newest first, so a re-added turn shadows its older record.
+        bits = max(4, int(np.ceil(np.log2(max(len(keys), 1) * 2))))
+        size = 1 << bits
+        slots = np.full(size, -1, dtype=np.int64)
+        record_ids = np.arange(len(keys) - 1, -1, -1)
+        _, newest = np.unique(keys[record_ids], return_index=True)
+        pending = record_ids[np.sort(newest)]
+        position = _fibonacci_slots(np.asarray(keys)[pending], bits).astype(np.int64)
+        while len(pending):
+            free = slots[position] == -1
+            candidates, candidate_positions = pending[free], position[free]
+            _, winners = np.unique(candidate_positions, return_index=True)
+            slots[candidate_positions[winners]] = candidates[winners]
+            placed = np.zeros(len(pending), dtype=bool)
+            placed[np.flatnonzero(free)[winners]] = True
+            pending, position = pending[~placed], (position[~placed] + 1) & (size - 1)
+        tmp_path = self._path(f"{slots_file}.tmp.npy")
+        np.save(tmp_path, slots)
+        os.replace(tmp_path, self._path(slots_file))
+        return bits
+
+    # Reading
+
+    def _find(self, key: Optional[int]) -> int:
+        # len(self._records), not the manifest count: a closed store has no records mapped
+        if key is None or not len(self._records):
+            return -1
+        bits = self._manifest["slot_bits"]
+        mask = (1 << bits) - 1
+        position = ((key * _HASH_MULTIPLIER) & 0xFFFFFFFFFFFFFFFF) >> (64 - bits)
+        while True:
+            record = int(self._slots[position])
+            if record == -1:
+                return -1
+            if int(self._records[record]["key"]) == key:
+                return record
+            position = (position + 1) & mask
+
+    def _lookup(self, bank: str, section: str, year: int, quarter: int, group: Optional[int], order: int,
+                sentence: Optional[int]) -> int:
+        record = self._find(self.key(bank, section, year, quarter, group, order, sentence))
+        if record < 0 or sentence is None:
+            return record
+        # A sentence only counts if it belongs to the current record of its turn: re-adding a turn
+        # with fewer sentences must not leave the old text's trailing sentences reachable
+        turn_record = self._find(self.key(bank, section, year, quarter, group, order))
+        return record if int(self._records[record]["turn"]) == turn_record else -1
+
+    def raw(self, bank: str, section: str, year: int, quarter: int, group: Optional[int] = None,
+            order: int = 0, sentence: Optional[int] = None) -> Optional[memoryview]:
+        """
+        The UTF-8 bytes of a turn or sentence as a zero-copy view of the mapped blob (None if absent).
+        Release the view before relying on `close` to unmap the blob.
+        """
+        record = self._lookup(bank, section, year, quarter, group, order, sentence)
+        if record < 0:
+            return None
+        offset, length = int(self._records[record]["offset"]), int(self._records[record]["length"])
+        return memoryview(self._text)[offset:offset + length]
+
+    def text(self, bank: str, section: str, year: int, quarter: int, group: Optional[int] = None,
+             order: int = 0, sentence: Optional[int] = None) -> Optional[str]:
+        """
+        The text of a turn (sentence None) or of its n-th sentence.
+        """
+        view = self.raw(bank, section, year, quarter, group, order, sentence)
+        return None if view is None else str(view, "utf-8")
+
+    def record(self, bank: str, section: str, year: int, quarter: int, group: Optional[int] = None,
+               order: int = 0, sentence: Optional[int] = None) -> Optional[dict]:
+        """
+        The text of a turn or sentence with its speaker, role and company.
+        """
+        record = self._lookup(bank, section, year, quarter, group, order, sentence)
+        if record < 0:
+            return None
+        fields = self._records[record]
+        strings = self._manifest["strings"]
+        offset, length = int(fields["offset"]), int(fields["length"])
+        return {
+            "bank": bank, "section": section, "year": int(year), "quarter": int(quarter),
+            "question_answer_group_id": group, "question_order": order, "sentence_index": sentence,
+            "speaker": strings[fields["speaker"]], "role": strings[fields["role"]], "company": strings[fields["company"]],
+            "content": str(memoryview(self._text)[offset:offset + length], "utf-8"),
+        }
+
+    def group_turns(self, bank: str, year: int, quarter: int, group: int) -> list[dict]:
+        """
+        The turns of one question-answer group, in order (scans only that quarter's records).
+        """
+        turns = []
+        for start, end in self._manifest["partitions"].get(f"{bank}|qna|{year}|{quarter}", []):
+            records = self._records[start:end]
+            key_group = (records["key"] >> np.uint64(_KEY_SHIFTS["group"])) & np.uint64((1 << _KEY_BITS["group"]) - 1)
+            is_turn = (records["turn"] == -1) & (key_group == group + 1)
+            key_order = (records["key"][is_turn] >> np.uint64(_KEY_SHIFTS["order"])) & np.uint64((1 << _KEY_BITS["order"]) - 1)
+            for order in key_order.astype(int) - 1:
+                found = self.record(bank, "qna", year, quarter, group, int(order))
+                if found is not None and found not in turns:
+                    turns.append(found)
+        return sorted(turns, key=lambda turn: turn["question_order"])
+
+    def __len__(self) -> int:
+        return self._manifest["records"]
+
+
+def benchmark_corpus_store(store: CorpusStore, csv_paths: dict[tuple[str, str], str], lookups: int = 20,
+                           seed: int = 42) -> pd.DataFrame:
+    """
+    Times fetching a handful of random Q&A turns from the store against loading the CSV and filtering it.
+
+    Args:
+        store (CorpusStore): A store holding the turns of the CSVs.
+        csv_paths (dict[tuple[str, str], str]): (bank, section) -> qna_df.csv path.
+        lookups (int): Turns fetched per bank.
+
+    Returns:
+        pd.DataFrame: Per bank, the ms to fetch the turns from the store (including opening it) and from the CSV.
+    """
+    rng = random.Random(seed)
+    rows = []
+    for (bank, section), path in csv_paths.items():
+        keys = pd.read_csv(path)[["year", "quarter", "question_answer_group_id", "question_order"]].drop_duplicates()
+        sample = [tuple(int(value) for value in row) for row in keys.sample(min(lookups, len(keys)), random_state=rng.randrange(1 << 30)).itertuples(index=False)]
+
+        start = time.perf_counter()
+        reopened = CorpusStore(store.store_dir)
+        texts = [reopened.text(bank, section, year, quarter, group, order) for year, quarter, group, order in sample]
+        store_ms = (time.perf_counter() - start) * 1000
+
+        start = time.perf_counter()
+        df = pd.read_csv(path)
+        indexed = df.set_index(["year", "quarter", "question_answer_group_id", "question_order"])["content"]
+        csv_texts = [indexed.loc[key] for key in sample]
+        csv_ms = (time.perf_counter() - start) * 1000
+        rows.append({"bank": bank, "lookups": len(sample), "store_ms": store_ms, "csv_ms": csv_ms,
+                     "identical": all(a == b for a, b in zip(texts, csv_texts))})
+    return pd.DataFrame(rows)
@@ -0,0 +1,294 @@
+import os
+import pickle
+import re
+import time
+import zlib
+from typing import Callable, Optional
+
+import numpy as np
+import pandas as pd
+
+# Mersenne prime 2**31 - 1: with 32-bit shingle hashes and coefficients below it, a * x + b fits in a uint64
+_MERSENNE_PRIME = np.uint64((1 << 31) - 1)
+
+_WORD_PATTERN = re.compile(r"[a-z0-9]+(?:['.\-][a-z0-9]+)*")
+_NUMBER_PATTERN = re.compile(r"^\d[\d.,]*$")
+
+FLAG_COLUMNS = ["sentence_id", "cluster_id", "duplicate_of", "similarity", "is_near_duplicate",
+                "is_boilerplate", "cluster_quarters", "token_count"]
+
+
+def nltk_sent_tokenize(text: str) -> list[str]:
+    from nltk import sent_tokenize
+
+    return sent_tokenize(text)
+
+
+def split_sentences(turns_df: pd.DataFrame, text_column: str = "content",
+                    sentence_splitter: Optional[Callable[[str], list[str]]] = None) -> pd.DataFrame:
+    """
+    Splits the turns of a qna_df/discussion_df into one row per sentence, as done for the
+    sentence-level sentiment scoring (score_m_d_sentences_to_df).
+
+    Args:
+        turns_df (pd.DataFrame): Extractor output with 'year', 'quarter' and the text column.
+        text_column (str): Column with the turn text.
+        sentence_splitter (Callable, optional): Splits a text into sentences. Defaults to nltk.sent_tokenize.
+
+    Returns:
+        pd.DataFrame: The turn columns (without the text) plus 'turn_index', 'sentence_index' and 'sentence'.
+    """
+    sentence_splitter = sentence_splitter or nltk_sent_tokenize
+    turns_df = turns_df.reset_index(drop=True)
+    sentences = turns_df[text_column].fillna("").astype(str).map(sentence_splitter)
+
+    sentences_df = turns_df.drop(columns=[text_column]).loc[sentences.index.repeat(sentences.str.len())]
+    sentences_df["turn_index"] = sentences_df.index
+    sentences_df["sentence_index"] = sentences_df.groupby(level=0).cumcount()
+    sentences_df["sentence"] = [sentence.strip() for turn_sentences in sentences for sentence in turn_sentences]
+    return sentences_df.reset_index(drop=True)
+
+
+def _lsh_parameters(threshold: float, num_perm: int) -> tuple[int, int]:
+    """
+    Picks the number of bands and rows per band whose S-curve threshold (1 / bands) ** (1 / rows)
+    is closest to the requested similarity threshold.
+    """
+    best = None
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        distance = abs((1 / bands) ** (1 / rows) - threshold)
+        if best is None or distance < best[0]:
+            best = (distance, bands, rows)
+    return best[1], best[2]
+
+
+class SentenceDeduplicator:
+    """
+    Flags near-duplicate and boilerplate sentences across quarters with MinHash and LSH.
+
+    Every sentence is reduced to a MinHash signature of its word shingles. Sentences that
+    collide in any LSH band are compared on their signatures, and a sentence whose estimated
+    Jaccard similarity with an earlier sentence reaches `threshold` joins that sentence's
+    cluster as a near duplicate. A cluster seen in at least `min_boilerplate_quarters`
+    different quarters (operator script, forward-looking statement disclaimers, recurring
+    prepared-remark phrasing) is boilerplate.
+
+    Sentences are added incrementally with `add` (one quarter at a time, oldest first) and the
+    state can be saved, so a new quarter is only compared against the stored signatures.
+    Downstream stages run on `sentences_to_process` and copy results to the skipped
+    duplicates with `reuse_results`.
+
+    Example:
+        deduplicator = SentenceDeduplicator(threshold=0.8)
+        flagged_df = deduplicator.add(split_sentences(discussion_df))
+        to_score = deduplicator.sentences_to_process(flagged_df)
+        scored = reuse_results(classifier.score_dataframe(to_score, "sentence"), flagged_df, ["score", "label"])
+    """
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128, shingle_size: int = 3,
+                 min_boilerplate_quarters: int = 3, normalize_numbers: bool = False, seed: int = 1):
+        if not 0 < threshold <= 1:
+            raise ValueError(f"threshold must be in (0, 1], got {threshold}")
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.min_boilerplate_quarters = min_boilerplate_quarters
+        self.normalize_numbers = normalize_numbers
+        self.bands, self.rows = _lsh_parameters(threshold, num_perm)
+
+        generator = np.random.default_rng(seed)
+        self._a = generator.integers(1, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+        self._b = generator.integers(0, int(_MERSENNE_PRIME), size=num_perm, dtype=np.uint64)
+
+        self._signatures = np.empty((0, num_perm), dtype=np.uint32)
+        self._buckets = [{} for _ in range(self.bands)]
+        self._cluster_ids = []
+        self._cluster_quarters = {}
+        self.seconds = 0.0
+
+    def _tokens(self, sentence: str) -> list[str]:
+        tokens = _WORD_PATTERN.findall(sentence.lower())
+        if self.normalize_numbers:
+            tokens = ["<num>" if _NUMBER_PATTERN.match(token) else token for token in tokens]
+        return tokens
+
+    def _shingle_hashes(self, tokens: list[str]) -> list[int]:
+        size = min(self.shingle_size, len(tokens)) or 1
+        shingles = {" ".join(tokens[i:i + size]) for i in range(max(len(tokens) - size + 1, 1))}
+        return [zlib.crc32(shingle.encode("utf-8")) for shingle in shingles]
+
+    def signatures(self, sentences: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Computes the MinHash signatures of a list of sentences.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: (number of sentences, num_perm) signatures and the token count of each sentence.
+        """
+        token_lists = [self._tokens(sentence) for sentence in sentences]
+        shingle_lists = [self._shingle_hashes(tokens) for tokens in token_lists]
+        token_counts = np.array([len(tokens) for tokens in token_lists], dtype=np.int32)
+
+        signatures = np.empty((len(sentences), self.num_perm), dtype=np.uint32)
+        # Hash the shingles of many sentences at once, then take the per-sentence minimum with reduceat
+        chunk_size = 512
+        for chunk_start in range(0, len(sentences), chunk_size):
+            chunk = shingle_lists[chunk_start:chunk_start + chunk_size]
+            lengths = np.array([len(shingles) for shingles in chunk])
+            hashes = np.fromiter((value for shingles in chunk for value in shingles), dtype=np.uint64, count=int(lengths.sum()))
+            permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME
+            offsets = np.concatenate([[0], np.cumsum(lengths)[:-1]])
+            signatures[chunk_start:chunk_start + len(chunk)] = np.minimum.reduceat(permuted, offsets, axis=0)
+        return signatures, token_counts
+
+    def add(self, sentences_df: pd.DataFrame, text_column: str = "sentence") -> pd.DataFrame:
+        """
+        Adds sentences to the index and flags the ones that near-duplicate an earlier sentence.
+
+        Args:
+            sentences_df (pd.DataFrame): Sentences (e.g. from `split_sentences`) with 'year' and 'quarter',
+                in transcript order. Add quarters oldest first so the earliest occurrence stays canonical.
+            text_column (str): Column with the sentence text.
+
+        Returns:
+            pd.DataFrame: sentences_df with FLAG_COLUMNS added. 'sentence_id' is the sentence's position
+                in the index and 'cluster_id' the sentence_id of the first sentence of its cluster.
+        """
+        start = time.perf_counter()
+        sentences_df = sentences_df.reset_index(drop=True)
+        signatures, token_counts = self.signatures(sentences_df[text_column].fillna("").astype(str).tolist())
+        quarters = (sentences_df["year"].astype(str) + "Q" + sentences_df["quarter"].astype(str)).tolist()
+
+        first_id = len(self._signatures)
+        self._signatures = np.vstack([self._signatures, signatures])
+        duplicate_of = np.full(len(sentences_df), -1, dtype=np.int64)
+        similarity = np.zeros(len(sentences_df))
+
+        for row, signature in enumerate(signatures):
+            sentence_id = first_id + row
+            band_keys = [signature[band * self.rows:(band + 1) * self.rows].tobytes() for band in range(self.bands)]
+
+            candidates = set()
+            for bucket, key in zip(self._buckets, band_keys):
+                candidates.update(bucket.get(key, ()))
+            if candidates:
+                candidate_ids = np.fromiter(candidates, dtype=np.int64, count=len(candidates))
+                scores = (self._signatures[candidate_ids] == signature).mean(axis=1)
+                best = int(np.argmax(scores))
+                if scores[best] >= self.threshold:
+                    duplicate_of[row] = candidate_ids[best]
+                    similarity[row] = scores[best]
+
+            if duplicate_of[row] >= 0:
+                cluster_id = self._cluster_ids[duplicate_of[row]]
+            else:
+                cluster_id = sentence_id
+                # Only cluster representatives go into the buckets, which keeps the candidate lists short
+                for bucket, key in zip(self._buckets, band_keys):
+                    bucket.setdefault(key, []).append(sentence_id)
+            self._cluster_ids.append(cluster_id)
+            self._cluster_quarters.setdefault(cluster_id, set()).add(quarters[row])
+
+        sentence_ids = np.arange(first_id, first_id + len(sentences_df))
+        flagged_df = sentences_df.assign(
+            sentence_id=sentence_ids,
+            cluster_id=np.asarray(self._cluster_ids[first_id:], dtype=np.int64),
+            duplicate_of=pd.array(np.where(duplicate_of >= 0, duplicate_of, None), dtype="Int64"),
+            similarity=similarity,
+            token_count=token_counts,
+        )
+        flagged_df["is_near_duplicate"] = duplicate_of >= 0
+        self.seconds += time.perf_counter() - start
+        return self.refresh_flags(flagged_df)
+
+    def refresh_flags(self, flagged_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Updates the boilerplate flags of previously flagged sentences: a cluster becomes boilerplate
+        once it has been seen in enough quarters, which may happen in a later `add`.
+        """
+        cluster_quarters = flagged_df["cluster_id"].map(lambda cluster_id: len(self._cluster_quarters[cluster_id]))
+        return flagged_df.assign(
+            cluster_quarters=cluster_quarters.astype("int32"),
+            is_boilerplate=cluster_quarters >= self.min_boilerplate_quarters,
+        )
+
+    @staticmethod
+    def sentences_to_process(flagged_df: pd.DataFrame, skip_boilerplate: bool = True) -> pd.DataFrame:
+        """
+        The sentences a downstream stage still has to run on: the first sentence of each cluster,
+        leaving out boilerplate clusters entirely when skip_boilerplate is set.
+        """
+        keep = ~flagged_df["is_near_duplicate"]
+        if skip_boilerplate:
+            keep &= ~flagged_df["is_boilerplate"]
+        return flagged_df[keep]
+
+    def save(self, path: str) -> None:
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "wb") as file:
+            pickle.dump(self, file)
+
+    @staticmethod
+    def load(path: str) -> "SentenceDeduplicator":
+        with open(path, "rb") as file:
+            return pickle.load(file)
+
+
+def reuse_results(results_df: pd.DataFrame, flagged_df: pd.DataFrame, columns: list[str]) -> pd.DataFrame:
+    """
+    Copies a downstream stage's results from each cluster's processed sentence to its near duplicates.
+
+    Args:
+        results_df (pd.DataFrame): Output of the stage on `sentences_to_process`, with 'sentence_id'
+            and the result columns. May include results from earlier quarters.
+        flagged_df (pd.DataFrame): All flagged sentences.
+        columns (list[str]): Result columns to copy (e.g. ["score", "label"]).
+
+    Returns:
+        pd.DataFrame: flagged_df with the result columns; skipped boilerplate clusters stay empty.
+    """
+    results = results_df.drop_duplicates("sentence_id").set_index("sentence_id")[columns]
+    reused = results.reindex(flagged_df["cluster_id"].to_numpy())
+    return flagged_df.drop(columns=[column for column in columns if column in flagged_df]).assign(
+        **{column: reused[column].to_numpy() for column in columns}
+    )
+
+
+def dedup_report(flagged_df: pd.DataFrame, stage_seconds: Optional[dict[str, float]] = None,
+                 dedup_seconds: float = 0.0, skip_boilerplate: bool = True) -> dict:
+    """
+    Summarises how much text the downstream stages no longer have to process.
+
+    Args:
+        flagged_df (pd.DataFrame): Output of SentenceDeduplicator.add.
+        stage_seconds (dict[str, float], optional): Measured run time of each downstream stage on the
+            full text (e.g. {"sentiment": 512.0, "topics": 96.0}). The saving per stage is estimated
+            in proportion to the tokens removed.
+        dedup_seconds (float): Time spent deduplicating (SentenceDeduplicator.seconds), subtracted
+            from the saving.
+        skip_boilerplate (bool): Whether boilerplate sentences are skipped (as in `sentences_to_process`).
+
+    Returns:
+        dict: Sentence and token counts before and after, the share removed and the estimated seconds saved.
+    """
+    removed = flagged_df["is_near_duplicate"]
+    if skip_boilerplate:
+        removed = removed | flagged_df["is_boilerplate"]
+    tokens_total = int(flagged_df["token_count"].sum())
+    tokens_removed = int(flagged_df.loc[removed, "token_count"].sum())
+    token_share_removed = tokens_removed / tokens_total if tokens_total else 0.0
+
+    report = {
+        "sentences_total": len(flagged_df),
+        "sentences_removed": int(removed.sum()),
+        "near_duplicate_sentences": int(flagged_df["is_near_duplicate"].sum()),
+        "boilerplate_sentences": int(flagged_df["is_boilerplate"].sum()),
+        "tokens_total": tokens_total,
+        "tokens_removed": tokens_removed,
+        "token_share_removed": token_share_removed,
+        "dedup_seconds": dedup_seconds,
+    }
+    if stage_seconds:
+        saved = {stage: seconds * token_share_removed for stage, seconds in stage_seconds.items()}
+        report["seconds_saved_by_stage"] = saved
+        report["seconds_saved_end_to_end"] = sum(saved.values()) - dedup_seconds
+    return report
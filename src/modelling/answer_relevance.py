@@ -0,0 +1,465 @@
+import json
+import logging
+import os
+import re
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+from ..analytics.speaker_index import simplify_role
+from ..analytics.transcript_search import ABBREVIATIONS_PATH, load_bank_stopwords, tokenize
+from ..utils.common_helpers import read_yaml_file
+from .llm_client_pool import LLMRequest, LLMResult
+
+# The sentence-transformers model used for the topic models and the RAG notebook
+DEFAULT_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+FEATURES = ["cosine", "question_coverage", "jaccard", "log_answer_length", "deferral"]
+
+# Starting weights of the logistic scorer, before calibrate() fits them to LLM labels
+DEFAULT_WEIGHTS = {
+    "intercept": -3.0,
+    "cosine": 5.0,
+    "question_coverage": 4.0,
+    "jaccard": 2.0,
+    "log_answer_length": 0.3,
+    "deferral": -2.5,
+}
+
+PAIR_COLUMNS = [
+    "pair_id",
+    "bank",
+    "year",
+    "quarter",
+    "question_answer_group_id",
+    "thread",
+    "answer_order",
+    "answer_speaker",
+    "answer_role",
+    "question",
+    "answer",
+]
+
+# Answers that put the question off rather than address it
+_DEFERRAL_PATTERN = (
+    r"not going to (?:comment|get into|give|guide|speculate)|(?:too early|premature) to"
+    r"|(?:can't|cannot|won't|don't want to) (?:comment|get into|guide|speculate|give)"
+    r"|not (?:in a position|prepared) to|(?:more|that) at (?:the )?investor day|we'll (?:update|come back)"
+)
+
+# Function words left out of the lexical overlap, on top of the bank topic modelling stopwords
+_FUNCTION_WORDS = frozenset(
+    "a an the and or but if of to in on at for from by with about as is are was were be been being it its "
+    "this that these those there here we you i our your they their he she them us me my what which who how "
+    "do does did so just not no can could would should will may might have has had than then also very".split()
+)
+
+# The final prompt of Fact_Checker.ipynb
+RELEVANCE_PROMPT = """Q: {question}
+A: {answer}
+Did A answer Q?
+Reply only with:
+Answered: Yes/No
+Reason: <one short sentence>
+"""
+
+
+def build_question_answer_pairs(qna_df: pd.DataFrame, bank: Optional[str] = None, first_pair_id: int = 0) -> pd.DataFrame:
+    """
+    Pairs every executive answer with the analyst question it responds to.
+
+    Within a question_answer_group_id, a run of consecutive question turns starts a thread
+    (the opening question, then each follow-up) and every answer turn is paired with the
+    question turns of its thread. Questions are the 'question' content_type where the extractor
+    sets one (Goldman Sachs) and analyst turns otherwise (JP Morgan).
+
+    Args:
+        qna_df (pd.DataFrame): A processed qna_df (one row per speaker turn).
+        bank (str, optional): Bank name written to the 'bank' column.
+        first_pair_id (int): pair_id of the first pair, so the pairs of several banks can be concatenated.
+
+    Returns:
+        pd.DataFrame: One row per answer turn, with PAIR_COLUMNS, indexed by pair_id.
+    """
+    ordered = qna_df.sort_values(["year", "quarter", "question_answer_group_id", "question_order"]).reset_index(drop=True)
+    if "content_type" in ordered:
+        is_question = ordered["content_type"].eq("question").to_numpy()
+    else:
+        roles = ordered["role"].drop_duplicates()
+        role_simple = ordered["role"].map(dict(zip(roles, roles.map(simplify_role))))
+        is_question = role_simple.eq("Analyst").to_numpy()
+
+    group_keys = ["year", "quarter", "question_answer_group_id"]
+    new_group = ordered[group_keys].ne(ordered[group_keys].shift()).any(axis=1).to_numpy()
+    previous_question = np.concatenate([[False], is_question[:-1]]) & ~new_group
+    thread_start = is_question & ~previous_question
+    ordered["thread"] = pd.Series(thread_start.astype(int)).groupby([ordered[key] for key in group_keys]).cumsum()
+    ordered["is_question"] = is_question
+
+    content = ordered["content"].fillna("").astype(str)
+    questions = (content[is_question].groupby([ordered[key][is_question] for key in group_keys + ["thread"]])
+                 .agg(" ".join).rename("question").reset_index())
+    answers = ordered[~is_question & (ordered["thread"] > 0)]
+    pairs = answers.merge(questions, on=group_keys + ["thread"], how="inner")
+    pairs = pairs.rename(columns={"question_order": "answer_order", "speaker": "answer_speaker",
+                                  "role": "answer_role", "content": "answer"})
+    pairs["answer"] = pairs["answer"].fillna("").astype(str)
+    pairs["bank"] = bank
+    pairs["pair_id"] = np.arange(first_pair_id, first_pair_id + len(pairs))
+    return pairs.reindex(columns=PAIR_COLUMNS).set_axis(pairs["pair_id"].to_numpy())
+
+
+def parse_answered(generated_text: Optional[str]) -> Optional[bool]:
+    """
+    Reads the Yes/No verdict out of a completion of RELEVANCE_PROMPT (as extract_yes_no_reason
+    in Fact_Checker.ipynb, which also copes with the prompt being echoed back).
+    """
+    if not isinstance(generated_text, str):
+        return None
+    # text-generation pipelines return the prompt followed by the completion
+    completion = generated_text.split("<one short sentence>")[-1]
+    match = re.search(r"Answered:\s*(Yes|No)\b", completion, re.IGNORECASE) or re.search(r"\b(Yes|No)\b", completion, re.IGNORECASE)
+    return match.group(1).lower() == "yes" if match else None
+
+
+def _sigmoid(values: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-values))
+
+
+class AnswerRelevancePrefilter:
+    """
+    First-pass answer relevance scorer that sends only the ambiguous pairs to the LLM.
+
+    check_answer_relevance in Fact_Checker.ipynb prompts the LLM for every (question, answer)
+    pair. Here every pair is scored first from:
+        - the cosine similarity of the question and answer embeddings (sentence-transformers,
+          every distinct text encoded once, in batches)
+        - the share of the question's content words found in the answer, and their Jaccard
+          overlap, after folding expansions onto their abbreviations ("net interest income" -> "nii")
+        - the answer length, and whether it defers the question ("too early to", "at investor day")
+    The features are combined by a logistic scorer into p_answered. Pairs with p_answered at or
+    above `upper` are labelled answered, pairs at or below `lower` not answered, and only the
+    pairs in between become LLM requests. calibrate() fits the weights and the band to a sample
+    of LLM labels.
+
+    Example:
+        prefilter = AnswerRelevancePrefilter(lower=0.2, upper=0.8)
+        pairs = build_question_answer_pairs(qna_df, BankType.JPMORGAN.value)
+        routed = prefilter.route(pairs)
+        requests = build_relevance_requests(routed)
+    """
+    def __init__(self, embed: Optional[Callable[[list[str]], np.ndarray]] = None,
+                 embedding_model: str = DEFAULT_EMBEDDING_MODEL, batch_size: int = 64,
+                 lower: float = 0.2, upper: float = 0.8, weights: Optional[dict[str, float]] = None,
+                 stopwords: Optional[Iterable[str]] = None, abbreviations_path: str = ABBREVIATIONS_PATH):
+        self._embed = embed
+        self.embedding_model = embedding_model
+        self.batch_size = batch_size
+        self.lower = lower
+        self.upper = upper
+        self.weights = dict(weights or DEFAULT_WEIGHTS)
+        if stopwords is None:
+            stopwords = set().union(*load_bank_stopwords().values())
+        self.stopwords = frozenset(stopwords) | _FUNCTION_WORDS
+        self._fold_pattern, self._folds = self._load_folds(abbreviations_path)
+        self._model = None
+
+    @staticmethod
+    def _load_folds(abbreviations_path: str) -> tuple[Optional[re.Pattern], dict[str, str]]:
+        folds = {}
+        for abbreviation, expansion in read_yaml_file(abbreviations_path).items():
+            long, short = " ".join(tokenize(str(expansion))), "".join(tokenize(str(abbreviation)))
+            if long and short and long != short:
+                folds[long] = short
+        if not folds:
+            return None, folds
+        alternatives = sorted(folds, key=len, reverse=True)
+        return re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in alternatives) + r")\b"), folds
+
+    def embed(self, texts: list[str]) -> np.ndarray:
+        """
+        Encodes texts into L2-normalized embeddings, in batches.
+        """
+        if self._embed is not None:
+            embeddings = np.asarray(self._embed(texts), dtype=np.float32)
+        else:
+            if self._model is None:
+                from sentence_transformers import SentenceTransformer
+                self._model = SentenceTransformer(self.embedding_model)
+            embeddings = self._model.encode(texts, batch_size=self.batch_size, convert_to_numpy=True,
+                                            normalize_embeddings=True, show_progress_bar=False).astype(np.float32)
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1.0, norms)
+
+    def _content_tokens(self, texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Tokenizes texts into their distinct content words.
+
+        Returns:
+            tuple[np.ndarray, np.ndarray]: CSR-style offsets (len(texts) + 1) and token ids, sorted within each text.
+        """
+        vocabulary = {}
+        text_ids, token_ids = [], []
+        for text_id, text in enumerate(texts):
+            text = " ".join(tokenize(text))
+            if self._fold_pattern is not None:
+                text = self._fold_pattern.sub(lambda match: self._folds[match.group(0)], text)
+            for token in set(text.split()):
+                if token not in self.stopwords and not token.isdigit():
+                    text_ids.append(text_id)
+                    token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        text_ids = np.asarray(text_ids, dtype=np.int64)
+        token_ids = np.asarray(token_ids, dtype=np.int64)
+        order = np.lexsort((token_ids, text_ids))
+        offsets = np.concatenate([[0], np.cumsum(np.bincount(text_ids, minlength=len(texts)))])
+        return offsets, token_ids[order]
+
+    @staticmethod
+    def _gather(offsets: np.ndarray, token_ids: np.ndarray, text_index: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+        # The tokens of text_index[i] for every i, flattened, with the position i they belong to
+        lengths = offsets[text_index + 1] - offsets[text_index]
+        owner = np.repeat(np.arange(len(text_index)), lengths)
+        within = np.arange(lengths.sum()) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return owner, token_ids[np.repeat(offsets[text_index], lengths) + within]
+
+    def features(self, pairs_df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Computes FEATURES for every pair. Each distinct question or answer text is embedded and
+        tokenized once (a question is shared by every answer of its thread).
+
+        Returns:
+            pd.DataFrame: FEATURES, aligned with pairs_df.
+        """
+        if pairs_df.empty:
+            return pd.DataFrame(columns=FEATURES, index=pairs_df.index, dtype=float)
+        texts, inverse = np.unique(np.concatenate([pairs_df["question"].to_numpy(str), pairs_df["answer"].to_numpy(str)]),
+                                   return_inverse=True)
+        question_index, answer_index = inverse[:len(pairs_df)], inverse[len(pairs_df):]
+
+        embeddings = self.embed(texts.tolist())
+        cosine = np.einsum("ij,ij->i", embeddings[question_index], embeddings[answer_index])
+
+        offsets, token_ids = self._content_tokens(texts.tolist())
+        vocabulary_size = int(token_ids.max()) + 1 if len(token_ids) else 1
+        question_owner, question_tokens = self._gather(offsets, token_ids, question_index)
+        answer_owner, answer_tokens = self._gather(offsets, token_ids, answer_index)
+        shared = np.isin(question_owner * vocabulary_size + question_tokens, answer_owner * vocabulary_size + answer_tokens,
+                         assume_unique=True)
+        overlap = np.bincount(question_owner[shared], minlength=len(pairs_df))
+        question_size = np.diff(offsets)[question_index]
+        answer_size = np.diff(offsets)[answer_index]
+        union = question_size + answer_size - overlap
+
+        return pd.DataFrame({
+            "cosine": cosine,
+            "question_coverage": overlap / np.maximum(question_size, 1),
+            "jaccard": overlap / np.maximum(union, 1),
+            "log_answer_length": np.log1p(pairs_df["answer"].str.count(r"\S+").to_numpy()),
+            "deferral": pairs_df["answer"].str.contains(_DEFERRAL_PATTERN, case=False, regex=True).to_numpy(float),
+        }, index=pairs_df.index)
+
+    def score(self, features_df: pd.DataFrame) -> np.ndarray:
+        """
+        Returns p_answered for every row of features_df.
+        """
+        weights = np.array([self.weights[feature] for feature in FEATURES])
+        return _sigmoid(features_df[FEATURES].to_numpy(float) @ weights + self.weights["intercept"])
+
+    def route(self, pairs_df: pd.DataFrame, features_df: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """
+        Scores the pairs and decides which need the LLM.
+
+        Args:
+            pairs_df (pd.DataFrame): Output of build_question_answer_pairs.
+            features_df (pd.DataFrame, optional): Precomputed features (e.g. when sweeping bands).
+
+        Returns:
+            pd.DataFrame: pairs_df with FEATURES, 'p_answered' and 'decision', one of
+            "answered", "not_answered" or "llm".
+        """
+        features_df = self.features(pairs_df) if features_df is None else features_df
+        p_answered = self.score(features_df)
+        routed = pd.concat([pairs_df, features_df], axis=1)
+        routed["p_answered"] = p_answered
+        routed["decision"] = np.select([p_answered >= self.upper, p_answered <= self.lower], ["answered", "not_answered"], "llm")
+        return routed
+
+    def calibrate(self, features_df: pd.DataFrame, llm_answered: pd.Series, target_agreement: float = 0.95,
+                  l2: float = 1.0, iterations: int = 25) -> "AnswerRelevancePrefilter":
+        """
+        Fits the scorer to LLM labels and widens the band until the pairs decided without the LLM
+        agree with it at `target_agreement`.
+
+        The weights are an L2-regularized logistic regression on FEATURES, fitted by Newton's method. `upper` becomes the lowest score above which at least
+        target_agreement of the pairs are labelled answered by the LLM, and `lower` the highest
+        score below which at least target_agreement are labelled not answered.
+
+        Args:
+            features_df (pd.DataFrame): FEATURES of a sample of pairs.
+            llm_answered (pd.Series): LLM verdicts (True/False, None when unparsed or missing), indexed
+                like features_df (the index of build_question_answer_pairs is the pair_id).
+            target_agreement (float): Agreement required on each side of the band.
+            l2 (float): Ridge penalty on the feature weights.
+            iterations (int): Newton steps.
+        """
+        llm_answered = llm_answered.reindex(features_df.index)
+        labelled = llm_answered.notna().to_numpy()
+        X = features_df[FEATURES].to_numpy(float)[labelled]
+        y = llm_answered[labelled].astype(float).to_numpy()
+        if len(np.unique(y)) < 2:
+            logging.warning("Cannot calibrate the answer relevance prefilter: the LLM labels have a single class.")
+            return self
+        X = np.hstack([np.ones((len(X), 1)), X])
+        penalty = np.eye(X.shape[1]) * l2
+        penalty[0, 0] = 0.0
+        weights = np.zeros(X.shape[1])
+        for _ in range(iterations):
+            p = _sigmoid(X @ weights)
+            gradient = X.T @ (p - y) + penalty @ weights
+            hessian = (X * (p * (1 - p))[:, None]).T @ X + penalty
+            step = np.linalg.solve(hessian, gradient)
+            weights -= step
+            if np.abs(step).max() < 1e-8:
+                break
+        self.weights = {"intercept": float(weights[0]), **{feature: float(w) for feature, w in zip(FEATURES, weights[1:])}}
+
+        p = _sigmoid(X @ weights)
+        order = np.argsort(p)
+        p_sorted, y_sorted = p[order], y[order]
+        # Agreement of "answered" for p >= p_sorted[i] (suffixes) and "not answered" for p <= p_sorted[i] (prefixes)
+        count = np.arange(1, len(y) + 1)
+        suffix_yes = np.cumsum(y_sorted[::-1])[::-1] / count[::-1]
+        prefix_no = np.cumsum(1 - y_sorted) / count
+        upper_ok = np.flatnonzero(suffix_yes >= target_agreement)
+        lower_ok = np.flatnonzero(prefix_no >= target_agreement)
+        self.upper = float(p_sorted[upper_ok[0]]) if len(upper_ok) else 1.0
+        self.lower = float(p_sorted[lower_ok[-1]]) if len(lower_ok) else 0.0
+        if self.lower >= self.upper:
+            self.lower = self.upper = float((self.lower + self.upper) / 2)
+        return self
+
+    def save(self, path: str) -> None:
+        """
+        Writes the weights and the band as JSON.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump({"embedding_model": self.embedding_model, "lower": self.lower, "upper": self.upper,
+                       "weights": self.weights}, file, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, embed: Optional[Callable[[list[str]], np.ndarray]] = None, **kwargs) -> "AnswerRelevancePrefilter":
+        with open(path, "r", encoding="utf-8") as file:
+            saved = json.load(file)
+        return cls(embed=embed, embedding_model=saved["embedding_model"], lower=saved["lower"], upper=saved["upper"],
+                   weights=saved["weights"], **kwargs)
+
+
+def build_relevance_requests(routed_df: pd.DataFrame, only_ambiguous: bool = True) -> list[LLMRequest]:
+    """
+    Builds the RELEVANCE_PROMPT requests for the LLMClientPool.
+
+    Args:
+        routed_df (pd.DataFrame): Output of AnswerRelevancePrefilter.route (or build_question_answer_pairs).
+        only_ambiguous (bool): Only the pairs routed to the LLM; False requests every pair (the LLM-only baseline).
+    """
+    selected = routed_df[routed_df["decision"] == "llm"] if only_ambiguous and "decision" in routed_df else routed_df
+    requests = []
+    for row in selected.itertuples(index=False):
+        metadata = {
+            "pair_id": int(row.pair_id),
+            "year": int(row.year),
+            "quarter": int(row.quarter),
+            "question_answer_group_id": int(row.question_answer_group_id),
+        }
+        request_id = "_".join(str(value) for value in metadata.values())
+        if isinstance(row.bank, str):
+            metadata["bank"] = row.bank
+            request_id = f"{row.bank}_{request_id}"
+        messages = [{"role": "user", "content": RELEVANCE_PROMPT.format(question=row.question, answer=row.answer)}]
+        requests.append(LLMRequest(request_id, messages, metadata))
+    return requests
+
+
+def llm_labels_from_results(results: Iterable[LLMResult]) -> pd.Series:
+    """
+    Parses LLMClientPool results of relevance requests.
+
+    Returns:
+        pd.Series: LLM verdict (True/False/None) indexed by pair_id.
+    """
+    labels = {result.metadata["pair_id"]: parse_answered(result.generated_text) for result in results}
+    return pd.Series(labels, dtype=object, name="llm_answered").sort_index()
+
+
+def apply_llm_labels(routed_df: pd.DataFrame, llm_answered: pd.Series) -> pd.DataFrame:
+    """
+    Fills in the final 'answered' verdict: the prefilter's where it decided, the LLM's elsewhere.
+
+    Returns:
+        pd.DataFrame: routed_df with 'answered' and 'label_source' ("prefilter" or "llm").
+    """
+    labelled = routed_df.copy()
+    from_llm = labelled["pair_id"].map(llm_answered)
+    labelled["answered"] = np.where(labelled["decision"] == "llm", from_llm,
+                                    labelled["decision"] == "answered").astype(object)
+    labelled.loc[(labelled["decision"] == "llm") & from_llm.isna(), "answered"] = None
+    labelled["label_source"] = np.where(labelled["decision"] == "llm", "llm", "prefilter")
+    return labelled
+
+
+def prefilter_report(routed_df: pd.DataFrame, llm_answered: pd.Series) -> dict:
+    """
+    Compares the routed pairs with LLM-only labels (the LLM run on every pair).
+
+    Args:
+        routed_df (pd.DataFrame): Output of AnswerRelevancePrefilter.route.
+        llm_answered (pd.Series): LLM verdict for every pair, indexed by pair_id.
+
+    Returns:
+        dict: Pairs, LLM calls made and avoided, the agreement of the prefilter's own decisions
+        and of the final (prefilter + LLM) labels with the LLM-only labels.
+    """
+    reference = routed_df["pair_id"].map(llm_answered)
+    decided = routed_df["decision"] != "llm"
+    evaluable = decided & reference.notna()
+    prefilter_answered = routed_df["decision"] == "answered"
+    agreement = (prefilter_answered[evaluable] == reference[evaluable].astype(bool)).mean() if evaluable.any() else float("nan")
+
+    final = apply_llm_labels(routed_df, llm_answered)["answered"]
+    comparable = final.notna() & reference.notna()
+    overall = (final[comparable].astype(bool) == reference[comparable].astype(bool)).mean() if comparable.any() else float("nan")
+    return {
+        "pairs": int(len(routed_df)),
+        "llm_calls": int((~decided).sum()),
+        "llm_calls_avoided": int(decided.sum()),
+        "llm_calls_avoided_fraction": float(decided.mean()) if len(routed_df) else float("nan"),
+        "auto_answered": int((routed_df["decision"] == "answered").sum()),
+        "auto_not_answered": int((routed_df["decision"] == "not_answered").sum()),
+        "prefilter_agreement": float(agreement),
+        "final_agreement": float(overall),
+        "lower": float(routed_df.loc[routed_df["decision"] == "not_answered", "p_answered"].max())
+        if (routed_df["decision"] == "not_answered").any() else float("nan"),
+        "upper": float(routed_df.loc[routed_df["decision"] == "answered", "p_answered"].min())
+        if (routed_df["decision"] == "answered").any() else float("nan"),
+    }
+
+
+def band_sweep(prefilter: AnswerRelevancePrefilter, pairs_df: pd.DataFrame, features_df: pd.DataFrame,
+               llm_answered: pd.Series, bands: Iterable[tuple[float, float]]) -> pd.DataFrame:
+    """
+    The trade-off between LLM calls avoided and agreement for several (lower, upper) bands.
+    """
+    rows = []
+    original = prefilter.lower, prefilter.upper
+    try:
+        for lower, upper in bands:
+            prefilter.lower, prefilter.upper = lower, upper
+            report = prefilter_report(prefilter.route(pairs_df, features_df), llm_answered)
+            rows.append({"band_lower": lower, "band_upper": upper, **{k: v for k, v in report.items() if k not in ("lower", "upper")}})
+    finally:
+        prefilter.lower, prefilter.upper = original
+    return pd.DataFrame(rows)
@@ -0,0 +1,498 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import urllib.error
+import urllib.request
+from abc import ABC, abstractmethod
+from dataclasses import dataclass, field
+from typing import Any, Iterable, Optional
+
+import pandas as pd
+
+
+@dataclass
+class LLMRequest:
+    """
+    A single prompt to be sent to an LLM backend.
+
+    Attributes:
+        request_id (str): Identifier written alongside the result (e.g. "2022_2_5").
+        messages (list[dict]): Chat messages in the {"role": ..., "content": ...} format.
+        metadata (dict): Any extra keys (bank, year, quarter, group id) copied to the result.
+    """
+    request_id: str
+    messages: list[dict]
+    metadata: dict = field(default_factory=dict)
+
+
+@dataclass
+class LLMResult:
+    """
+    The outcome of a single LLMRequest.
+    """
+    request_id: str
+    generated_text: Optional[str]
+    metadata: dict
+    latency_seconds: float
+    attempts: int
+    cached: bool = False
+    error: Optional[str] = None
+
+    def to_dict(self) -> dict:
+        return {
+            "request_id": self.request_id,
+            "generated_text": self.generated_text,
+            "latency_seconds": self.latency_seconds,
+            "attempts": self.attempts,
+            "cached": self.cached,
+            "error": self.error,
+            **self.metadata,
+        }
+
+
+class RetryableLLMError(Exception):
+    """
+    Raised by a backend when a request failed but may succeed if retried
+    (e.g. HTTP 429/5xx). `retry_after` is honoured by the pool when set.
+    """
+    def __init__(self, message: str, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class BaseLLMBackend(ABC):
+    """
+    Abstract Base Class for the LLM backends used by the LLMClientPool.
+
+    A backend receives a batch of message lists and returns one generated
+    text per message list, in the same order. Backends that cannot batch
+    should keep `max_batch_size` at 1.
+    """
+    max_batch_size: int = 1
+
+    @property
+    @abstractmethod
+    def model_name(self) -> str:
+        pass
+
+    @abstractmethod
+    async def generate(self, batch: list[list[dict]], generation_args: dict) -> list[str]:
+        pass
+
+
+class OpenAICompatibleBackend(BaseLLMBackend):
+    """
+    Talks to a local OpenAI-compatible chat completions server
+    (vLLM, llama.cpp server, Ollama, LM Studio, ...).
+
+    Only the standard library is used for HTTP so no extra dependency is needed;
+    each request runs in a worker thread so the event loop is never blocked.
+    """
+    def __init__(
+        self,
+        base_url: str = "http://localhost:8000/v1",
+        model: str = "microsoft/phi-4",
+        api_key: Optional[str] = None,
+        timeout: float = 120.0,
+    ):
+        self.base_url = base_url.rstrip("/")
+        self._model = model
+        self.api_key = api_key or os.environ.get("OPENAI_API_KEY", "")
+        self.timeout = timeout
+
+    @property
+    def model_name(self) -> str:
+        return self._model
+
+    def _to_payload(self, messages: list[dict], generation_args: dict) -> dict:
+        # Map the transformers pipeline arguments used in the notebooks onto the OpenAI schema
+        payload = {"model": self._model, "messages": messages}
+        if "max_new_tokens" in generation_args:
+            payload["max_tokens"] = generation_args["max_new_tokens"]
+        if generation_args.get("do_sample") is False:
+            payload["temperature"] = 0
+        for key in ("temperature", "top_p", "max_tokens", "stop", "seed"):
+            if key in generation_args:
+                payload[key] = generation_args[key]
+        return payload
+
+    def _post(self, payload: dict) -> str:
+        request = urllib.request.Request(
+            f"{self.base_url}/chat/completions",
+            data=json.dumps(payload).encode("utf-8"),
+            headers={
+                "Content-Type": "application/json",
+                "Authorization": f"Bearer {self.api_key}",
+            },
+            method="POST",
+        )
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                body = json.loads(response.read().decode("utf-8"))
+        except urllib.error.HTTPError as e:
+            if e.code == 429 or e.code >= 500:
+                retry_after = e.headers.get("Retry-After") if e.headers else None
+                raise RetryableLLMError(
+                    f"HTTP {e.code} from {self.base_url}",
+                    retry_after=float(retry_after) if retry_after else None,
+                )
+            raise
+        except (urllib.error.URLError, TimeoutError) as e:
+            raise RetryableLLMError(f"Could not reach {self.base_url}: {e}")
+
+        return body["choices"][0]["message"]["content"]
+
+    async def generate(self, batch: list[list[dict]], generation_args: dict) -> list[str]:
+        return [
+            await asyncio.to_thread(self._post, self._to_payload(messages, generation_args))
+            for messages in batch
+        ]
+
+
+class TransformersPipelineBackend(BaseLLMBackend):
+    """
+    Runs in-process batched generation with a transformers "text-generation" pipeline,
+    e.g. the `phi_4_pipe` built in actionable_intelligence_llm.ipynb.
+
+    The model is shared, so calls are serialised with a lock and the pool's
+    workers instead hand over micro-batches of up to `batch_size` prompts.
+    """
+    def __init__(self, pipe, batch_size: int = 8, model_name: Optional[str] = None):
+        self.pipe = pipe
+        self.max_batch_size = batch_size
+        self._model_name = model_name or getattr(getattr(pipe, "model", None), "name_or_path", "transformers")
+        self._lock = threading.Lock()
+
+    @property
+    def model_name(self) -> str:
+        return self._model_name
+
+    def _run(self, batch: list[list[dict]], generation_args: dict) -> list[str]:
+        with self._lock:
+            outputs = self.pipe(batch, batch_size=len(batch), **generation_args)
+        return [output[0]["generated_text"] for output in outputs]
+
+    async def generate(self, batch: list[list[dict]], generation_args: dict) -> list[str]:
+        return await asyncio.to_thread(self._run, batch, generation_args)
+
+
+class CompletionCache:
+    """
+    Append-only JSONL cache of completions keyed by a hash of the prompt.
+
+    The key covers the model name, the messages and the generation arguments,
+    so changing any of them results in a fresh completion.
+    """
+    def __init__(self, cache_path: str):
+        self.cache_path = cache_path
+        self._entries = {}
+        if os.path.exists(cache_path):
+            with open(cache_path, "r", encoding="utf-8") as file:
+                for line in file:
+                    if line.strip():
+                        entry = json.loads(line)
+                        self._entries[entry["prompt_hash"]] = entry["generated_text"]
+        else:
+            os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+
+    @staticmethod
+    def prompt_hash(model_name: str, messages: list[dict], generation_args: dict) -> str:
+        key = json.dumps(
+            {"model": model_name, "messages": messages, "generation_args": generation_args},
+            sort_keys=True,
+            ensure_ascii=False,
+        )
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+    def get(self, prompt_hash: str) -> Optional[str]:
+        return self._entries.get(prompt_hash)
+
+    def put(self, prompt_hash: str, generated_text: str) -> None:
+        self._entries[prompt_hash] = generated_text
+        with open(self.cache_path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"prompt_hash": prompt_hash, "generated_text": generated_text}, ensure_ascii=False) + "\n")
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+
+class _RateLimiter:
+    """
+    Minimal token bucket shared by all workers of a pool.
+
+    All workers run on the pool's event loop and nothing is awaited between reading and
+    reserving the next slot, so no lock is needed.
+    """
+    def __init__(self, requests_per_second: float):
+        self._interval = 1.0 / requests_per_second
+        self._next_slot = 0.0
+
+    async def acquire(self) -> None:
+        now = time.monotonic()
+        wait = self._next_slot - now
+        self._next_slot = max(now, self._next_slot) + self._interval
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+
+@dataclass
+class PoolStats:
+    """
+    Throughput and latency figures for one LLMClientPool run.
+    """
+    total_requests: int
+    succeeded: int
+    failed: int
+    cache_hits: int
+    wall_time_seconds: float
+    requests_per_second: float
+    p50_latency_seconds: float
+    p95_latency_seconds: float
+
+    def __str__(self) -> str:
+        return (
+            f"{self.succeeded}/{self.total_requests} succeeded ({self.failed} failed, "
+            f"{self.cache_hits} cached) in {self.wall_time_seconds:.2f}s - "
+            f"{self.requests_per_second:.2f} req/s, p50 {self.p50_latency_seconds:.2f}s, "
+            f"p95 {self.p95_latency_seconds:.2f}s"
+        )
+
+
+def _percentile(values: list[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(percentile / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class LLMClientPool:
+    """
+    Sends many prompts through an LLM backend with an asyncio worker pool.
+
+    Requests are fed through a bounded queue so memory stays flat however many
+    Q&A groups are submitted. Each worker retries transient failures with
+    exponential backoff, consults the completion cache first and streams every
+    result to a JSONL file as soon as it completes, so a crashed run can be
+    resumed from the cache.
+
+    Example:
+        pool = LLMClientPool(OpenAICompatibleBackend(), num_workers=8,
+                             cache_path="data/cache/llm_cache.jsonl",
+                             output_path="data/processed/areas_of_concern.jsonl")
+        results, stats = pool.run_sync(requests, generation_args)
+        print(stats)
+    """
+    def __init__(
+        self,
+        backend: BaseLLMBackend,
+        num_workers: int = 4,
+        queue_size: int = 64,
+        max_retries: int = 3,
+        retry_backoff_seconds: float = 1.0,
+        max_requests_per_second: Optional[float] = None,
+        cache_path: Optional[str] = None,
+        output_path: Optional[str] = None,
+    ):
+        self.backend = backend
+        self.num_workers = num_workers
+        self.queue_size = queue_size
+        self.max_retries = max_retries
+        self.retry_backoff_seconds = retry_backoff_seconds
+        self.max_requests_per_second = max_requests_per_second
+        self.cache = CompletionCache(cache_path) if cache_path else None
+        self.output_path = output_path
+
+    async def _call_with_retries(self, batch: list[LLMRequest], generation_args: dict, rate_limiter) -> tuple[list[str], int]:
+        attempt = 0
+        while True:
+            attempt += 1
+            if rate_limiter:
+                for _ in batch:
+                    await rate_limiter.acquire()
+            try:
+                texts = await self.backend.generate([request.messages for request in batch], generation_args)
+                return texts, attempt
+            except RetryableLLMError as e:
+                if attempt > self.max_retries:
+                    raise
+                delay = e.retry_after or self.retry_backoff_seconds * 2 ** (attempt - 1)
+                logging.warning(f"LLM request failed ({e}), retrying in {delay:.1f}s (attempt {attempt}/{self.max_retries})")
+                await asyncio.sleep(delay)
+
+    async def _worker(self, queue: asyncio.Queue, generation_args: dict, results: list, output_file, rate_limiter) -> None:
+        while True:
+            request = await queue.get()
+            if request is None:
+                queue.task_done()
+                return
+
+            # Greedily take more queued requests to fill a micro-batch for batching backends
+            batch = [request]
+            finished = False
+            while len(batch) < self.backend.max_batch_size and not queue.empty():
+                extra = queue.get_nowait()
+                if extra is None:
+                    finished = True
+                    queue.task_done()
+                    break
+                batch.append(extra)
+
+            start = time.perf_counter()
+            hashes, cached_texts = [None] * len(batch), [None] * len(batch)
+            if self.cache is not None:
+                try:
+                    hashes = [CompletionCache.prompt_hash(self.backend.model_name, r.messages, generation_args) for r in batch]
+                    cached_texts = [self.cache.get(h) for h in hashes]
+                except Exception as e:
+                    # A broken cache only costs a regeneration
+                    hashes, cached_texts = [None] * len(batch), [None] * len(batch)
+                    logging.warning(f"Completion cache lookup failed, generating instead: {type(e).__name__}: {e}")
+            to_generate = [r for r, text in zip(batch, cached_texts) if text is None]
+
+            generated, attempts, error = [], 0, None
+            if to_generate:
+                try:
+                    generated, attempts = await self._call_with_retries(to_generate, generation_args, rate_limiter)
+                    if len(generated) != len(to_generate):
+                        raise ValueError(f"Backend returned {len(generated)} texts for {len(to_generate)} prompts")
+                except Exception as e:
+                    attempts, error = attempts or self.max_retries + 1, f"{type(e).__name__}: {e}"
+                    logging.error(f"LLM request(s) {[r.request_id for r in to_generate]} failed: {error}")
+            latency = time.perf_counter() - start
+
+            # Every request gets a result and a task_done, or run() would block on a full queue
+            generated_iter = iter(generated)
+            for request, prompt_hash, cached_text in zip(batch, hashes, cached_texts):
+                try:
+                    if cached_text is not None:
+                        result = LLMResult(request.request_id, cached_text, request.metadata, 0.0, 0, cached=True)
+                    elif error is not None:
+                        result = LLMResult(request.request_id, None, request.metadata, latency, attempts, error=error)
+                    else:
+                        text = next(generated_iter)
+                        if self.cache is not None and prompt_hash is not None:
+                            self.cache.put(prompt_hash, text)
+                        result = LLMResult(request.request_id, text, request.metadata, latency, attempts)
+                    if output_file:
+                        output_file.write(json.dumps(result.to_dict(), ensure_ascii=False, default=str) + "\n")
+                        output_file.flush()
+                except Exception as e:
+                    result = LLMResult(request.request_id, None, request.metadata, latency, attempts,
+                                       error=f"{type(e).__name__}: {e}")
+                    logging.error(f"Handling the result of LLM request {request.request_id} failed: {result.error}")
+                results.append(result)
+                queue.task_done()
+
+            if finished:
+                return
+
+    async def run(self, requests: Iterable[LLMRequest], generation_args: Optional[dict] = None) -> tuple[list[LLMResult], PoolStats]:
+        """
+        Processes all requests and returns the results (in completion order) with run statistics.
+
+        Args:
+            requests (Iterable[LLMRequest]): The prompts to send. May be a generator.
+            generation_args (dict, optional): Passed to the backend, e.g. {"max_new_tokens": 1024, "do_sample": False}.
+
+        Returns:
+            tuple[list[LLMResult], PoolStats]: The results and the throughput/latency statistics.
+        """
+        generation_args = generation_args or {}
+        queue = asyncio.Queue(maxsize=self.queue_size)
+        results = []
+        rate_limiter = _RateLimiter(self.max_requests_per_second) if self.max_requests_per_second else None
+
+        output_file = None
+        if self.output_path:
+            os.makedirs(os.path.dirname(self.output_path) or ".", exist_ok=True)
+            output_file = open(self.output_path, "a", encoding="utf-8")
+
+        start = time.perf_counter()
+        try:
+            workers = [
+                asyncio.create_task(self._worker(queue, generation_args, results, output_file, rate_limiter))
+                for _ in range(self.num_workers)
+            ]
+            for request in requests:
+                await queue.put(request)
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        finally:
+            if output_file:
+                output_file.close()
+        wall_time = time.perf_counter() - start
+
+        latencies = [result.latency_seconds for result in results if not result.cached and result.error is None]
+        stats = PoolStats(
+            total_requests=len(results),
+            succeeded=sum(result.error is None for result in results),
+            failed=sum(result.error is not None for result in results),
+            cache_hits=sum(result.cached for result in results),
+            wall_time_seconds=wall_time,
+            requests_per_second=len(results) / wall_time if wall_time else 0.0,
+            p50_latency_seconds=_percentile(latencies, 50),
+            p95_latency_seconds=_percentile(latencies, 95),
+        )
+        return results, stats
+
+    def run_sync(self, requests: Iterable[LLMRequest], generation_args: Optional[dict] = None) -> tuple[list[LLMResult], PoolStats]:
+        """
+        Blocking wrapper around `run`. Inside Jupyter (which already runs an event loop)
+        use `await pool.run(...)` instead.
+        """
+        return asyncio.run(self.run(requests, generation_args))
+
+
+def build_qna_group_transcripts(qna_df: pd.DataFrame, separator: str = "\n\n---------------------------\n\n") -> pd.DataFrame:
+    """
+    Formats every Q&A group across every quarter into the transcript string used
+    by the actionable intelligence prompts ("speaker: content" blocks).
+
+    Args:
+        qna_df (pd.DataFrame): A processed qna_df (one row per speaker turn).
+        separator (str): Text placed after each turn.
+
+    Returns:
+        pd.DataFrame: One row per (year, quarter, question_answer_group_id) with a 'transcript' column.
+    """
+    ordered = qna_df.sort_values(["year", "quarter", "question_answer_group_id", "question_order"])
+    turns = ordered["speaker"].astype(str) + ": " + ordered["content"].astype(str) + separator
+    return (
+        turns.groupby([ordered["year"], ordered["quarter"], ordered["question_answer_group_id"]])
+        .agg("".join)
+        .rename("transcript")
+        .reset_index()
+    )
+
+
+def build_llm_requests(transcripts_df: pd.DataFrame, prompt_builder, bank: Optional[str] = None) -> list[LLMRequest]:
+    """
+    Turns the output of build_qna_group_transcripts into LLMRequests.
+
+    Args:
+        transcripts_df (pd.DataFrame): Output of build_qna_group_transcripts.
+        prompt_builder (Callable[[str], list[dict]]): Builds the full message list for a transcript, e.g.
+            `lambda t: areas_of_concern_llm_messages + [create_areas_of_concern_user_message(t)]`.
+        bank (str, optional): Bank name added to the request id and metadata.
+
+    Returns:
+        list[LLMRequest]: One request per Q&A group.
+    """
+    requests = []
+    for row in transcripts_df.itertuples(index=False):
+        metadata: dict[str, Any] = {
+            "year": int(row.year),
+            "quarter": int(row.quarter),
+            "question_answer_group_id": int(row.question_answer_group_id),
+        }
+        if bank:
+            metadata["bank"] = bank
+        request_id = "_".join(str(value) for value in ([bank] if bank else []) + list(metadata.values())[:3])
+        requests.append(LLMRequest(request_id, prompt_builder(row.transcript), metadata))
+    return requests
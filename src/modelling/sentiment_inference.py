@@ -0,0 +1,395 @@
+import glob
+import inspect
+import logging
+import os
+import time
+from abc import ABC, abstractmethod
+from typing import Iterable, Optional
+
+import numpy as np
+import pandas as pd
+
+# The two FinBERT models used in the sentiment notebooks (prosus_* and kust_* outputs)
+SENTIMENT_MODELS = {
+    "prosus": "ProsusAI/finbert",
+    "kust": "yiyanghkust/finbert-tone",
+}
+
+BACKENDS = ["pytorch", "pytorch_int8", "onnx", "onnx_int8"]
+
+# Padded sequence lengths; every batch is padded up to the smallest bucket that fits its longest text
+DEFAULT_BUCKETS = (16, 32, 64, 128, 256, 512)
+
+NEGATIVE_SENTIMENTS_DIR = os.path.join("data", "processed", "negative_sentiments")
+
+
+class BaseSentimentBackend(ABC):
+    """
+    Abstract Base Class for the sentiment model runtimes.
+
+    A backend receives one padded, tokenized batch and returns the logits
+    as a (batch size, number of labels) array.
+    """
+    @property
+    @abstractmethod
+    def name(self) -> str:
+        pass
+
+    @abstractmethod
+    def logits(self, encoded: dict[str, np.ndarray]) -> np.ndarray:
+        pass
+
+
+class PyTorchSentimentBackend(BaseSentimentBackend):
+    """
+    Runs the transformers model with PyTorch, optionally with dynamic int8 quantization
+    of every nn.Linear layer (weights stored as int8, activations quantized on the fly).
+    """
+    def __init__(self, model, quantize: bool = False, num_threads: Optional[int] = None):
+        import torch
+
+        if num_threads:
+            torch.set_num_threads(num_threads)
+        model.eval()
+        if quantize:
+            model = torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        self.model = model
+        self.quantize = quantize
+        # Tokenizers can return more than the model takes (e.g. token_type_ids), so filter to forward's parameters
+        parameters = inspect.signature(model.forward).parameters
+        accepts_any = any(parameter.kind is inspect.Parameter.VAR_KEYWORD for parameter in parameters.values())
+        self._input_names = None if accepts_any else set(parameters)
+
+    @property
+    def name(self) -> str:
+        return "pytorch_int8" if self.quantize else "pytorch"
+
+    def logits(self, encoded: dict[str, np.ndarray]) -> np.ndarray:
+        import torch
+
+        inputs = {
+            key: torch.from_numpy(value) for key, value in encoded.items()
+            if self._input_names is None or key in self._input_names
+        }
+        with torch.inference_mode():
+            return self.model(**inputs).logits.float().numpy()
+
+
+class OnnxSentimentBackend(BaseSentimentBackend):
+    """
+    Runs an exported ONNX model with ONNX Runtime on the CPU.
+    """
+    def __init__(self, onnx_path: str, num_threads: Optional[int] = None):
+        try:
+            import onnxruntime
+        except ImportError as e:
+            raise ImportError("The ONNX backends need onnxruntime (pip install onnx onnxruntime)") from e
+
+        options = onnxruntime.SessionOptions()
+        options.graph_optimization_level = onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        # A single batch is one sequential graph run, so the threads go to intra-op parallelism
+        options.execution_mode = onnxruntime.ExecutionMode.ORT_SEQUENTIAL
+        options.inter_op_num_threads = 1
+        if num_threads:
+            options.intra_op_num_threads = num_threads
+        self.onnx_path = onnx_path
+        self.session = onnxruntime.InferenceSession(onnx_path, options, providers=["CPUExecutionProvider"])
+        self._input_names = [model_input.name for model_input in self.session.get_inputs()]
+
+    @property
+    def name(self) -> str:
+        return os.path.basename(self.onnx_path)
+
+    def logits(self, encoded: dict[str, np.ndarray]) -> np.ndarray:
+        inputs = {name: encoded[name].astype(np.int64) for name in self._input_names}
+        return self.session.run(None, inputs)[0]
+
+
+def export_onnx(model, tokenizer, output_dir: str, quantize: bool = False) -> str:
+    """
+    Exports a sequence classification model to ONNX with dynamic batch and sequence axes,
+    and optionally writes a dynamically int8-quantized copy next to it.
+
+    Args:
+        model: A transformers AutoModelForSequenceClassification.
+        tokenizer: Its tokenizer.
+        output_dir (str): Directory for model.onnx (and model.int8.onnx).
+        quantize (bool): Return the int8-quantized model instead of the float one.
+
+    Returns:
+        str: Path to the requested ONNX file. Existing exports are reused.
+    """
+    import torch
+
+    os.makedirs(output_dir, exist_ok=True)
+    onnx_path = os.path.join(output_dir, "model.onnx")
+    if not os.path.exists(onnx_path):
+        model.eval()
+        sample = tokenizer(["A sample sentence for the export."], return_tensors="pt")
+        input_names = [name for name in ("input_ids", "attention_mask", "token_type_ids") if name in sample]
+        dynamic_axes = {name: {0: "batch", 1: "sequence"} for name in input_names}
+        dynamic_axes["logits"] = {0: "batch"}
+        torch.onnx.export(
+            model,
+            tuple(sample[name] for name in input_names),
+            onnx_path,
+            input_names=input_names,
+            output_names=["logits"],
+            dynamic_axes=dynamic_axes,
+            opset_version=17,
+        )
+        logging.info(f"Exported ONNX model to {onnx_path}")
+
+    if not quantize:
+        return onnx_path
+
+    quantized_path = os.path.join(output_dir, "model.int8.onnx")
+    if not os.path.exists(quantized_path):
+        from onnxruntime.quantization import QuantType, quantize_dynamic
+
+        quantize_dynamic(onnx_path, quantized_path, weight_type=QuantType.QInt8)
+        logging.info(f"Wrote int8-quantized ONNX model to {quantized_path}")
+    return quantized_path
+
+
+class SentimentClassifier:
+    """
+    Batched CPU sentiment classification with the same output as the
+    transformers "sentiment-analysis" pipeline used in the notebooks
+    (top label and its softmax score per text).
+
+    Texts are tokenized once, sorted by token length and batched so that each
+    batch only holds texts of similar length. Each batch is padded to the
+    smallest bucket in `bucket_sizes` that fits it, which avoids padding short
+    sentences to 512 tokens and keeps the number of distinct input shapes small.
+
+    Example:
+        classifier = load_sentiment_classifier(SENTIMENT_MODELS["prosus"], backend="onnx_int8", num_threads=4)
+        scored_df = classifier.score_dataframe(sentences_df, text_column="sentence")
+    """
+    def __init__(self, tokenizer, backend: BaseSentimentBackend, id2label: dict, batch_size: int = 32,
+                 max_length: int = 512, bucket_sizes: Iterable[int] = DEFAULT_BUCKETS):
+        self.tokenizer = tokenizer
+        self.backend = backend
+        self.id2label = {int(label_id): label for label_id, label in id2label.items()}
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.bucket_sizes = sorted(size for size in bucket_sizes if size < max_length) + [max_length]
+
+    def _bucket(self, length: int) -> int:
+        return next(size for size in self.bucket_sizes if size >= length)
+
+    def _pad(self, features: list[dict], sequence_length: int) -> dict[str, np.ndarray]:
+        pad_token_id = self.tokenizer.pad_token_id or 0
+        encoded = {}
+        for name in features[0]:
+            pad_value = pad_token_id if name == "input_ids" else 0
+            batch = np.full((len(features), sequence_length), pad_value, dtype=np.int64)
+            for row, feature in enumerate(features):
+                batch[row, :len(feature[name])] = feature[name]
+            encoded[name] = batch
+        return encoded
+
+    def predict(self, texts: list[str]) -> pd.DataFrame:
+        """
+        Classifies a list of texts.
+
+        Args:
+            texts (list[str]): The texts (truncated to max_length tokens).
+
+        Returns:
+            pd.DataFrame: 'label' and 'score' per text, in the input order.
+        """
+        texts = ["" if not isinstance(text, str) else text for text in texts]
+        if not texts:
+            return pd.DataFrame(columns=["label", "score"])
+
+        tokenized = self.tokenizer(texts, truncation=True, max_length=self.max_length)
+        names = list(tokenized.keys())
+        features = [{name: tokenized[name][i] for name in names} for i in range(len(texts))]
+        lengths = np.array([len(feature["input_ids"]) for feature in features])
+
+        labels = np.empty(len(texts), dtype=object)
+        scores = np.empty(len(texts), dtype=np.float64)
+        order = np.argsort(lengths, kind="stable")
+        for batch_start in range(0, len(order), self.batch_size):
+            batch_indices = order[batch_start:batch_start + self.batch_size]
+            sequence_length = self._bucket(int(lengths[batch_indices].max()))
+            logits = self.backend.logits(self._pad([features[i] for i in batch_indices], sequence_length))
+            logits = logits - logits.max(axis=1, keepdims=True)
+            probabilities = np.exp(logits) / np.exp(logits).sum(axis=1, keepdims=True)
+            best = probabilities.argmax(axis=1)
+            labels[batch_indices] = [self.id2label[label_id] for label_id in best]
+            scores[batch_indices] = probabilities[np.arange(len(best)), best]
+
+        return pd.DataFrame({"label": labels, "score": scores})
+
+    def score_dataframe(self, df: pd.DataFrame, text_column: str = "content") -> pd.DataFrame:
+        """
+        Adds 'score' and 'label' columns to a copy of df (as score_m_d does in the sentiment notebook).
+        """
+        df = df.copy()
+        predictions = self.predict(df[text_column].tolist())
+        df["score"] = predictions["score"].to_numpy()
+        df["label"] = predictions["label"].to_numpy()
+        return df
+
+
+def load_sentiment_classifier(model_name: str, backend: str = "pytorch", num_threads: Optional[int] = None,
+                              onnx_dir: Optional[str] = None, **classifier_kwargs) -> SentimentClassifier:
+    """
+    Loads a FinBERT-style model with the requested CPU runtime.
+
+    Args:
+        model_name (str): A Hugging Face model id or local path, e.g. SENTIMENT_MODELS["prosus"].
+        backend (str): One of BACKENDS: "pytorch" (full precision, as in the notebooks),
+            "pytorch_int8" (dynamic int8 quantization), "onnx" or "onnx_int8" (ONNX Runtime).
+        num_threads (int, optional): Intra-op threads (see `tune_threads`).
+        onnx_dir (str, optional): Where the ONNX export is stored. Defaults to data/models/onnx/<model>.
+        **classifier_kwargs: batch_size, max_length and bucket_sizes for SentimentClassifier.
+
+    Returns:
+        SentimentClassifier: The classifier.
+    """
+    from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}'. Expected one of {BACKENDS}")
+
+    tokenizer = AutoTokenizer.from_pretrained(model_name)
+    model = AutoModelForSequenceClassification.from_pretrained(model_name)
+
+    if backend.startswith("pytorch"):
+        runtime = PyTorchSentimentBackend(model, quantize=backend == "pytorch_int8", num_threads=num_threads)
+    else:
+        onnx_dir = onnx_dir or os.path.join("data", "models", "onnx", model_name.replace("/", "__"))
+        onnx_path = export_onnx(model, tokenizer, onnx_dir, quantize=backend == "onnx_int8")
+        runtime = OnnxSentimentBackend(onnx_path, num_threads=num_threads)
+
+    return SentimentClassifier(tokenizer, runtime, model.config.id2label, **classifier_kwargs)
+
+
+def tune_threads(make_classifier, texts: list[str], candidates: Iterable[int] = (1, 2, 4, 8)) -> tuple[int, pd.DataFrame]:
+    """
+    Picks the intra-op thread count with the highest throughput on a sample of texts.
+
+    Args:
+        make_classifier: Callable taking num_threads and returning a SentimentClassifier,
+            e.g. lambda n: load_sentiment_classifier(model, "onnx_int8", num_threads=n).
+        texts (list[str]): A representative sample (a few hundred sentences).
+        candidates (Iterable[int]): Thread counts to try (capped at the number of CPUs).
+
+    Returns:
+        tuple[int, pd.DataFrame]: The best thread count and the timings per candidate.
+    """
+    cpu_count = os.cpu_count() or 1
+    rows = []
+    for num_threads in sorted({min(candidate, cpu_count) for candidate in candidates}):
+        classifier = make_classifier(num_threads)
+        classifier.predict(texts[:classifier.batch_size])  # warm-up
+        start = time.perf_counter()
+        classifier.predict(texts)
+        seconds = time.perf_counter() - start
+        rows.append({"num_threads": num_threads, "seconds": seconds, "texts_per_second": len(texts) / seconds})
+    timings = pd.DataFrame(rows)
+    return int(timings.loc[timings["texts_per_second"].idxmax(), "num_threads"]), timings
+
+
+def load_reference_labels(model_key: str, negative_sentiments_dir: str = NEGATIVE_SENTIMENTS_DIR) -> pd.DataFrame:
+    """
+    Collects the texts and labels previously produced by one of the models from the
+    data/processed/negative_sentiments CSVs (sentence files and question/answer files).
+
+    Args:
+        model_key (str): "prosus" or "kust".
+        negative_sentiments_dir (str): Root of the per-bank negative sentiment folders.
+
+    Returns:
+        pd.DataFrame: 'source', 'text', 'label' (lowercased) and 'score' columns.
+    """
+    frames = []
+    for path in sorted(glob.glob(os.path.join(negative_sentiments_dir, "*", f"df_{model_key}_negative_*.csv"))):
+        df = pd.read_csv(path)
+        if "sentence" in df:
+            text_column, label_column, score_column = "sentence", f"{model_key}_label", f"{model_key}_score"
+        else:
+            text_column, label_column, score_column = "content", "label", "score"
+        if label_column not in df:
+            logging.warning(f"No '{label_column}' column in {path}, skipping it for the parity check")
+            continue
+        frames.append(pd.DataFrame({
+            "source": os.path.relpath(path, negative_sentiments_dir),
+            "text": df[text_column].astype(str),
+            "label": df[label_column].astype(str).str.lower(),
+            "score": df[score_column] if score_column in df else np.nan,
+        }))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=["source", "text", "label", "score"])
+
+
+def parity_check(classifier: SentimentClassifier, references: pd.DataFrame) -> dict:
+    """
+    Compares a classifier's predictions with the stored labels.
+
+    The stored files only keep the texts that were labelled negative, so the agreement
+    is the share of them that the classifier still labels negative.
+
+    Args:
+        classifier (SentimentClassifier): The classifier under test.
+        references (pd.DataFrame): As returned by `load_reference_labels`.
+
+    Returns:
+        dict: 'texts', 'label_agreement', 'mean_abs_score_diff', and the agreement per source file.
+    """
+    predictions = classifier.predict(references["text"].tolist())
+    matches = predictions["label"].str.lower().to_numpy() == references["label"].to_numpy()
+    score_diff = np.abs(predictions["score"].to_numpy() - references["score"].to_numpy(dtype=float))
+    return {
+        "texts": len(references),
+        "label_agreement": float(matches.mean()) if len(matches) else float("nan"),
+        "mean_abs_score_diff": float(np.nanmean(score_diff)) if np.isfinite(score_diff).any() else float("nan"),
+        "agreement_by_source": pd.Series(matches, index=references["source"]).groupby(level=0).mean().to_dict(),
+    }
+
+
+def benchmark_backends(model_name: str, texts: list[str], backends: Iterable[str] = BACKENDS,
+                       num_threads: Optional[int] = None, references: Optional[pd.DataFrame] = None,
+                       **classifier_kwargs) -> pd.DataFrame:
+    """
+    Measures the throughput of each backend on the same texts, their label agreement with the
+    full-precision PyTorch backend and, when reference labels are given, the parity with them.
+
+    Args:
+        model_name (str): The model to load.
+        texts (list[str]): Texts to classify.
+        backends (Iterable[str]): Backends to compare ("pytorch" is always run first as the baseline).
+        num_threads (int, optional): Intra-op threads for every backend.
+        references (pd.DataFrame, optional): From `load_reference_labels`.
+        **classifier_kwargs: Passed to SentimentClassifier (e.g. bucket_sizes=(512,) to disable bucketing).
+
+    Returns:
+        pd.DataFrame: One row per backend.
+    """
+    rows = []
+    baseline_labels = None
+    for backend in ["pytorch"] + [backend for backend in backends if backend != "pytorch"]:
+        classifier = load_sentiment_classifier(model_name, backend, num_threads=num_threads, **classifier_kwargs)
+        classifier.predict(texts[:classifier.batch_size])  # warm-up
+        start = time.perf_counter()
+        predictions = classifier.predict(texts)
+        seconds = time.perf_counter() - start
+        if baseline_labels is None:
+            baseline_labels = predictions["label"].to_numpy()
+
+        row = {
+            "backend": backend,
+            "seconds": seconds,
+            "texts_per_second": len(texts) / seconds,
+            "agreement_with_pytorch": float((predictions["label"].to_numpy() == baseline_labels).mean()),
+        }
+        if references is not None and len(references):
+            parity = parity_check(classifier, references)
+            row["reference_label_agreement"] = parity["label_agreement"]
+            row["reference_mean_abs_score_diff"] = parity["mean_abs_score_diff"]
+        rows.append(row)
+        logging.info(f"{model_name} [{backend}]: {row}")
+    return pd.DataFrame(rows)
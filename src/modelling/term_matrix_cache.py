@@ -0,0 +1,546 @@
+import hashlib
+import json
+import logging
+import os
+import pickle
+import re
+import shutil
+import time
+from typing import Callable, Hashable, Iterable, Optional
+
+import numpy as np
+import pandas as pd
+import scipy.sparse as sp
+
+from ..analytics.transcript_search import ABBREVIATIONS_PATH, STOPWORD_PATHS
+from ..utils.common_helpers import read_list_from_text_file, read_yaml_file
+
+CACHE_FORMAT_VERSION = 1
+
+PARTITION_KEYS = ["bank", "section", "year", "quarter"]
+
+# Per-document keys kept alongside each partition's rows
+DOC_KEY_COLUMNS = ["question_answer_group_id", "question_order", "speaker", "role"]
+
+# CountVectorizer's default token pattern, as used by the BERTopic vectorizer in LP_1_topic_modelling.ipynb
+_TOKEN_PATTERN = re.compile(r"(?u)\b\w\w+\b")
+
+
+def load_topic_stopwords(bank: str, stopword_paths: Optional[dict[str, str]] = None, include_spacy: bool = True) -> frozenset:
+    """
+    The stopwords of the topic models: the bank's topic modelling stopword file, plus spaCy's
+    English stop words as in LP_1_topic_modelling.ipynb.
+    """
+    path = (stopword_paths or STOPWORD_PATHS).get(bank)
+    stopwords = set(read_list_from_text_file(path)) if path and os.path.exists(path) else set()
+    if path is None or not os.path.exists(path):
+        logging.warning(f"No topic modelling stopword file for {bank}")
+    if include_spacy:
+        from spacy.lang.en.stop_words import STOP_WORDS
+        stopwords |= STOP_WORDS
+    return frozenset(word.lower() for word in stopwords)
+
+
+class TopicTextPreprocessor:
+    """
+    preprocess_text from LP_1_topic_modelling.ipynb, batched.
+
+    The notebook lowercases, turns "-" and "_" into spaces, replaces each of the ~90 expansions in
+    abbreviations.yaml with its abbreviation in a separate re.sub, drops standalone numbers, then runs
+    spaCy on every text and keeps the lemmas of the non-stopwords (abbreviations are always kept).
+    Here the expansions are folded by one combined pattern and the texts go through nlp.pipe in batches.
+
+    Args:
+        stopwords (Iterable[str]): Words to drop (see load_topic_stopwords).
+        abbreviations_path (str): Path to the abbreviations YAML file.
+        lemmatize (bool): Lemmatize with spaCy en_core_web_sm, as the notebook does. Without it,
+            tokens are kept as they are, which is much faster but gives a different vocabulary.
+        batch_size (int): nlp.pipe batch size.
+    """
+    def __init__(self, stopwords: Iterable[str], abbreviations_path: str = ABBREVIATIONS_PATH,
+                 lemmatize: bool = True, batch_size: int = 256):
+        self.stopwords = frozenset(stopwords)
+        abbreviations = read_yaml_file(abbreviations_path)
+        self.abbreviations = frozenset(str(abbreviation).lower() for abbreviation in abbreviations)
+        self._folds = {str(expansion).lower(): str(abbreviation).lower() for abbreviation, expansion in abbreviations.items()}
+        phrases = sorted(self._folds, key=len, reverse=True)
+        self._fold_pattern = re.compile(r"\b(?:" + "|".join(re.escape(phrase) for phrase in phrases) + r")\b")
+        self.lemmatize = lemmatize
+        self.batch_size = batch_size
+        self._nlp = None
+
+    @property
+    def fingerprint(self) -> str:
+        """
+        A hash of everything that changes the output: stopwords, abbreviation folds and lemmatization.
+        """
+        config = {"stopwords": sorted(self.stopwords), "folds": sorted(self._folds.items()), "lemmatize": self.lemmatize}
+        return hashlib.sha256(json.dumps(config, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+    def _fold(self, text) -> str:
+        if not isinstance(text, str):
+            return ""
+        text = re.sub(r"[-_]+", " ", text.lower()).strip()
+        text = self._fold_pattern.sub(lambda match: self._folds[match.group(0)], text)
+        return re.sub(r"\b\d+\b", "", text).strip()
+
+    def _keep(self, token: str) -> bool:
+        return token not in self.stopwords or token in self.abbreviations
+
+    def transform(self, texts: Iterable[str]) -> list[str]:
+        """
+        Preprocesses texts into space-joined tokens, ready for the n-gram vectorizer.
+        """
+        folded = [self._fold(text) for text in texts]
+        if not self.lemmatize:
+            return [" ".join(token for token in text.split() if self._keep(token)) for text in folded]
+        if self._nlp is None:
+            import spacy
+            self._nlp = spacy.load("en_core_web_sm", disable=["parser", "ner"])
+        return [
+            " ".join(token.lemma_ for token in doc if self._keep(token.text))
+            for doc in self._nlp.pipe(folded, batch_size=self.batch_size)
+        ]
+
+
+def _ngrams(tokens: list[str], ngram_range: tuple[int, int]) -> list[str]:
+    low, high = ngram_range
+    grams = tokens if low == 1 else []
+    for n in range(max(low, 2), high + 1):
+        grams = grams + [" ".join(tokens[i:i + n]) for i in range(len(tokens) - n + 1)]
+    return grams
+
+
+def _resize_columns(matrix: sp.csr_matrix, n_columns: int) -> sp.csr_matrix:
+    # Columns only ever get appended to the vocabulary, so older matrices are padded on the right
+    if matrix.shape[1] == n_columns:
+        return matrix
+    return sp.csr_matrix((matrix.data, matrix.indices, matrix.indptr), shape=(matrix.shape[0], n_columns))
+
+
+class TermMatrixCache:
+    """
+    Persisted document-term matrices of the transcript turns, one CSR matrix per
+    (bank, section, year, quarter) partition, over one shared, append-only vocabulary.
+
+    Topic model fits in LP_1_topic_modelling.ipynb rebuild the preprocessing, the vocabulary and the
+    document-term matrix from scratch every time. Here each partition is preprocessed and counted
+    once; adding a new quarter only preprocesses that quarter's turns and appends its unseen terms to
+    the vocabulary, and re-adding a quarter whose content has not changed is a no-op (the content hash
+    is kept in the manifest). Because term ids never change, partition matrices stay valid as the
+    vocabulary grows and any selection of partitions merges with a single vstack.
+
+    Layout of cache_dir:
+        manifest.json       partitions, their files, document counts and content hashes
+        vocabulary.json     the terms, in id order
+        partitions/         <file>.npz (CSR counts) and <file>_docs.pkl (per-row keys), where <file>
+                            is the partition name plus a write number: a recount is written to new
+                            files, and the old ones are deleted once the manifest no longer names them
+
+    Example:
+        cache = TermMatrixCache("data/cache/term_matrices")
+        cache.add_turns(gs_qna_df, BankType.GOLDMAN_SACHS.value, "qna")
+        dtm, docs, terms = cache.matrix(bank=BankType.GOLDMAN_SACHS.value, section="qna", min_df=5)
+    """
+    def __init__(self, cache_dir: str, ngram_range: tuple[int, int] = (1, 2),
+                 preprocessors: Optional[dict[str, TopicTextPreprocessor]] = None,
+                 preprocessor_factory: Optional[Callable[[str], TopicTextPreprocessor]] = None):
+        self.cache_dir = cache_dir
+        self._partitions_dir = os.path.join(cache_dir, "partitions")
+        self._manifest_path = os.path.join(cache_dir, "manifest.json")
+        self._vocabulary_path = os.path.join(cache_dir, "vocabulary.json")
+        os.makedirs(self._partitions_dir, exist_ok=True)
+        self._preprocessors = dict(preprocessors or {})
+        self._preprocessor_factory = preprocessor_factory or (lambda bank: TopicTextPreprocessor(load_topic_stopwords(bank)))
+
+        self._manifest = self._load_manifest(ngram_range)
+        if tuple(self._manifest["ngram_range"]) != tuple(ngram_range):
+            raise ValueError(f"{cache_dir} was built with ngram_range {tuple(self._manifest['ngram_range'])}, not {tuple(ngram_range)}")
+        self.ngram_range = tuple(ngram_range)
+        self.terms = []
+        if os.path.exists(self._vocabulary_path):
+            with open(self._vocabulary_path, "r", encoding="utf-8") as file:
+                self.terms = json.load(file)
+        self._term_ids = {term: index for index, term in enumerate(self.terms)}
+
+    # Manifest and vocabulary
+
+    def _load_manifest(self, ngram_range: tuple[int, int]) -> dict:
+        if not os.path.exists(self._manifest_path):
+            return {"version": CACHE_FORMAT_VERSION, "ngram_range": list(ngram_range), "partitions": {}}
+        with open(self._manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save(self) -> None:
+        # The vocabulary is written first: a manifest never refers to term ids the vocabulary lacks
+        for path, content in ((self._vocabulary_path, self.terms), (self._manifest_path, self._manifest)):
+            tmp_path = f"{path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as file:
+                json.dump(content, file, indent=None if content is self.terms else 2, ensure_ascii=False)
+            os.replace(tmp_path, path)
+
+    @staticmethod
+    def partition_name(bank: str, section: str, year: int, quarter: int) -> str:
+        return f"{re.sub(r'[^A-Za-z0-9]+', '_', bank).strip('_').lower()}_{section}_{int(year)}_q{int(quarter)}"
+
+    def _partition_file(self, name: str) -> str:
+        # Caches written before partitions had a write number keep their files under the partition name
+        return os.path.join(self._partitions_dir, self._manifest["partitions"][name].get("file", name))
+
+    def _preprocessor(self, bank: str) -> TopicTextPreprocessor:
+        if bank not in self._preprocessors:
+            self._preprocessors[bank] = self._preprocessor_factory(bank)
+        return self._preprocessors[bank]
+
+    # Building
+
+    def _count(self, preprocessed: list[str]) -> sp.csr_matrix:
+        rows, columns = [], []
+        for row, text in enumerate(preprocessed):
+            for gram in _ngrams(_TOKEN_PATTERN.findall(text), self.ngram_range):
+                term_id = self._term_ids.get(gram)
+                if term_id is None:
+                    term_id = self._term_ids[gram] = len(self.terms)
+                    self.terms.append(gram)
+                rows.append(row)
+                columns.append(term_id)
+        matrix = sp.csr_matrix(
+            (np.ones(len(rows), dtype=np.int32), (np.asarray(rows, dtype=np.int64), np.asarray(columns, dtype=np.int64))),
+            shape=(len(preprocessed), len(self.terms)),
+        )
+        matrix.sum_duplicates()
+        return matrix
+
+    def add_turns(self, turns_df: pd.DataFrame, bank: str, section: str, force: bool = False) -> list[str]:
+        """
+        Counts the turns of one or more quarters of a bank into their partitions.
+
+        Args:
+            turns_df (pd.DataFrame): A qna_df or discussion_df produced by the transcript extractors.
+            bank (str): Bank name (a BankType value, used to pick the stopwords).
+            section (str): "qna" or "discussion".
+            force (bool): Recount partitions whose content has not changed.
+
+        Returns:
+            list[str]: The partitions written. Partitions whose content and preprocessor
+            configuration (stopwords, abbreviations, lemmatization) are unchanged are skipped.
+        """
+        written, replaced_files = [], []
+        preprocessor_fingerprint = self._preprocessor(bank).fingerprint
+        for (year, quarter), quarter_df in turns_df.groupby(["year", "quarter"], sort=True):
+            name = self.partition_name(bank, section, year, quarter)
+            content = quarter_df["content"].fillna("").astype(str)
+            content_hash = hashlib.sha256("\x00".join(content).encode("utf-8")).hexdigest()
+            previous = self._manifest["partitions"].get(name, {})
+            if (not force and previous.get("content_hash") == content_hash
+                    and previous.get("preprocessor_fingerprint") == preprocessor_fingerprint):
+                continue
+
+            matrix = self._count(self._preprocessor(bank).transform(content.tolist()))
+            docs = quarter_df.reindex(columns=DOC_KEY_COLUMNS).reset_index(drop=True)
+            # New files, never the ones the saved manifest points at: until the vocabulary and the
+            # manifest are saved below, the saved manifest keeps reading the previous matrices
+            file = f"{name}_{self._manifest.get('next_file_id', 0):06d}"
+            self._manifest["next_file_id"] = self._manifest.get("next_file_id", 0) + 1
+            sp.save_npz(os.path.join(self._partitions_dir, f"{file}.npz"), matrix)
+            docs.to_pickle(os.path.join(self._partitions_dir, f"{file}_docs.pkl"))
+            if previous:
+                replaced_files.append(previous.get("file", name))
+            self._manifest["partitions"][name] = {
+                "file": file,
+                "bank": bank,
+                "section": section,
+                "year": int(year),
+                "quarter": int(quarter),
+                "docs": int(matrix.shape[0]),
+                "nnz": int(matrix.nnz),
+                "content_hash": content_hash,
+                "preprocessor_fingerprint": preprocessor_fingerprint,
+            }
+            written.append(name)
+        if written:
+            self._manifest["ngram_range"] = list(self.ngram_range)
+            self._save()
+        for file in replaced_files:
+            for suffix in (".npz", "_docs.pkl"):
+                try:
+                    os.remove(os.path.join(self._partitions_dir, f"{file}{suffix}"))
+                except OSError as e:
+                    logging.warning(f"Could not remove the replaced partition file {file}{suffix}: {e}")
+        return written
+
+    # Reading
+
+    def partitions(self) -> pd.DataFrame:
+        """
+        Returns:
+            pd.DataFrame: One row per partition: name, PARTITION_KEYS, docs, nnz.
+        """
+        rows = [{"name": name, **{key: info[key] for key in PARTITION_KEYS + ["docs", "nnz"]}}
+                for name, info in self._manifest["partitions"].items()]
+        return pd.DataFrame(rows, columns=["name"] + PARTITION_KEYS + ["docs", "nnz"]).sort_values(["bank", "section", "year", "quarter"], ignore_index=True)
+
+    def _selected(self, bank=None, section=None, year=None, quarter=None) -> list[str]:
+        selected = []
+        for name, info in self._manifest["partitions"].items():
+            if all(value is None or info[key] == value or (isinstance(value, (list, tuple, set)) and info[key] in value)
+                   for key, value in (("bank", bank), ("section", section), ("year", year), ("quarter", quarter))):
+                selected.append(name)
+        return sorted(selected, key=lambda name: tuple(self._manifest["partitions"][name][key] for key in PARTITION_KEYS))
+
+    def partition_matrix(self, name: str) -> sp.csr_matrix:
+        return _resize_columns(sp.load_npz(f"{self._partition_file(name)}.npz").tocsr(), len(self.terms))
+
+    def matrix(self, bank=None, section=None, year=None, quarter=None, min_df: int = 1,
+               max_df: Optional[float] = None) -> tuple[sp.csr_matrix, pd.DataFrame, np.ndarray]:
+        """
+        Merges the selected partitions into one document-term matrix.
+
+        Args:
+            bank, section, year, quarter: Filters (a value or a list of values); None selects all.
+            min_df (int): Keep terms found in at least this many of the selected documents.
+            max_df (float, optional): Drop terms found in more than this fraction of them.
+
+        Returns:
+            tuple[sp.csr_matrix, pd.DataFrame, np.ndarray]: The counts (documents x kept terms),
+            the documents (PARTITION_KEYS and DOC_KEY_COLUMNS) and the kept terms.
+        """
+        names = self._selected(bank, section, year, quarter)
+        if not names:
+            return sp.csr_matrix((0, 0), dtype=np.int32), pd.DataFrame(columns=PARTITION_KEYS + DOC_KEY_COLUMNS), np.array([], dtype=object)
+        matrices, docs = [], []
+        for name in names:
+            info = self._manifest["partitions"][name]
+            matrices.append(self.partition_matrix(name))
+            partition_docs = pd.read_pickle(f"{self._partition_file(name)}_docs.pkl")
+            docs.append(partition_docs.assign(**{key: info[key] for key in PARTITION_KEYS}))
+        dtm = sp.vstack(matrices, format="csr")
+        docs = pd.concat(docs, ignore_index=True).reindex(columns=PARTITION_KEYS + DOC_KEY_COLUMNS)
+
+        document_frequency = np.bincount(dtm.indices, minlength=dtm.shape[1])
+        keep = document_frequency >= min_df
+        if max_df is not None:
+            keep &= document_frequency <= max_df * dtm.shape[0]
+        columns = np.flatnonzero(keep)
+        return dtm[:, columns], docs, np.asarray(self.terms, dtype=object)[columns]
+
+    def term_trends(self, terms: Optional[Iterable[str]] = None, top_n: int = 20, bank=None, section=None,
+                    relative: bool = True) -> pd.DataFrame:
+        """
+        Per-quarter term frequencies, summed straight from the partition matrices.
+
+        Args:
+            terms (Iterable[str], optional): Terms to report; defaults to the top_n most frequent overall.
+            top_n (int): Number of terms when `terms` is not given.
+            bank, section: Filters, as in `matrix`.
+            relative (bool): Divide by the quarter's total term count.
+
+        Returns:
+            pd.DataFrame: Index (bank, year, quarter), one column per term.
+        """
+        names = self._selected(bank, section)
+        if not names:
+            return pd.DataFrame()
+        keys = [(self._manifest["partitions"][name]["bank"], self._manifest["partitions"][name]["year"],
+                 self._manifest["partitions"][name]["quarter"]) for name in names]
+        # One row of column sums per partition, then partitions of the same quarter (qna + discussion) added up
+        sums = sp.vstack([sp.csr_matrix(self.partition_matrix(name).sum(axis=0)) for name in names], format="csr")
+        index = pd.MultiIndex.from_tuples(keys, names=["bank", "year", "quarter"])
+        unique_index, inverse = np.unique(index.to_flat_index().to_numpy(), return_inverse=True)
+        grouping = sp.csr_matrix((np.ones(len(names)), (inverse, np.arange(len(names)))), shape=(len(unique_index), len(names)))
+        quarter_counts = (grouping @ sums).tocsr()
+
+        if terms is None:
+            term_ids = np.argsort(-np.asarray(quarter_counts.sum(axis=0)).ravel(), kind="stable")[:top_n]
+        else:
+            term_ids = np.array([self._term_ids[term] for term in terms if term in self._term_ids], dtype=np.int64)
+        values = quarter_counts[:, term_ids].toarray().astype(float)
+        if relative:
+            values /= np.maximum(np.asarray(quarter_counts.sum(axis=1)), 1)
+        return pd.DataFrame(values, index=pd.MultiIndex.from_tuples(list(unique_index), names=["bank", "year", "quarter"]),
+                            columns=np.asarray(self.terms, dtype=object)[term_ids])
+
+
+class IncrementalClassTfidf:
+    """
+    c-TF-IDF (BERTopic's ClassTfidfTransformer) over class-term counts kept per partition.
+
+    BERTopic sums the document-term matrix per topic, and weights the L1-normalized class rows by
+    idf = log(1 + average words per class / term frequency across classes), with the average
+    truncated to an integer as BERTopic does. Only the class-term
+    counts are needed for that, and they are sums, so each partition's contribution is kept:
+    updating a quarter replaces its contribution and the weights are recomputed from the totals
+    (classes x vocabulary), without touching the documents of the other quarters or refitting
+    the topic model. Classes can be topics (the topic assigned to each document) or quarters
+    (for term trends).
+
+    Args:
+        reduce_frequent_words (bool): Square-root the L1-normalized class term frequencies, as BERTopic's option.
+        bm25_weighting (bool): Use BERTopic's BM25-style idf.
+
+    Example:
+        ctfidf = IncrementalClassTfidf()
+        dtm = cache.partition_matrix(name)
+        ctfidf.update(name, dtm, topics_of_that_quarter)
+        ctfidf.topic_words(cache.terms, top_n=10)
+    """
+    def __init__(self, reduce_frequent_words: bool = False, bm25_weighting: bool = False):
+        self.reduce_frequent_words = reduce_frequent_words
+        self.bm25_weighting = bm25_weighting
+        self.classes: list[Hashable] = []
+        self._class_ids = {}
+        self._contributions: dict[str, sp.csr_matrix] = {}
+        self._total: Optional[sp.csr_matrix] = None
+
+    def _class_index(self, labels: np.ndarray) -> np.ndarray:
+        for label in pd.unique(labels):
+            if label not in self._class_ids:
+                self._class_ids[label] = len(self.classes)
+                self.classes.append(label)
+        return np.array([self._class_ids[label] for label in labels], dtype=np.int64)
+
+    def update(self, partition: str, dtm: sp.csr_matrix, labels: Iterable[Hashable]) -> "IncrementalClassTfidf":
+        """
+        Sets (or replaces) the class-term counts contributed by one partition.
+
+        Args:
+            partition (str): Partition name (TermMatrixCache.partition_name).
+            dtm (sp.csr_matrix): The partition's documents x vocabulary counts.
+            labels (Iterable[Hashable]): The class of each document (e.g. its topic).
+        """
+        class_index = self._class_index(np.asarray(list(labels), dtype=object))
+        if len(class_index) != dtm.shape[0]:
+            raise ValueError(f"{len(class_index)} labels for {dtm.shape[0]} documents in {partition}")
+        onehot = sp.csr_matrix((np.ones(len(class_index)), (class_index, np.arange(len(class_index)))),
+                               shape=(len(self.classes), len(class_index)))
+        self._contributions[partition] = (onehot @ dtm).tocsr()
+        self._total = None
+        return self
+
+    def remove(self, partition: str) -> None:
+        self._contributions.pop(partition, None)
+        self._total = None
+
+    def class_term_counts(self) -> sp.csr_matrix:
+        """
+        Total counts, classes x vocabulary (the widest vocabulary seen).
+        """
+        if self._total is None:
+            n_columns = max((matrix.shape[1] for matrix in self._contributions.values()), default=0)
+            total = sp.csr_matrix((len(self.classes), n_columns))
+            for matrix in self._contributions.values():
+                matrix = _resize_columns(matrix, n_columns)
+                if matrix.shape[0] < len(self.classes):
+                    matrix = sp.vstack([matrix, sp.csr_matrix((len(self.classes) - matrix.shape[0], n_columns))], format="csr")
+                total = total + matrix
+            self._total = total.tocsr()
+        return self._total
+
+    def transform(self) -> sp.csr_matrix:
+        """
+        The c-TF-IDF weights, classes x vocabulary.
+        """
+        counts = self.class_term_counts().astype(np.float64)
+        term_frequency = np.asarray(counts.sum(axis=0)).ravel()
+        average_words = int(counts.sum(axis=1).mean())
+        with np.errstate(divide="ignore"):
+            if self.bm25_weighting:
+                idf = np.log(1 + ((average_words - term_frequency + 0.5) / (term_frequency + 0.5)))
+            else:
+                idf = np.log((average_words / term_frequency) + 1)
+        idf[term_frequency == 0] = 0.0
+        # As ClassTfidfTransformer.transform: L1-normalize first, then square-root the normalized frequencies
+        row_sums = np.asarray(counts.sum(axis=1)).ravel()
+        normalized = (sp.diags(1.0 / np.where(row_sums == 0, 1.0, row_sums)) @ counts).tocsr()
+        if self.reduce_frequent_words:
+            normalized.data = np.sqrt(normalized.data)
+        return (normalized @ sp.diags(idf)).tocsr()
+
+    def topic_words(self, terms: list[str], top_n: int = 10) -> dict[Hashable, list[tuple[str, float]]]:
+        """
+        The top_n highest weighted terms of every class, like BERTopic's get_topics().
+        """
+        weights = self.transform()
+        words = {}
+        for class_id, label in enumerate(self.classes):
+            row = weights.getrow(class_id)
+            if row.nnz == 0:
+                words[label] = []
+                continue
+            top = np.argsort(-row.data, kind="stable")[:top_n]
+            words[label] = [(terms[row.indices[i]], float(row.data[i])) for i in top]
+        return words
+
+    def save(self, path: str) -> None:
+        """
+        Pickles the classes and the per-partition contributions.
+        """
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as file:
+            pickle.dump({"reduce_frequent_words": self.reduce_frequent_words, "bm25_weighting": self.bm25_weighting,
+                         "classes": self.classes, "contributions": self._contributions}, file)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> "IncrementalClassTfidf":
+        with open(path, "rb") as file:
+            saved = pickle.load(file)
+        ctfidf = cls(saved["reduce_frequent_words"], saved["bm25_weighting"])
+        for label in saved["classes"]:
+            ctfidf._class_ids[label] = len(ctfidf.classes)
+            ctfidf.classes.append(label)
+        ctfidf._contributions = saved["contributions"]
+        return ctfidf
+
+
+def quarterly_ctfidf(cache: TermMatrixCache, bank=None, section=None) -> IncrementalClassTfidf:
+    """
+    c-TF-IDF with one class per quarter: the terms that set each quarter apart, with no topic model.
+    """
+    ctfidf = IncrementalClassTfidf()
+    for name in cache._selected(bank, section):
+        info = cache._manifest["partitions"][name]
+        dtm = cache.partition_matrix(name)
+        ctfidf.update(name, dtm, [f"{info['year']}Q{info['quarter']}"] * dtm.shape[0])
+    return ctfidf
+
+
+def benchmark_incremental_update(turns_df: pd.DataFrame, bank: str, section: str, cache_dir: str,
+                                 preprocessor: TopicTextPreprocessor) -> pd.DataFrame:
+    """
+    Times a full rebuild of every quarter against adding only the latest quarter to a cache holding the others.
+    The ``full`` and ``incremental`` subdirectories of ``cache_dir`` are cleared first.
+
+    Returns:
+        pd.DataFrame: Seconds to build the DTM and the quarterly c-TF-IDF each way.
+    """
+    quarters = turns_df[["year", "quarter"]].drop_duplicates().sort_values(["year", "quarter"])
+    last_year, last_quarter = quarters.iloc[-1]
+    is_last = (turns_df["year"] == last_year) & (turns_df["quarter"] == last_quarter)
+
+    rows = []
+    for label, directory, previous, new in (
+        ("full_rebuild", os.path.join(cache_dir, "full"), None, turns_df),
+        ("incremental", os.path.join(cache_dir, "incremental"), turns_df[~is_last], turns_df[is_last]),
+    ):
+        # Start from an empty cache so a rerun does not skip every partition as unchanged.
+        shutil.rmtree(directory, ignore_errors=True)
+        cache = TermMatrixCache(directory, preprocessors={bank: preprocessor})
+        if previous is not None:
+            cache.add_turns(previous, bank, section)
+        ctfidf = quarterly_ctfidf(cache, bank, section)
+
+        start = time.perf_counter()
+        written = cache.add_turns(new, bank, section)
+        dtm_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        for name in written:
+            info = cache._manifest["partitions"][name]
+            dtm = cache.partition_matrix(name)
+            ctfidf.update(name, dtm, [f"{info['year']}Q{info['quarter']}"] * dtm.shape[0])
+        ctfidf.topic_words(cache.terms)
+        ctfidf_seconds = time.perf_counter() - start
+        rows.append({"mode": label, "partitions_written": len(written), "vocabulary": len(cache.terms),
+                     "dtm_seconds": dtm_seconds, "ctfidf_seconds": ctfidf_seconds})
+    return pd.DataFrame(rows)
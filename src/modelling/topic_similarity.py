@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+import numpy as np
+import pandas as pd
+
+from ..constants import BankType
+
+BERTOPIC_MODELS_DIR = os.path.join("data", "models", "bert")
+
+# Saved BERTopic models (LP_1_topic_modelling.ipynb) -> (bank, section). "gs" is an earlier save of gs_discussions_model.
+BERTOPIC_MODEL_DIRS = {
+    "gs_discussions_model": (BankType.GOLDMAN_SACHS.value, "discussion"),
+    "gs_qna_model": (BankType.GOLDMAN_SACHS.value, "qna"),
+    "jp_discussions_model": (BankType.JPMORGAN.value, "discussion"),
+    "jp_qna_model": (BankType.JPMORGAN.value, "qna"),
+}
+
+SET_KEYS = ["bank", "section", "year", "quarter"]
+
+
+@dataclass
+class TopicSet:
+    """
+    The topic embeddings of one bank, section and (optionally) quarter.
+
+    year and quarter are None for a model fitted on all quarters.
+    """
+    bank: str
+    section: str
+    embeddings: np.ndarray
+    labels: list[str] = field(default_factory=list)
+    sizes: Optional[np.ndarray] = None
+    year: Optional[int] = None
+    quarter: Optional[int] = None
+
+    def __post_init__(self):
+        self.embeddings = np.asarray(self.embeddings, dtype=np.float32)
+        if not self.labels:
+            self.labels = [f"topic_{index}" for index in range(len(self.embeddings))]
+        if len(self.labels) != len(self.embeddings):
+            raise ValueError(f"{len(self.labels)} labels for {len(self.embeddings)} topic embeddings of {self.bank} {self.section}")
+
+    @property
+    def key(self) -> tuple:
+        return self.bank, self.section, self.year, self.quarter
+
+
+def load_bertopic_topic_set(model_dir: str, bank: str, section: str, year: Optional[int] = None,
+                            quarter: Optional[int] = None) -> TopicSet:
+    """
+    Reads the topic embeddings of a BERTopic model saved with serialization="safetensors".
+
+    The topic labels and sizes come from the model's topics.json when it was saved alongside;
+    the models in data/models/bert only hold the tensors, so their topics are named by row.
+    """
+    from safetensors.numpy import load_file
+    embeddings = load_file(os.path.join(model_dir, "topic_embeddings.safetensors"))["topic_embeddings"]
+    labels, sizes = [], None
+    topics_path = os.path.join(model_dir, "topics.json")
+    if os.path.exists(topics_path):
+        with open(topics_path, "r", encoding="utf-8") as file:
+            topics = json.load(file)
+        # BERTopic keeps topic ids sorted, starting at -1 when there is an outlier topic
+        topic_ids = sorted(int(topic) for topic in topics.get("topic_labels", {}))
+        if len(topic_ids) == len(embeddings):
+            labels = [topics["topic_labels"][str(topic)] for topic in topic_ids]
+            sizes = np.array([topics.get("topic_sizes", {}).get(str(topic), 0) for topic in topic_ids])
+        else:
+            logging.warning(f"topics.json in {model_dir} does not match its {len(embeddings)} topic embeddings")
+    return TopicSet(bank, section, embeddings, labels, sizes, year, quarter)
+
+
+def load_bertopic_topic_sets(models_dir: str = BERTOPIC_MODELS_DIR, model_dirs: Optional[dict[str, tuple[str, str]]] = None) -> list[TopicSet]:
+    """
+    Loads the topic embeddings of every saved model in BERTOPIC_MODEL_DIRS that exists.
+    """
+    topic_sets = []
+    for name, (bank, section) in (model_dirs or BERTOPIC_MODEL_DIRS).items():
+        path = os.path.join(models_dir, name)
+        if os.path.exists(os.path.join(path, "topic_embeddings.safetensors")):
+            topic_sets.append(load_bertopic_topic_set(path, bank, section))
+        else:
+            logging.warning(f"No topic embeddings in {path}")
+    return topic_sets
+
+
+def topic_sets_by_quarter(document_embeddings: np.ndarray, topics: np.ndarray, docs_df: pd.DataFrame, bank: str,
+                          section: str, topic_labels: Optional[dict[int, str]] = None,
+                          include_outliers: bool = False) -> list[TopicSet]:
+    """
+    Per-quarter topic embeddings: the mean embedding of each topic's documents in each quarter.
+
+    BERTopic's topic_embeddings_ are the mean document embedding of each topic over all quarters;
+    splitting the same mean by quarter gives comparable vectors for drift. All quarters are reduced
+    at once with np.add.at over (quarter, topic) codes.
+
+    Args:
+        document_embeddings (np.ndarray): Documents x dimensions (the embeddings the model was fitted on).
+        topics (np.ndarray): The topic of each document (BERTopic's topics_).
+        docs_df (pd.DataFrame): The documents, with 'year' and 'quarter'.
+        bank (str): Bank name.
+        section (str): "qna" or "discussion".
+        topic_labels (dict[int, str], optional): Topic id -> label (e.g. from get_topic_info()).
+        include_outliers (bool): Keep topic -1.
+
+    Returns:
+        list[TopicSet]: One set per quarter, holding the topics with documents in that quarter.
+    """
+    topics = np.asarray(topics)
+    keep = np.ones(len(topics), dtype=bool) if include_outliers else topics != -1
+    periods = (pd.to_numeric(docs_df["year"]).to_numpy(dtype=np.int64) * 4
+               + pd.to_numeric(docs_df["quarter"]).to_numpy(dtype=np.int64) - 1)[keep]
+    topics, embeddings = topics[keep], np.asarray(document_embeddings, dtype=np.float64)[keep]
+    period_ids, period_codes = np.unique(periods, return_inverse=True)
+    topic_ids, topic_codes = np.unique(topics, return_inverse=True)
+
+    sums = np.zeros((len(period_ids), len(topic_ids), embeddings.shape[1]))
+    np.add.at(sums, (period_codes, topic_codes), embeddings)
+    counts = np.zeros((len(period_ids), len(topic_ids)), dtype=np.int64)
+    np.add.at(counts, (period_codes, topic_codes), 1)
+
+    topic_sets = []
+    for period_index, period in enumerate(period_ids):
+        present = np.flatnonzero(counts[period_index])
+        topic_sets.append(TopicSet(
+            bank, section,
+            sums[period_index, present] / counts[period_index, present, None],
+            [(topic_labels or {}).get(int(topic_ids[t]), f"topic_{int(topic_ids[t])}") for t in present],
+            counts[period_index, present],
+            int(period // 4), int(period % 4 + 1),
+        ))
+    return topic_sets
+
+
+class TopicSimilarityEngine:
+    """
+    Topic similarity, alignment and drift between any number of banks, sections and quarters.
+
+    All topic embeddings are L2-normalized into one padded tensor (sets x max topics x dimensions),
+    so cosine similarities are matrix products: alignment between every pair of sets is one matmul
+    of all topics against all topics (in row blocks to bound memory), drift between consecutive
+    quarters is one batched matmul over the (previous, current) pairs, and top-k matches come from
+    np.argpartition on the same blocks. Nothing loops over topics in Python.
+
+    Alignment of set A to set B is the mean, over A's topics, of the best cosine similarity to
+    any topic of B (1 when every topic of A has an identical topic in B); it is asymmetric, and
+    the tables report both directions and their mean.
+
+    Example:
+        engine = TopicSimilarityEngine(load_bertopic_topic_sets())
+        engine.alignment()
+        engine.topic_matches(top_k=3, exclude_same_bank=True)
+    """
+    def __init__(self, topic_sets: list[TopicSet], block_size: int = 4096):
+        if not topic_sets:
+            raise ValueError("No topic sets to compare")
+        dimensions = {topic_set.embeddings.shape[1] for topic_set in topic_sets}
+        if len(dimensions) != 1:
+            raise ValueError(f"Topic embeddings have different dimensions: {sorted(dimensions)}")
+        self.topic_sets = topic_sets
+        self.block_size = block_size
+        self.sets = pd.DataFrame([
+            {"bank": s.bank, "section": s.section, "year": s.year, "quarter": s.quarter, "topics": len(s.labels)}
+            for s in topic_sets
+        ])
+
+        max_topics = max(len(s.labels) for s in topic_sets)
+        self._tensor = np.zeros((len(topic_sets), max_topics, dimensions.pop()), dtype=np.float32)
+        self._mask = np.zeros((len(topic_sets), max_topics), dtype=bool)
+        for index, topic_set in enumerate(topic_sets):
+            norms = np.linalg.norm(topic_set.embeddings, axis=1, keepdims=True)
+            self._tensor[index, :len(topic_set.labels)] = topic_set.embeddings / np.where(norms == 0, 1, norms)
+            self._mask[index, :len(topic_set.labels)] = True
+        self._alignment = None
+
+    def _topic_frame(self) -> pd.DataFrame:
+        # One row per valid (set, topic) slot of the tensor, in flattened order
+        set_index, topic_index = np.nonzero(self._mask)
+        frame = self.sets.iloc[set_index][SET_KEYS].reset_index(drop=True)
+        frame["set_index"] = set_index
+        frame["topic_index"] = topic_index
+        frame["topic"] = [self.topic_sets[s].labels[t] for s, t in zip(set_index, topic_index)]
+        return frame
+
+    def alignment_matrix(self) -> np.ndarray:
+        """
+        Directed alignment between all sets: entry [a, b] is the alignment of set a to set b.
+        """
+        if self._alignment is None:
+            n_sets, max_topics, dimensions = self._tensor.shape
+            flat = self._tensor.reshape(n_sets * max_topics, dimensions)
+            flat_mask = self._mask.reshape(-1)
+            sets_per_block = max(1, self.block_size // max_topics)
+            alignment = np.zeros((n_sets, n_sets))
+            for start in range(0, n_sets, sets_per_block):
+                stop = min(start + sets_per_block, n_sets)
+                similarity = flat[start * max_topics:stop * max_topics] @ flat.T
+                similarity[:, ~flat_mask] = -np.inf
+                best = similarity.reshape(stop - start, max_topics, n_sets, max_topics).max(axis=3)
+                valid = self._mask[start:stop, :, None]
+                alignment[start:stop] = np.where(valid, best, 0.0).sum(axis=1) / valid.sum(axis=1)
+            self._alignment = alignment
+        return self._alignment
+
+    def alignment(self, **filters) -> pd.DataFrame:
+        """
+        Alignment between every pair of different sets, both directions and their mean.
+
+        Args:
+            **filters: Equality (or membership) filters on the first set's keys, e.g. section="qna".
+
+        Returns:
+            pd.DataFrame: '<key>_a' and '<key>_b' for SET_KEYS, 'alignment_a_to_b', 'alignment_b_to_a'
+            and 'alignment', highest first.
+        """
+        matrix = self.alignment_matrix()
+        a, b = np.triu_indices(len(self.sets), k=1)
+        table = pd.concat([self.sets.iloc[a][SET_KEYS].add_suffix("_a").reset_index(drop=True),
+                           self.sets.iloc[b][SET_KEYS].add_suffix("_b").reset_index(drop=True)], axis=1)
+        table["alignment_a_to_b"] = matrix[a, b]
+        table["alignment_b_to_a"] = matrix[b, a]
+        table["alignment"] = (matrix[a, b] + matrix[b, a]) / 2
+        for column, value in filters.items():
+            if value is not None:
+                wanted = value if isinstance(value, (list, tuple, set)) else [value]
+                table = table[table[f"{column}_a"].isin(wanted) | table[f"{column}_b"].isin(wanted)]
+        return table.sort_values("alignment", ascending=False, ignore_index=True)
+
+    def topic_matches(self, top_k: int = 3, min_similarity: float = 0.0, exclude_same_set: bool = True,
+                      exclude_same_bank: bool = False) -> pd.DataFrame:
+        """
+        The top_k most similar topics of every topic, across all other sets.
+
+        Args:
+            top_k (int): Matches kept per topic (the rest of each similarity row is pruned with argpartition).
+            min_similarity (float): Drop matches below this cosine similarity.
+            exclude_same_set (bool): Do not match topics of the same set.
+            exclude_same_bank (bool): Only match topics of other banks.
+
+        Returns:
+            pd.DataFrame: Per match, the topic's keys and label, the matched topic's keys and label
+            ('_match' suffix), 'similarity' and 'rank'.
+        """
+        topics = self._topic_frame()
+        embeddings = self._tensor[topics["set_index"], topics["topic_index"]]
+        set_index = topics["set_index"].to_numpy()
+        bank_codes = pd.factorize(topics["bank"])[0]
+        k = min(top_k, len(topics))
+        rows, matches, similarities = [], [], []
+        for start in range(0, len(topics), self.block_size):
+            stop = min(start + self.block_size, len(topics))
+            similarity = embeddings[start:stop] @ embeddings.T
+            if exclude_same_set:
+                similarity[set_index[start:stop, None] == set_index[None, :]] = -np.inf
+            if exclude_same_bank:
+                similarity[bank_codes[start:stop, None] == bank_codes[None, :]] = -np.inf
+            top = np.argpartition(-similarity, k - 1, axis=1)[:, :k]
+            top_similarity = np.take_along_axis(similarity, top, axis=1)
+            order = np.argsort(-top_similarity, axis=1, kind="stable")
+            rows.append(np.repeat(np.arange(start, stop), k))
+            matches.append(np.take_along_axis(top, order, axis=1).ravel())
+            similarities.append(np.take_along_axis(top_similarity, order, axis=1).ravel())
+        rows, matches, similarities = np.concatenate(rows), np.concatenate(matches), np.concatenate(similarities)
+        keep = np.isfinite(similarities) & (similarities >= min_similarity)
+        columns = SET_KEYS + ["topic"]
+        table = pd.concat([topics.iloc[rows[keep]][columns].reset_index(drop=True),
+                           topics.iloc[matches[keep]][columns].add_suffix("_match").reset_index(drop=True)], axis=1)
+        table["similarity"] = similarities[keep]
+        table["rank"] = np.tile(np.arange(1, k + 1), len(topics))[keep]
+        return table
+
+    def drift(self, new_topic_threshold: float = 0.5) -> tuple[pd.DataFrame, pd.DataFrame]:
+        """
+        Topic drift between consecutive quarters of each bank and section.
+
+        Every (previous quarter, quarter) pair is compared in one batched matmul. A topic whose best
+        match in the previous quarter is below new_topic_threshold is flagged as new. The previous
+        quarter is the calendar quarter before: a quarter that follows a missing one gets no row
+        rather than a comparison two quarters apart, and two sets of the same quarter are never
+        compared with each other.
+
+        Returns:
+            tuple[pd.DataFrame, pd.DataFrame]: Per quarter, the alignment to the previous quarter
+            (both directions), 'drift' (1 - mean alignment) and the number of new topics; and per
+            topic, its best previous match, the similarity and the 'is_new' flag.
+        """
+        dated = self.sets.dropna(subset=["year", "quarter"])
+        dated = dated.assign(period=dated["year"].astype(int) * 4 + dated["quarter"].astype(int) - 1)
+        dated = dated.sort_values(["bank", "section", "period"])
+        positions = dated.index.to_numpy()
+        period = dated["period"].to_numpy()
+        follows = (dated["bank"].to_numpy()[1:] == dated["bank"].to_numpy()[:-1]) & \
+                  (dated["section"].to_numpy()[1:] == dated["section"].to_numpy()[:-1]) & \
+                  (period[1:] == period[:-1] + 1)
+        current, previous = positions[1:][follows], positions[:-1][follows]
+        if len(current) == 0:
+            return pd.DataFrame(), pd.DataFrame()
+
+        # (pairs, topics of the quarter, topics of the previous quarter)
+        similarity = np.matmul(self._tensor[current], self._tensor[previous].transpose(0, 2, 1))
+        similarity = np.where(self._mask[previous][:, None, :], similarity, -np.inf)
+        best_previous = similarity.argmax(axis=2)
+        best_similarity = similarity.max(axis=2)
+        current_valid = self._mask[current]
+        best_current_similarity = np.where(self._mask[current][:, :, None], similarity, -np.inf).max(axis=1)
+        previous_valid = self._mask[previous]
+
+        quarters = self.sets.iloc[current][SET_KEYS].reset_index(drop=True)
+        quarters["previous_year"] = self.sets.iloc[previous]["year"].to_numpy()
+        quarters["previous_quarter"] = self.sets.iloc[previous]["quarter"].to_numpy()
+        quarters["alignment_to_previous"] = np.where(current_valid, best_similarity, 0).sum(axis=1) / current_valid.sum(axis=1)
+        quarters["alignment_from_previous"] = np.where(previous_valid, best_current_similarity, 0).sum(axis=1) / previous_valid.sum(axis=1)
+        quarters["drift"] = 1 - (quarters["alignment_to_previous"] + quarters["alignment_from_previous"]) / 2
+        quarters["new_topics"] = (current_valid & (best_similarity < new_topic_threshold)).sum(axis=1)
+
+        pair_index, topic_index = np.nonzero(current_valid)
+        topics = quarters.iloc[pair_index][SET_KEYS].reset_index(drop=True)
+        topics["topic"] = [self.topic_sets[current[p]].labels[t] for p, t in zip(pair_index, topic_index)]
+        topics["previous_topic"] = [self.topic_sets[previous[p]].labels[best_previous[p, t]] for p, t in zip(pair_index, topic_index)]
+        topics["similarity"] = best_similarity[pair_index, topic_index]
+        topics["is_new"] = topics["similarity"] < new_topic_threshold
+        return quarters, topics
+
+
+def loop_alignment(topic_sets: list[TopicSet]) -> np.ndarray:
+    """
+    The nested-loop baseline: cosine similarity topic by topic for every pair of sets.
+    """
+    alignment = np.zeros((len(topic_sets), len(topic_sets)))
+    for a, set_a in enumerate(topic_sets):
+        for b, set_b in enumerate(topic_sets):
+            best = []
+            for u in set_a.embeddings:
+                best.append(max(float(u @ v / (np.linalg.norm(u) * np.linalg.norm(v) or 1)) for v in set_b.embeddings))
+            alignment[a, b] = sum(best) / len(best)
+    return alignment
+
+
+def benchmark_topic_similarity(topic_sets: list[TopicSet], include_loop: bool = True) -> pd.DataFrame:
+    """
+    Times the engine's alignment, top-k matches and drift, and the nested-loop alignment.
+
+    Returns:
+        pd.DataFrame: One row per measurement, in seconds, with the number of sets and topics.
+    """
+    rows = []
+    start = time.perf_counter()
+    engine = TopicSimilarityEngine(topic_sets)
+    matrix = engine.alignment_matrix()
+    rows.append({"measurement": "engine_alignment", "seconds": time.perf_counter() - start})
+    start = time.perf_counter()
+    engine.topic_matches(top_k=5)
+    rows.append({"measurement": "engine_top5_matches", "seconds": time.perf_counter() - start})
+    start = time.perf_counter()
+    engine.drift()
+    rows.append({"measurement": "engine_drift", "seconds": time.perf_counter() - start})
+    if include_loop:
+        start = time.perf_counter()
+        baseline = loop_alignment(topic_sets)
+        rows.append({"measurement": "loop_alignment", "seconds": time.perf_counter() - start,
+                     "max_abs_difference": float(np.abs(baseline - matrix).max())})
+    result = pd.DataFrame(rows)
+    result["sets"] = len(topic_sets)
+    result["topics"] = int(engine.sets["topics"].sum())
+    return result
@@ -0,0 +1,289 @@
+import hashlib
+import json
+import logging
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional
+
+import pandas as pd
+import PyPDF2
+
+# Bump when the layout of a section changes so every cached section is rebuilt
+REPORT_LAYOUT_VERSION = "1"
+
+SECTION_KEYS = ["bank", "year", "quarter"]
+
+
+def hash_records(records: list[dict], *extra: str) -> str:
+    """
+    Builds a stable content hash for a list of records.
+
+    Args:
+        records (list[dict]): The records (e.g. one section's analysis results).
+        *extra (str): Any extra strings to include in the hash (chart name, layout version).
+
+    Returns:
+        str: A hex sha256 digest.
+    """
+    payload = json.dumps([records, extra], sort_keys=True, default=str, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def plot_sentiment_breakdown(section_df: pd.DataFrame, output_path: str) -> None:
+    """
+    Default section chart: analyst vs management sentiment label counts.
+    """
+    import matplotlib
+    matplotlib.use("Agg")
+    import matplotlib.pyplot as plt
+
+    counts = pd.DataFrame({
+        "Analyst": section_df["analyst_sentiment"].str.lower().value_counts(),
+        "Management": section_df["management_sentiment"].str.lower().value_counts(),
+    }).fillna(0).reindex(["positive", "neutral", "negative"]).fillna(0)
+
+    fig, ax = plt.subplots(figsize=(6, 2.5))
+    counts.plot.bar(ax=ax, rot=0, color=["#4c72b0", "#dd8452"])
+    ax.set_ylabel("Answers")
+    ax.set_title("Sentiment of analyst questions vs management answers")
+    fig.tight_layout()
+    fig.savefig(output_path, dpi=120)
+    plt.close(fig)
+
+
+def render_section_pdf(title: str, records: list[dict], chart_paths: list[str], output_path: str) -> str:
+    """
+    Renders a single bank/quarter section to its own PDF with the same layout as the
+    original create_finance_report (reportlab).
+
+    Args:
+        title (str): The section heading.
+        records (list[dict]): Analysis results with the analyst/management question, answer, sentiment and explanation.
+        chart_paths (list[str]): Already rendered chart images to place under the heading.
+        output_path (str): Where to write the section PDF.
+
+    Returns:
+        str: output_path
+    """
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Image, Paragraph, SimpleDocTemplate, Spacer
+    from reportlab.platypus.flowables import HRFlowable
+
+    doc = SimpleDocTemplate(output_path, pagesize=letter,
+                            rightMargin=inch/2, leftMargin=inch/2,
+                            topMargin=inch/2, bottomMargin=inch/2)
+    styles = getSampleStyleSheet()
+    normal_style = styles["Normal"]
+
+    elements = [Paragraph(title, styles["h2"]), Spacer(1, 0.1 * inch)]
+    for chart_path in chart_paths:
+        elements.append(Image(chart_path, width=6 * inch, height=2.5 * inch))
+        elements.append(Spacer(1, 0.1 * inch))
+
+    if not records:
+        elements.append(Paragraph("No analysis results found.", normal_style))
+
+    for result in records:
+        elements.append(Paragraph(f"<b>Analyst Question (Sentiment: {str(result['analyst_sentiment']).capitalize()}):</b> {result['analyst_question']}", normal_style))
+        elements.append(Spacer(1, 0.05 * inch))
+        elements.append(Paragraph(f"<b>Management Answer (Sentiment: {str(result['management_sentiment']).capitalize()}):</b> {result['management_answer']}", normal_style))
+        elements.append(Spacer(1, 0.05 * inch))
+        elements.append(Paragraph(f"<b>Explanation:</b> {result['explanation']}", normal_style))
+        elements.append(Spacer(1, 0.1 * inch))
+        elements.append(HRFlowable(width="100%", thickness=1, lineCap="round", color="black", spaceBefore=6, spaceAfter=6))
+        elements.append(Spacer(1, 0.1 * inch))
+
+    doc.build(elements)
+    return output_path
+
+
+def render_title_pdf(title: str, output_path: str) -> str:
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.lib.units import inch
+    from reportlab.platypus import Paragraph, SimpleDocTemplate
+
+    doc = SimpleDocTemplate(output_path, pagesize=letter,
+                            rightMargin=inch/2, leftMargin=inch/2,
+                            topMargin=inch/2, bottomMargin=inch/2)
+    doc.build([Paragraph(title, getSampleStyleSheet()["h1"])])
+    return output_path
+
+
+def _render_charts(task: dict) -> list[str]:
+    """
+    Worker entry point (runs in a separate process): renders the charts the task owns.
+    Each chart is written to a temporary file and moved into place, so a reader never sees a partial PNG.
+    """
+    section_df = pd.DataFrame(task["records"])
+    for chart_path in task["missing_charts"]:
+        tmp_path = f"{chart_path}.{os.getpid()}.tmp.png"
+        plot_sentiment_breakdown(section_df, tmp_path)
+        os.replace(tmp_path, chart_path)
+    return task["missing_charts"]
+
+
+def _build_section(task: dict) -> dict:
+    """
+    Worker entry point (runs in a separate process): renders the section PDF once its charts exist.
+    """
+    render_section_pdf(task["title"], task["records"], task["chart_paths"], task["output_path"])
+    return {"key": task["key"], "hash": task["hash"], "output_path": task["output_path"]}
+
+
+class EarningsCallReportBuilder:
+    """
+    Incrementally builds the earnings call sentiment report.
+
+    The report is split into one section per (bank, year, quarter). Every section
+    and every chart is stored under `cache_dir` keyed by a hash of its input data,
+    and a manifest records which hash each section was last built from. On each
+    build only the sections whose data changed are re-rendered (in parallel
+    processes) and the cached section PDFs are stitched together, so adding a new
+    quarter only renders that quarter's sections.
+
+    Example:
+        builder = EarningsCallReportBuilder("data/temp/report_cache")
+        builder.build(analysis_df, "assets/Earnings_call_report/Earnings_call_sentiment_report.pdf")
+    """
+    def __init__(self, cache_dir: str, max_workers: Optional[int] = None,
+                 title: str = "Earnings Call Sentiment Divergence Analysis Report"):
+        self.cache_dir = cache_dir
+        self.max_workers = max_workers
+        self.title = title
+        self._sections_dir = os.path.join(cache_dir, "sections")
+        self._charts_dir = os.path.join(cache_dir, "charts")
+        self._manifest_path = os.path.join(cache_dir, "manifest.json")
+        os.makedirs(self._sections_dir, exist_ok=True)
+        os.makedirs(self._charts_dir, exist_ok=True)
+
+    def _load_manifest(self) -> dict:
+        if not os.path.exists(self._manifest_path):
+            return {}
+        with open(self._manifest_path, "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _save_manifest(self, manifest: dict) -> None:
+        tmp_path = f"{self._manifest_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as file:
+            json.dump(manifest, file, indent=2, sort_keys=True)
+        os.replace(tmp_path, self._manifest_path)
+
+    @staticmethod
+    def _section_title(bank: str, year, quarter) -> str:
+        return f"{bank} Analysis Results - {year} Q{quarter}"
+
+    def plan(self, analysis_df: pd.DataFrame) -> tuple[list[dict], list[str]]:
+        """
+        Works out which sections need (re)building.
+
+        Args:
+            analysis_df (pd.DataFrame): Analysis results with 'bank', 'year', 'quarter', 'analyst_question',
+                'analyst_sentiment', 'management_answer', 'management_sentiment' and 'explanation' columns.
+
+        Returns:
+            tuple[list[dict], list[str]]: The build tasks for stale sections, and the ordered section
+            PDF paths making up the full report.
+        """
+        manifest = self._load_manifest()
+        tasks = []
+        ordered_paths = []
+        # Sections with identical records share a chart; only the first task that needs it renders it
+        scheduled_charts = set()
+
+        for (bank, year, quarter), section_df in analysis_df.sort_values(SECTION_KEYS).groupby(SECTION_KEYS, sort=False):
+            key = f"{bank}|{year}|{quarter}"
+            records = section_df.drop(columns=SECTION_KEYS).to_dict(orient="records")
+            section_hash = hash_records(records, key, REPORT_LAYOUT_VERSION)
+            output_path = os.path.join(self._sections_dir, f"{section_hash}.pdf")
+            ordered_paths.append(output_path)
+
+            if manifest.get(key) == section_hash and os.path.exists(output_path):
+                continue
+
+            chart_path = os.path.join(self._charts_dir, f"{hash_records(records, 'sentiment_breakdown', REPORT_LAYOUT_VERSION)}.png")
+            missing_charts = [] if chart_path in scheduled_charts or os.path.exists(chart_path) else [chart_path]
+            scheduled_charts.update(missing_charts)
+            tasks.append({
+                "key": key,
+                "hash": section_hash,
+                "title": self._section_title(bank, year, quarter),
+                "records": records,
+                "chart_paths": [chart_path],
+                "missing_charts": missing_charts,
+                "output_path": output_path,
+            })
+
+        return tasks, ordered_paths
+
+    def build(self, analysis_df: pd.DataFrame, output_path: str) -> dict:
+        """
+        Rebuilds stale sections in parallel and stitches all sections into the final PDF.
+
+        Args:
+            analysis_df (pd.DataFrame): See `plan`.
+            output_path (str): Where to write the stitched report.
+
+        Returns:
+            dict: Build statistics ('sections_total', 'sections_rebuilt', 'charts_rendered', 'seconds').
+        """
+        start = time.perf_counter()
+        tasks, ordered_paths = self.plan(analysis_df)
+        manifest = self._load_manifest()
+
+        if tasks:
+            # Charts are rendered before any section, as a section may use a chart another task renders
+            chart_tasks = [task for task in tasks if task["missing_charts"]]
+            if len(tasks) == 1 or self.max_workers == 1:
+                for task in chart_tasks:
+                    _render_charts(task)
+                built = [_build_section(task) for task in tasks]
+            else:
+                with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+                    list(executor.map(_render_charts, chart_tasks))
+                    built = list(executor.map(_build_section, tasks))
+            for section in built:
+                manifest[section["key"]] = section["hash"]
+            self._save_manifest(manifest)
+
+        title_path = os.path.join(self._sections_dir, f"title_{hash_records([], self.title)}.pdf")
+        if not os.path.exists(title_path):
+            render_title_pdf(self.title, title_path)
+        self.stitch([title_path] + ordered_paths, output_path)
+
+        stats = {
+            "sections_total": len(ordered_paths),
+            "sections_rebuilt": len(tasks),
+            "charts_rendered": sum(len(task["missing_charts"]) for task in tasks),
+            "seconds": time.perf_counter() - start,
+        }
+        logging.info(f"Report '{output_path}' built: {stats}")
+        return stats
+
+    @staticmethod
+    def stitch(section_paths: list[str], output_path: str) -> None:
+        """
+        Concatenates the section PDFs into a single report without re-rendering them.
+        """
+        writer = PyPDF2.PdfWriter()
+        for section_path in section_paths:
+            for page in PyPDF2.PdfReader(section_path).pages:
+                writer.add_page(page)
+
+        os.makedirs(os.path.dirname(output_path) or ".", exist_ok=True)
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, "wb") as file:
+            writer.write(file)
+        os.replace(tmp_path, output_path)
+
+
+def analysis_results_to_df(results_by_bank: dict[str, list[dict]]) -> pd.DataFrame:
+    """
+    Combines the per-bank analysis result lists built in the sentiment notebooks
+    (e.g. {"JPM": jpm_analysis_results, "Goldman Sachs": gs_analysis_results}) into one DataFrame.
+    """
+    frames = [pd.DataFrame(results).assign(bank=bank) for bank, results in results_by_bank.items() if results]
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=SECTION_KEYS)
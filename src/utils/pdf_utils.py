@@ -165,6 +165,149 @@ def extract_quarter_and_year_from_filename(
     else:
         return None, None
     
+# Filing names that do not follow the "1q22_" transcript convention
+_FILING_YEAR_QUARTER_PATTERN = re.compile(r"(20\d{2})[_-]q([1-4])", re.IGNORECASE)  # "2024_q2_10q", "2022-q1-results"
+_FILING_ORDINAL_QUARTER_PATTERN = re.compile(r"(first|second|third|fourth)-quarter-(20\d{2})", re.IGNORECASE)  # "second-quarter-2024-10-q"
+_ORDINAL_QUARTERS = {"first": 1, "second": 2, "third": 3, "fourth": 4}
+
+
+def extract_period_from_filename(filename: str) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Extracts the (year, quarter) of a transcript or filing from its filename, using
+    extract_quarter_and_year_from_filename for the "1q22_" style and falling back to the
+    "2024_q2" / "2022-q1" and "second-quarter-2024" styles of the 10-Q and earnings files.
+
+    Args:
+        filename (str): The name of the file (or full path).
+
+    Returns:
+        Tuple[Optional[int], Optional[int]]: The year and quarter as integers, or (None, None) if not found.
+    """
+    quarter, year = extract_quarter_and_year_from_filename(filename)
+    if quarter and year:
+        return int(year), int(quarter)
+
+    match = _FILING_YEAR_QUARTER_PATTERN.search(filename)
+    if match:
+        return int(match.group(1)), int(match.group(2))
+
+    match = _FILING_ORDINAL_QUARTER_PATTERN.search(filename)
+    if match:
+        return int(match.group(2)), _ORDINAL_QUARTERS[match.group(1).lower()]
+
+    return None, None
+
+
+# Spacing and spelling fixes for the roles extracted from the JP Morgan transcripts
+_MISSPELT_ROLES = {
+    "  ": " ",
+    ' ,': ',',
+    'Of ficer': 'Officer',
+    'Financ ial': 'Financial',
+    'Morg an': 'Morgan',
+    'Finan cial': 'Financial',
+    'Fina ncial': 'Financial',
+    'Fin ancial': 'Financial',
+    'Analy st': 'Analyst',
+    'Cha irman': 'Chairman',
+    'JPMo rgan': 'JPMorgan',
+    'JPMorganChase': 'JPMorgan Chase & Co.',
+    'JPMorga n': 'JPMorgan',
+    'JP Morgan': 'JPMorgan',
+    'Off icer': 'Officer',
+    'JPMor gan': 'JPMorgan',
+    'JPM organ': 'JPMorgan',
+    'Chair man': 'Chairman',
+    'Membe r': 'Member',
+    '-O': 'O',
+    'Membe rOperating': 'Member Operating',
+    'M ember': 'Member',
+    'Offi cer': 'Officer',
+    '& C o': '& Co',
+    'Chas e': 'Chase',
+    'C hief': 'Chief',
+    'Oper ating': 'Operating',
+    'Comm ittee': 'Committee',
+    'Execut ive': 'Executive',
+    'Financia l': 'Financial',
+    'Ch ief': 'Chief',
+    'Co .': 'Co.',
+    'Officer ,': 'Officer,',
+    'Financi al': 'Financial',
+    'M ember': 'Member',
+    'MemberOperating': 'Member Operating',
+    'Chie f': 'Chief',
+    'Mor gan': 'Morgan',
+    'M organ': 'Morgan',
+    'C apital': 'Capital',
+    'Ev ercore': 'Evercore',
+    'Ever core': 'Evercore',
+    'Evercor e': 'Evercore',
+    'Ame rica': 'America',
+    'Amer ica': 'America',
+    'P ortales': 'Portales',
+    'Po rtales': 'Portales',
+    'Seapor t': 'Seaport',
+    'Seap ort': 'Seaport',
+    'Farg o': 'Fargo',
+    'Ca pital': 'Capital',
+    'Ba nk': 'Bank',
+    'Amer ica': 'America',
+    'Secur ities': 'Securities',
+    'Well s': 'Wells',
+    'In c': 'Inc',
+    'Autono mous': 'Autonomous',
+    'Auton omous': 'Autonomous',
+    'S ecurities': 'Securities',
+    'M errill': 'Merrill',
+    'Inc .': 'Inc.',
+    'Deutsc he': 'Deutsche',
+    'Chief Financial Officer & Member Operating Committee, JPMorgan Chase & Co.': 'Chief Financial Officer, JPMorgan Chase & Co.'
+}
+
+
+def correct_roles(role):
+    for misspelt_role in _MISSPELT_ROLES.keys():
+        if misspelt_role in role:
+            role = role.replace(misspelt_role, _MISSPELT_ROLES[misspelt_role])
+            break
+    return role
+
+
+def extract_transcript_dfs_from_pdf(pdf_file_path: str, bank_type: BankType) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Extracts the Q&A and discussion DataFrames from a single transcript PDF.
+    The quarter and year are taken from the filename (e.g. "1q22_earnings_transcript.pdf").
+
+    Args:
+        pdf_file_path (str): The path to the PDF transcript.
+        bank_type (BankType): The bank the transcript belongs to, which selects the extractor.
+
+    Returns:
+        Tuple[pd.DataFrame, pd.DataFrame]: The qna_df and discussion_df of the transcript.
+    """
+    quarter, year = extract_quarter_and_year_from_filename(os.path.basename(pdf_file_path))
+    extracted_text = extract_text_from_pdf(pdf_file_path)
+
+    match bank_type:
+        case BankType.GOLDMAN_SACHS:
+            extractor = GoldmanSachsTranscriptExtractor(extracted_text, quarter, year)
+            return extractor.get_qna_df(), extractor.get_discussion_df()
+
+        case BankType.JPMORGAN:
+            extractor = JpMorganTranscriptExtractor(extracted_text, quarter, year)
+            qna_df, discussion_df = extractor.parse_transcript_to_dataframes()
+
+            discussion_df["year"] = year
+            discussion_df["quarter"] = quarter
+            qna_df["year"] = year
+            qna_df["quarter"] = quarter
+            discussion_df['role'] = discussion_df['role'].apply(correct_roles)
+            return qna_df, discussion_df
+
+    raise ValueError(f"Unsupported bank type: {bank_type}")
+
+
 def extract_transcripts_pdf_df_from_dir(transcripts_dir: str, bank_type: BankType) -> Tuple[pd.DataFrame, pd.DataFrame]:
     """
     Extracts financial transcript data from PDF files within a specified directory
@@ -190,107 +333,15 @@ def extract_transcripts_pdf_df_from_dir(transcripts_dir: str, bank_type: BankTyp
     qna_df = None
     discussion_df = None
     for pdf_file_path in pdf_files_path:
-        quarter, year = extract_quarter_and_year_from_filename(os.path.basename(pdf_file_path))
-        extracted_text = extract_text_from_pdf(pdf_file_path)
-
-        match bank_type:
-            case BankType.GOLDMAN_SACHS:
-                extractor = GoldmanSachsTranscriptExtractor(extracted_text, quarter, year)
-                qna_df = extractor.get_qna_df() if qna_df is None else pd.concat([qna_df, extractor.get_qna_df()], ignore_index=True)
-                discussion_df = extractor.get_discussion_df() if discussion_df is None else pd.concat([discussion_df, extractor.get_discussion_df()], ignore_index=True)
-
-            case BankType.JPMORGAN:
-                extractor = JpMorganTranscriptExtractor(extracted_text, quarter, year)
-                qna_df_cur, discussion_df_cur = extractor.parse_transcript_to_dataframes()
-
-                discussion_df_cur["year"] = year
-                discussion_df_cur["quarter"] = quarter
-                qna_df_cur["year"] = year
-                qna_df_cur["quarter"] = quarter
-                qna_df = pd.concat([qna_df, qna_df_cur], ignore_index=True)
-                discussion_df = pd.concat([discussion_df, discussion_df_cur], ignore_index=True)
-
-                misspelt_roles_dict = {
-                    "  ": " ",
-                    ' ,': ',',
-                    'Of ficer': 'Officer',
-                    'Financ ial': 'Financial',
-                    'Morg an': 'Morgan',
-                    'Finan cial': 'Financial',
-                    'Fina ncial': 'Financial',
-                    'Fin ancial': 'Financial',
-                    'Analy st': 'Analyst',
-                    'Cha irman': 'Chairman',
-                    'JPMo rgan': 'JPMorgan',
-                    'JPMorganChase': 'JPMorgan Chase & Co.',
-                    'JPMorga n': 'JPMorgan',
-                    'JP Morgan': 'JPMorgan',
-                    'Off icer': 'Officer',
-                    'JPMor gan': 'JPMorgan',
-                    'JPM organ': 'JPMorgan',
-                    'Chair man': 'Chairman',
-                    'Membe r': 'Member',
-                    '-O': 'O',
-                    'Membe rOperating': 'Member Operating',
-                    'M ember': 'Member',
-                    'Offi cer': 'Officer',
-                    '& C o': '& Co',
-                    'Chas e': 'Chase',
-                    'C hief': 'Chief',
-                    'Oper ating': 'Operating',
-                    'Comm ittee': 'Committee',
-                    'Execut ive': 'Executive',
-                    'Financia l': 'Financial',
-                    'Ch ief': 'Chief',
-                    'Co .': 'Co.',
-                    'Officer ,': 'Officer,',
-                    'Financi al': 'Financial',
-                    'M ember': 'Member',
-                    'MemberOperating': 'Member Operating',
-                    'Chie f': 'Chief',
-                    'Mor gan': 'Morgan',
-                    'M organ': 'Morgan',
-                    'C apital': 'Capital',
-                    'Ev ercore': 'Evercore',
-                    'Ever core': 'Evercore',
-                    'Evercor e': 'Evercore',
-                    'Ame rica': 'America',
-                    'Amer ica': 'America',
-                    'P ortales': 'Portales',
-                    'Po rtales': 'Portales',
-                    'Seapor t': 'Seaport',
-                    'Seap ort': 'Seaport',
-                    'Farg o': 'Fargo',
-                    'Ca pital': 'Capital',
-                    'Ba nk': 'Bank',
-                    'Amer ica': 'America',
-                    'Secur ities': 'Securities',
-                    'Well s': 'Wells',
-                    'In c': 'Inc',
-                    'Autono mous': 'Autonomous',
-                    'Auton omous': 'Autonomous',
-                    'S ecurities': 'Securities',
-                    'M errill': 'Merrill',
-                    'Inc .': 'Inc.',
-                    'Deutsc he': 'Deutsche',
-                    'Chief Financial Officer & Member Operating Committee, JPMorgan Chase & Co.': 'Chief Financial Officer, JPMorgan Chase & Co.'
-                }
-
-
-                def correct_roles(role):
-                    for misspelt_role in misspelt_roles_dict.keys():
-                        if misspelt_role in role:
-                            role = role.replace(misspelt_role, misspelt_roles_dict[misspelt_role])
-                            break
-                    return role
-                
-                discussion_df['role'] = discussion_df['role'].apply(correct_roles)
-                discussion_df['role'].unique()
-                
-                qna_df.sort_values(by=['year', 'quarter', 'question_answer_group_id'], ascending=True, inplace=True)
-                qna_df.reset_index(drop=True, inplace=True)
-
-                discussion_df.sort_values(by=['year', 'quarter'], ascending=True, inplace=True)
-                discussion_df.reset_index(drop=True, inplace=True)
-                
+        qna_df_cur, discussion_df_cur = extract_transcript_dfs_from_pdf(pdf_file_path, bank_type)
+        qna_df = qna_df_cur if qna_df is None else pd.concat([qna_df, qna_df_cur], ignore_index=True)
+        discussion_df = discussion_df_cur if discussion_df is None else pd.concat([discussion_df, discussion_df_cur], ignore_index=True)
+
+    if bank_type == BankType.JPMORGAN and qna_df is not None:
+        qna_df.sort_values(by=['year', 'quarter', 'question_answer_group_id'], ascending=True, inplace=True)
+        qna_df.reset_index(drop=True, inplace=True)
+
+        discussion_df.sort_values(by=['year', 'quarter'], ascending=True, inplace=True)
+        discussion_df.reset_index(drop=True, inplace=True)
+
     return qna_df, discussion_df
@@ -0,0 +1,32 @@
+import os
+import re
+
+import pandas as pd
+
+from src.analytics.entity_index import MENTION_COLUMNS, EntityIndex, EntityKeywordExtractor
+
+GS_QNA_CSV = os.path.join("data", "processed", "Goldman Sachs", "qna_df.csv")
+
+
+class PatternExtractor(EntityKeywordExtractor):
+    """Finds the mentions of one word instead of running a spaCy pipeline."""
+    def __init__(self, word: str):
+        super().__init__(rake_stopwords=["the", "a", "and", "of", "to", "in"])
+        self._pattern = re.compile(rf"\b{word}\b", re.IGNORECASE)
+
+    def entities(self, texts: list[str]) -> pd.DataFrame:
+        rows = [(turn_id, "capital", "TEST", match.group(), match.start(), match.end())
+                for turn_id, text in enumerate(texts) for match in self._pattern.finditer(text)]
+        return pd.DataFrame(rows, columns=MENTION_COLUMNS)
+
+
+def test_mentions_by_role_include_abbreviated_roles():
+    qna_df = pd.read_csv(GS_QNA_CSV)
+    index = EntityIndex(PatternExtractor("capital")).add_turns(qna_df, "Goldman Sachs", "qna")
+
+    cfo_mentions = index.mentions("capital", role="CFO")
+    assert "CFO" in set(cfo_mentions["role"])
+    assert set(cfo_mentions["role"]) == {"CFO", "Chief Financial Ofﬁcer"}
+
+    ceo_mentions = index.mentions("capital", role="CEO")
+    assert "CEO, Chairman" in set(ceo_mentions["role"])
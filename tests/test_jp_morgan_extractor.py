@@ -0,0 +1,40 @@
+import os
+
+import pandas as pd
+
+from src.data_extraction.bank_transcript_extractors import JpMorganTranscriptExtractor
+from src.data_extraction.bank_transcript_extractors.jp_morgan import _OPERATOR_PATTERN
+from src.data_extraction.bank_transcript_extractors.section_index import TranscriptSectionIndex
+from src.utils.pdf_utils import extract_text_from_pdf
+
+JPM_DIR = os.path.join("data", "raw", "JP Morgan", "Transcripts")
+JPM_QNA_CSV = os.path.join("data", "processed", "JP Morgan", "qna_df.csv")
+
+
+def test_qna_group_ids_advance_at_each_operator_line():
+    text = extract_text_from_pdf(os.path.join(JPM_DIR, "1q24-earnings-transcript.pdf"))
+    extractor = JpMorganTranscriptExtractor(text, 1, 2024)
+    section_index = TranscriptSectionIndex(text)
+    span = section_index.span_after("question_and_answer_section")
+
+    blocks = extractor._extract_blocks_from_section(section_index, *span)
+    operator_blocks = sum(1 for lines in blocks if _OPERATOR_PATTERN.match(lines[0]))
+    # Operator hand-offs are single-line blocks; they must still be seen
+    assert any(len(lines) == 1 and _OPERATOR_PATTERN.match(lines[0]) for lines in blocks)
+
+    qna_df = extractor.parse_transcript_to_dataframes()[0]
+    group_ids = qna_df["question_answer_group_id"].tolist()
+    question_orders = qna_df["question_order"].tolist()
+    assert min(group_ids) >= 1
+    assert max(group_ids) == operator_blocks
+    assert group_ids == sorted(group_ids)
+    for i in range(1, len(group_ids)):
+        expected_order = 0 if group_ids[i] != group_ids[i - 1] else question_orders[i - 1] + 1
+        assert question_orders[i] == expected_order
+
+    expected = pd.read_csv(JPM_QNA_CSV)
+    expected = expected[(expected["year"] == 2024) & (expected["quarter"] == 1)]
+    expected = expected.sort_values(["question_answer_group_id", "question_order"])
+    assert group_ids == expected["question_answer_group_id"].tolist()
+    assert question_orders == expected["question_order"].tolist()
+    assert qna_df["speaker"].tolist() == expected["speaker"].tolist()
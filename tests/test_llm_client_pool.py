@@ -0,0 +1,40 @@
+from src.modelling.llm_client_pool import BaseLLMBackend, LLMClientPool, LLMRequest
+
+
+class EchoBackend(BaseLLMBackend):
+    @property
+    def model_name(self) -> str:
+        return "echo"
+
+    async def generate(self, batch: list[list[dict]], generation_args: dict) -> list[str]:
+        return [messages[-1]["content"] for messages in batch]
+
+
+def test_run_sync_with_rate_limit():
+    requests = [LLMRequest(str(i), [{"role": "user", "content": f"prompt {i}"}]) for i in range(10)]
+    pool = LLMClientPool(EchoBackend(), num_workers=4, max_requests_per_second=100)
+
+    results, stats = pool.run_sync(requests)
+
+    assert stats.succeeded == 10 and stats.failed == 0
+    assert all(result.error is None for result in results)
+    assert sorted(result.generated_text for result in results) == sorted(f"prompt {i}" for i in range(10))
+    # 10 requests at 100/s take at least the 9 intervals between them
+    assert stats.wall_time_seconds >= 0.08
+
+
+class ShortBatchBackend(EchoBackend):
+    max_batch_size = 4
+
+    async def generate(self, batch: list[list[dict]], generation_args: dict) -> list[str]:
+        return [messages[-1]["content"] for messages in batch[:-1]]
+
+
+def test_run_sync_with_short_backend_batches_fails_requests_without_hanging():
+    requests = [LLMRequest(str(i), [{"role": "user", "content": f"prompt {i}"}]) for i in range(20)]
+    pool = LLMClientPool(ShortBatchBackend(), num_workers=2, queue_size=2)
+
+    results, stats = pool.run_sync(requests)
+
+    assert len(results) == 20 and stats.succeeded == 0 and stats.failed == 20
+    assert all(result.error.startswith("ValueError") for result in results)
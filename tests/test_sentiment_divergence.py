@@ -0,0 +1,21 @@
+import os
+
+import pandas as pd
+
+from src.analytics.sentiment_divergence import SentimentDivergenceIndex, sentence_scores
+
+GS_SCORED_QNA_CSV = os.path.join("data", "processed", "Goldman Sachs", "df_scored_qa_gs_prosus.csv")
+
+
+def test_abbreviated_executive_roles_keep_their_role():
+    scored_df = pd.read_csv(GS_SCORED_QNA_CSV)
+    sentences = sentence_scores(scored_df, "Goldman Sachs", "qna")
+
+    assert (sentences["role_simple"] == "CFO").sum() == (scored_df["role"] == "CFO").sum() > 0
+    assert (sentences["role_simple"] == "CEO").sum() == (scored_df["role"] == "CEO").sum() > 0
+    assert "Other" not in set(sentences["role_simple"])
+
+    index = SentimentDivergenceIndex().add_scores(sentences)
+    contributors = index.top_contributors(role_simple="CFO")
+    assert len(contributors) > 0
+    assert set(contributors["role_simple"]) == {"CFO"}